@@ -1,8 +1,13 @@
+import asyncio
+
 import six
 from easydict import EasyDict as edict
 
 from aiomotorengine import ASCENDING
+from aiomotorengine.errors import AggregationError
+from aiomotorengine.monitoring import track
 from aiomotorengine.query_builder.transform import update
+from aiomotorengine.utils import kill_cursor
 
 
 class BaseAggregation(object):
@@ -15,6 +20,24 @@ class BaseAggregation(object):
         return self._field
 
 
+class OperatorAggregation(BaseAggregation):
+    '''
+    Accumulator applying a single `operator` (e.g. `$min`) to a field.
+    '''
+    operator = None
+
+    def to_query(self, aggregation):
+        alias = self.alias
+        field_name = aggregation.get_field_name(self.field)
+
+        if alias is None:
+            alias = field_name
+
+        return {
+            alias: {self.operator: ("$%s" % field_name)}
+        }
+
+
 class PipelineOperation(object):
     def __init__(self, aggregation):
         self.aggregation = aggregation
@@ -51,15 +74,20 @@ class GroupBy(PipelineOperation):
 
 
 class Match(PipelineOperation):
-    def __init__(self, aggregation, **filters):
+    def __init__(self, aggregation, *arguments, **filters):
         super(Match, self).__init__(aggregation)
+        self.arguments = arguments
         self.filters = filters
 
     def to_query(self):
         from aiomotorengine import Q
         match_obj = {'$match': {}}
 
-        query = self.aggregation.queryset.get_query_from_filters(Q(**self.filters))
+        filters = Q(**self.filters)
+        for argument in self.arguments:
+            filters = filters & argument
+
+        query = self.aggregation.queryset.get_query_from_filters(filters)
 
         update(match_obj['$match'], query)
 
@@ -85,6 +113,137 @@ class OrderBy(PipelineOperation):
         return {'$sort': {self.field.db_field: self.direction}}
 
 
+class Project(PipelineOperation):
+    def __init__(self, aggregation, *fields, **expressions):
+        super(Project, self).__init__(aggregation)
+        self.fields = fields
+        self.expressions = expressions
+
+    def to_query(self):
+        from aiomotorengine.fields.base_field import BaseField
+        project_obj = {'$project': {}}
+
+        for field in self.fields:
+            project_obj['$project'][self.aggregation.get_field_name(field)] = 1
+
+        for name, expression in self.expressions.items():
+            if isinstance(expression, BaseField):
+                # a document field, project it under a new name
+                expression = "$%s" % expression.db_field
+            project_obj['$project'][name] = expression
+
+        return project_obj
+
+
+class Limit(PipelineOperation):
+    def __init__(self, aggregation, limit):
+        super(Limit, self).__init__(aggregation)
+        self.limit = limit
+
+    def to_query(self):
+        return {'$limit': self.limit}
+
+
+class Skip(PipelineOperation):
+    def __init__(self, aggregation, skip):
+        super(Skip, self).__init__(aggregation)
+        self.skip = skip
+
+    def to_query(self):
+        return {'$skip': self.skip}
+
+
+class Sample(PipelineOperation):
+    def __init__(self, aggregation, size):
+        super(Sample, self).__init__(aggregation)
+        self.size = size
+
+    def to_query(self):
+        return {'$sample': {'size': self.size}}
+
+
+class Count(PipelineOperation):
+    def __init__(self, aggregation, field_name):
+        super(Count, self).__init__(aggregation)
+        self.field_name = field_name
+
+    def to_query(self):
+        return {'$count': self.field_name}
+
+
+class Lookup(PipelineOperation):
+    def __init__(self, aggregation, from_document, local_field, foreign_field, as_field):
+        super(Lookup, self).__init__(aggregation)
+        self.from_document = from_document
+        self.local_field = local_field
+        self.foreign_field = foreign_field
+        self.as_field = as_field
+
+    def get_foreign_field_name(self):
+        if isinstance(self.foreign_field, six.string_types):
+            if self.foreign_field in getattr(self.from_document, '_fields', {}):
+                return self.from_document._fields[self.foreign_field].db_field
+            return self.foreign_field
+
+        return self.foreign_field.db_field
+
+    def to_query(self):
+        from_collection = self.from_document
+        if not isinstance(from_collection, six.string_types):
+            from_collection = from_collection.__collection__
+
+        return {
+            '$lookup': {
+                'from': from_collection,
+                'localField': self.aggregation.get_field_name(self.local_field),
+                'foreignField': self.get_foreign_field_name(),
+                'as': self.as_field,
+            }
+        }
+
+
+class Facet(PipelineOperation):
+    def __init__(self, aggregation, **pipelines):
+        super(Facet, self).__init__(aggregation)
+        self.pipelines = pipelines
+
+    def to_query(self):
+        facet_obj = {'$facet': {}}
+
+        for name, pipeline in self.pipelines.items():
+            if isinstance(pipeline, Aggregation):
+                pipeline = pipeline.to_query()
+            facet_obj['$facet'][name] = list(pipeline)
+
+        return facet_obj
+
+
+class Bucket(PipelineOperation):
+    def __init__(self, aggregation, group_by, boundaries, default=None, output=None):
+        super(Bucket, self).__init__(aggregation)
+        self.group_by = group_by
+        self.boundaries = boundaries
+        self.default = default
+        self.output = output or []
+
+    def to_query(self):
+        bucket_obj = {'$bucket': {
+            'groupBy': "$%s" % self.aggregation.get_field_name(self.group_by),
+            'boundaries': list(self.boundaries),
+        }}
+
+        if self.default is not None:
+            bucket_obj['$bucket']['default'] = self.default
+
+        if self.output:
+            output = {}
+            for accumulator in self.output:
+                output.update(accumulator.to_query(self.aggregation))
+            bucket_obj['$bucket']['output'] = output
+
+        return bucket_obj
+
+
 class Aggregation(object):
     def __init__(self, queryset):
         self.first_group_by = True
@@ -92,6 +251,7 @@ class Aggregation(object):
         self.pipeline = []
         self.ids = []
         self.raw_query = None
+        self.optimized = False
 
     def get_field_name(self, field):
         if isinstance(field, six.string_types):
@@ -106,13 +266,117 @@ class Aggregation(object):
         self.raw_query = steps
         return self
 
+    def optimize(self, optimized=True):
+        '''
+        Runs the pipeline through :func:`aiomotorengine.aggregation.optimizer.optimize_pipeline`
+        before sending it: `$match` stages are pushed ahead of `$unwind`,
+        `$project` and `$sort` when possible and adjacent `$match` stages are
+        merged, regardless of the order they were chained in.
+        '''
+        self.optimized = optimized
+        return self
+
+    def index_usage(self):
+        '''
+        Returns, for each stage of the pipeline, whether it can use an index.
+        '''
+        from aiomotorengine.aggregation.optimizer import get_index_usage
+        return get_index_usage(self.to_query())
+
+    async def explain(self, alias=None):
+        '''
+        Returns the query plan of this pipeline, summarized like `QuerySet.explain`.
+        '''
+        from aiomotorengine.explain import summarize
+
+        coll = self.queryset.coll(alias)
+        explain = await coll.database.command(
+            'aggregate', coll.name, pipeline=self.to_query(), explain=True
+        )
+        return summarize(explain)
+
+    async def check_query_plan(self, alias=None):
+        '''
+        Checks the plan of pipelines starting with a `$match` with the
+        explain guard, if one is installed.
+        '''
+        from aiomotorengine.explain import get_explain_guard
+
+        guard = get_explain_guard()
+        if guard is None:
+            return
+
+        query = self.to_query()
+        if not query or not query[0].get('$match'):
+            return
+
+        summary = await self.explain(alias=alias)
+        guard.check(summary, self.queryset.__klass__, 'aggregate', query[0]['$match'])
+
     def group_by(self, *args):
         self.pipeline.append(GroupBy(self, self.first_group_by, *args))
         self.first_group_by = False
         return self
 
-    def match(self, **kw):
-        self.pipeline.append(Match(self, **kw))
+    def match(self, *args, **kw):
+        self.pipeline.append(Match(self, *args, **kw))
+        return self
+
+    def project(self, *fields, **expressions):
+        '''
+        Adds a `$project` stage keeping `fields` (by their `db_field`) and
+        adding `expressions` (a document field or any aggregation expression).
+        '''
+        self.pipeline.append(Project(self, *fields, **expressions))
+        return self
+
+    def limit(self, limit):
+        self.pipeline.append(Limit(self, limit))
+        return self
+
+    def skip(self, skip):
+        self.pipeline.append(Skip(self, skip))
+        return self
+
+    def sample(self, size):
+        self.pipeline.append(Sample(self, size))
+        return self
+
+    def count_documents(self, field_name='count'):
+        '''
+        Adds a `$count` stage storing the number of documents in `field_name`.
+
+        Named `count_documents` since `Aggregation.count` is the counting accumulator.
+        '''
+        self.pipeline.append(Count(self, field_name))
+        return self
+
+    def lookup(self, from_document, local_field, foreign_field, as_field):
+        '''
+        Adds a `$lookup` stage joining `from_document` (a Document class or a
+        collection name). `foreign_field` is translated to its `db_field`
+        using `from_document`.
+        '''
+        self.pipeline.append(Lookup(self, from_document, local_field, foreign_field, as_field))
+        return self
+
+    def facet(self, **pipelines):
+        '''
+        Adds a `$facet` stage running each of `pipelines` (Aggregation objects
+        or lists of raw stages) over the same input documents.
+
+        Usage::
+
+            result = await User.objects.aggregate.match(is_admin=True).facet(
+                total=User.objects.aggregate.count_documents('total'),
+                page=User.objects.aggregate.order_by(User.email).limit(10),
+            ).fetch()
+        '''
+        self.pipeline.append(Facet(self, **pipelines))
+        return self
+
+    def bucket(self, group_by, boundaries, default=None, output=None):
+        self.pipeline.append(Bucket(self, group_by, boundaries, default=default, output=output))
         return self
 
     def unwind(self, field):
@@ -134,19 +398,119 @@ class Aggregation(object):
     def get_instance(self, item):
         return self.queryset.__klass__.from_son(item)
 
+    def get_aggregate_arguments(self, batch_size=None, allow_disk_use=False):
+        arguments = {}
+
+        max_time_ms = self.queryset.get_max_time_ms()
+        if max_time_ms is not None:
+            arguments['maxTimeMS'] = max_time_ms
+
+        if batch_size is not None:
+            arguments['cursor'] = {'batchSize': batch_size}
+
+        if allow_disk_use:
+            arguments['allowDiskUse'] = True
+
+        return arguments
+
+    def convert(self, item, hydrate=False, as_dict=False):
+        self.fill_ids(item)
+
+        if hydrate:
+            return self.get_instance(item)
+
+        if as_dict:
+            return item
+
+        return edict(item)
+
+    async def stream(self, batch_size=None, allow_disk_use=False, hydrate=False, as_dict=False, alias=None):
+        '''
+        Iterates over the results of the aggregation as the server sends them.
+
+        Unlike `fetch`, results are not buffered in a list, so memory use is
+        bounded by `batch_size` no matter how many rows the pipeline returns.
+
+        * `allow_disk_use` lets the server spill large `$group`/`$sort` stages to disk;
+        * `hydrate` returns documents built with `get_instance` (`from_son`);
+        * `as_dict` returns plain dicts instead of EasyDict objects.
+
+        Usage::
+
+            aggregation = User.objects.aggregate.group_by(
+                User.email, Aggregation.sum(User.number_of_documents)
+            )
+            async for row in aggregation.stream(batch_size=500, allow_disk_use=True, as_dict=True):
+                print(row['email'], row['number_of_documents'])
+
+        Errors raised by the driver are re-raised as :class:`aiomotorengine.errors.AggregationError`.
+        '''
+        await self.check_query_plan(alias=alias)
+
+        coll = self.queryset.coll(alias)
+        query = self.to_query()
+        cursor = coll.aggregate(
+            query, **self.get_aggregate_arguments(batch_size, allow_disk_use)
+        )
+
+        # the duration of a streamed aggregation includes the time the
+        # consumer spends between rows, network and hydration times don't;
+        # its span is detached, so the consumer's queries don't nest under it
+        exhausted = False
+        with self.track(query, alias, detached=True) as operation:
+            try:
+                while True:
+                    try:
+                        with operation.network():
+                            item = await cursor.__anext__()
+                    except StopAsyncIteration:
+                        exhausted = True
+                        return
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception as e:
+                        exhausted = True
+                        raise AggregationError('Aggregation failed due to: %s' % str(e)) from e
+
+                    operation.add_count(1)
+                    with operation.hydration():
+                        row = self.convert(item, hydrate=hydrate, as_dict=as_dict)
+                    yield row
+            finally:
+                # the consumer stopped early or the task was cancelled
+                if not exhausted:
+                    kill_cursor(cursor)
+
     async def fetch(self, alias=None):
+        await self.check_query_plan(alias=alias)
+
         coll = self.queryset.coll(alias)
-        results = []
-        try:
-            # from motor-0.5 coll.aggregate return AsyncIOMotorAggregateCursor
-            # and can be used in async for
-            async for item in coll.aggregate(self.to_query()):
-                self.fill_ids(item)
-                results.append(edict(item))
-        except Exception as e:
-            raise RuntimeError('Aggregation failed due to: %s' % str(e))
+        query = self.to_query()
+        items = []
+        with self.track(query, alias) as operation:
+            try:
+                # from motor-0.5 coll.aggregate return AsyncIOMotorAggregateCursor
+                # and can be used in async for
+                cursor = coll.aggregate(query, **self.get_aggregate_arguments())
+                with operation.network():
+                    async for item in cursor:
+                        items.append(item)
+            except asyncio.CancelledError:
+                kill_cursor(cursor)
+                raise
+            except Exception as e:
+                raise AggregationError('Aggregation failed due to: %s' % str(e)) from e
+
+            operation.add_documents(items)
+            with operation.hydration():
+                results = [self.convert(item) for item in items]
         return results
 
+    def track(self, query, alias=None, detached=False):
+        return track(
+            self.queryset.__klass__, 'aggregate', self.queryset.get_alias(alias), query, detached
+        )
+
     @classmethod
     def avg(cls, field, alias=None):
         from aiomotorengine.aggregation.avg import AverageAggregation
@@ -157,7 +521,51 @@ class Aggregation(object):
         from aiomotorengine.aggregation.sum import SumAggregation
         return SumAggregation(field, alias)
 
+    @classmethod
+    def min(cls, field, alias=None):
+        from aiomotorengine.aggregation.min import MinAggregation
+        return MinAggregation(field, alias)
+
+    @classmethod
+    def max(cls, field, alias=None):
+        from aiomotorengine.aggregation.max import MaxAggregation
+        return MaxAggregation(field, alias)
+
+    @classmethod
+    def first(cls, field, alias=None):
+        from aiomotorengine.aggregation.first import FirstAggregation
+        return FirstAggregation(field, alias)
+
+    @classmethod
+    def last(cls, field, alias=None):
+        from aiomotorengine.aggregation.last import LastAggregation
+        return LastAggregation(field, alias)
+
+    @classmethod
+    def push(cls, field, alias=None):
+        from aiomotorengine.aggregation.push import PushAggregation
+        return PushAggregation(field, alias)
+
+    @classmethod
+    def add_to_set(cls, field, alias=None):
+        from aiomotorengine.aggregation.add_to_set import AddToSetAggregation
+        return AddToSetAggregation(field, alias)
+
+    @classmethod
+    def count(cls, alias='count'):
+        from aiomotorengine.aggregation.count import CountAggregation
+        return CountAggregation(None, alias)
+
     def to_query(self):
+        query = self.build_query()
+
+        if self.optimized:
+            from aiomotorengine.aggregation.optimizer import optimize_pipeline
+            query = optimize_pipeline(query)
+
+        return query
+
+    def build_query(self):
         if self.raw_query is not None:
             return self.raw_query
 
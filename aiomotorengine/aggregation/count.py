@@ -0,0 +1,8 @@
+from aiomotorengine.aggregation.base import BaseAggregation
+
+
+class CountAggregation(BaseAggregation):
+    def to_query(self, aggregation):
+        return {
+            self.alias: {"$sum": 1}
+        }
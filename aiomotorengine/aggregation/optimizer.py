@@ -0,0 +1,170 @@
+import copy
+
+# stages that keep the documents they get as they are (no reshaping)
+# and can run against the collection indexes when they lead the pipeline
+INDEXABLE_STAGES = ('$match', '$sort')
+
+# stages a $limit can move ahead of without changing the result
+COUNT_PRESERVING_STAGES = ('$project', '$addFields', '$set')
+
+LOGICAL_OPERATORS = ('$and', '$or', '$nor')
+
+
+class UnknownFields(Exception):
+    pass
+
+
+def stage_name(stage):
+    return next(iter(stage))
+
+
+def get_match_fields(query):
+    '''
+    Returns the set of field paths used by a `$match` query.
+
+    Raises UnknownFields if the query uses operators whose fields can't be
+    known statically (`$expr`, `$where`, `$text`...).
+    '''
+    fields = set()
+
+    for key, value in query.items():
+        if key in LOGICAL_OPERATORS:
+            for sub_query in value:
+                fields.update(get_match_fields(sub_query))
+        elif key.startswith('$'):
+            raise UnknownFields(key)
+        else:
+            fields.add(key)
+
+    return fields
+
+
+def is_same_or_sub_path(path, other):
+    return path == other or path.startswith(other + '.') or other.startswith(path + '.')
+
+
+def can_move_match_before(match, stage):
+    try:
+        fields = get_match_fields(match['$match'])
+    except UnknownFields:
+        return False
+
+    name = stage_name(stage)
+
+    if name == '$sort':
+        return True
+
+    if name == '$unwind':
+        path = stage['$unwind']
+        if isinstance(path, dict):
+            if path.get('includeArrayIndex'):
+                # the index field is created by this stage
+                index_field = path['includeArrayIndex']
+                if any(is_same_or_sub_path(field, index_field) for field in fields):
+                    return False
+            path = path['path']
+        path = path.lstrip('$')
+        return not any(is_same_or_sub_path(field, path) for field in fields)
+
+    if name == '$project':
+        projection = stage['$project']
+        excluding = all(
+            value in (0, False) for key, value in projection.items() if key != '_id'
+        )
+
+        for field in fields:
+            # the keys that change the field, its parents or its sub fields
+            keys = [key for key in projection if is_same_or_sub_path(field, key)]
+
+            if excluding:
+                if any(projection[key] in (0, False) for key in keys):
+                    return False
+                continue
+
+            if not keys:
+                # only _id is kept without being listed
+                if field != '_id' and not field.startswith('_id.'):
+                    return False
+                continue
+
+            for key in keys:
+                kept = field == key or field.startswith(key + '.')
+                if not kept or projection[key] not in (1, True):
+                    # excluded, reshaped, renamed or computed by the projection
+                    return False
+        return True
+
+    return False
+
+
+def merge_matches(first, second):
+    first_query, second_query = first['$match'], second['$match']
+
+    if not set(first_query).intersection(second_query):
+        query = dict(first_query)
+        query.update(second_query)
+        return {'$match': query}
+
+    return {'$match': {'$and': [first_query, second_query]}}
+
+
+def optimize_pipeline(stages):
+    '''
+    Returns an equivalent pipeline that lets the server do less work.
+
+    * `$match` stages are moved ahead of `$sort`, `$unwind` and `$project`
+      stages whenever they don't filter on fields those stages create or
+      change, so they can use indexes and discard documents earlier;
+    * adjacent `$match` stages are merged into one;
+    * a `$limit` is moved ahead of `$project` stages so it directly follows
+      its `$sort`, which the server runs as a top-k sort.
+    '''
+    stages = copy.deepcopy(list(stages))
+
+    changed = True
+    while changed:
+        changed = False
+
+        for index in range(1, len(stages)):
+            previous, current = stages[index - 1], stages[index]
+            previous_name, current_name = stage_name(previous), stage_name(current)
+
+            if current_name == '$match' and previous_name == '$match':
+                stages[index - 1:index + 1] = [merge_matches(previous, current)]
+                changed = True
+                break
+
+            if current_name == '$match' and can_move_match_before(current, previous):
+                stages[index - 1], stages[index] = current, previous
+                changed = True
+                break
+
+            if current_name == '$limit' and previous_name in COUNT_PRESERVING_STAGES:
+                stages[index - 1], stages[index] = current, previous
+                changed = True
+                break
+
+    return stages
+
+
+def get_index_usage(stages):
+    '''
+    Returns, for each stage, whether it can be answered using an index.
+
+    Only the `$match` and `$sort` stages at the start of the pipeline run
+    against the collection; everything after the first other stage works
+    on documents already in memory.
+    '''
+    usage = []
+    leading = True
+
+    for index, stage in enumerate(stages):
+        name = stage_name(stage)
+        leading = leading and name in INDEXABLE_STAGES
+        usage.append({
+            'stage': index,
+            'operator': name,
+            'can_use_index': leading,
+        })
+
+    return usage
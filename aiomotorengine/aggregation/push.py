@@ -0,0 +1,5 @@
+from aiomotorengine.aggregation.base import OperatorAggregation
+
+
+class PushAggregation(OperatorAggregation):
+    operator = "$push"
@@ -0,0 +1,18 @@
+from aiomotorengine.utils import get_class
+
+# client classes connect() can use, by name
+BACKENDS = {
+    'motor': 'motor.motor_asyncio.AsyncIOMotorClient',
+    'memory': 'aiomotorengine.backends.memory.MemoryClient',
+}
+
+
+def get_client_class(backend):
+    '''
+    Returns the client class of `backend`: the name of one of the `BACKENDS`,
+    the dotted path of a class or the class itself.
+    '''
+    if isinstance(backend, type):
+        return backend
+
+    return get_class(BACKENDS.get(backend, backend))
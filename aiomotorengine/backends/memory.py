@@ -0,0 +1,659 @@
+'''
+In-memory stand-in for a Motor client, for tests and benchmarks that
+should not need a running mongod:
+
+.. code-block:: python
+
+    connect("test", backend="memory")
+
+It implements the part of the Motor API used by the library: find (with
+sort, skip, limit and projection), find_one, insert, update, remove,
+count, indexes (unique ones are enforced), unordered bulks, change
+streams and the common aggregation stages. Every client has its own
+data, so each alias connected to the memory backend is a separate server. Operations the
+backend doesn't know raise `UnsupportedOperation`.
+'''
+import asyncio
+import copy
+import time
+from collections import OrderedDict, deque
+
+from bson import ObjectId
+from bson.timestamp import Timestamp
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+from aiomotorengine.backends.pipeline import freeze, run_pipeline
+from aiomotorengine.backends.query import (
+    MISSING, UnsupportedOperation, apply_update, equals, get_upsert_document,
+    get_value, matches, normalize_sort, project, sort_documents
+)
+
+# number of changes kept per collection for resuming change streams,
+# like the oplog window of a server
+CHANGE_HISTORY = 10000
+
+# how long `try_next` waits for a change when `max_await_time_ms` isn't given
+DEFAULT_AWAIT_TIME_MS = 1000
+
+
+def get_index_name(keys):
+    return '_'.join('%s_%s' % (field, direction) for field, direction in keys)
+
+
+class MemoryCursor(object):
+    '''
+    Cursor of a `MemoryCollection.find`; the query runs on the first read.
+    '''
+
+    def __init__(self, collection, spec=None, projection=None, skip=0, limit=0, sort=None):
+        self.collection = collection
+        self.spec = spec or {}
+        self.projection = projection
+        self._skip = skip or 0
+        self._limit = limit or 0
+        self._sort = normalize_sort(sort)
+        self._results = None
+        self._position = 0
+
+    def sort(self, key_or_list, direction=None):
+        self._sort = normalize_sort(key_or_list, direction)
+        return self
+
+    def skip(self, skip):
+        self._skip = skip
+        return self
+
+    def limit(self, limit):
+        self._limit = limit
+        return self
+
+    def max_time_ms(self, max_time_ms):
+        return self
+
+    def batch_size(self, batch_size):
+        return self
+
+    def get_matching(self):
+        if list(self.spec) == ['_id'] and not isinstance(self.spec['_id'], dict):
+            document = self.collection._documents.get(freeze(self.spec['_id']))
+            return [document] if document is not None else []
+
+        return [
+            document for document in self.collection.documents()
+            if matches(document, self.spec)
+        ]
+
+    def get_results(self):
+        if self._results is None:
+            documents = self.get_matching()
+            if self._sort:
+                documents = sort_documents(documents, self._sort)
+            documents = documents[self._skip:]
+            if self._limit:
+                documents = documents[:abs(self._limit)]
+            self._results = [project(copy.deepcopy(document), self.projection) for document in documents]
+        return self._results
+
+    async def to_list(self, length=None):
+        results = self.get_results()
+        end = len(results) if length is None else self._position + length
+        items = results[self._position:end]
+        self._position += len(items)
+        return items
+
+    async def count(self, with_limit_and_skip=False):
+        if with_limit_and_skip:
+            return len(self.get_results())
+        return len(self.get_matching())
+
+    async def explain(self):
+        return self.collection.explain_query(self.spec, len(self.get_results()))
+
+    def close(self):
+        self._results = []
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        results = self.get_results()
+        if self._position >= len(results):
+            raise StopAsyncIteration
+        self._position += 1
+        return results[self._position - 1]
+
+
+class MemoryCommandCursor(object):
+    ''' Cursor over the results of an aggregation, run on the first read. '''
+
+    def __init__(self, collection, pipeline):
+        self.collection = collection
+        self.pipeline = pipeline
+        self._results = None
+        self._position = 0
+
+    def get_results(self):
+        if self._results is None:
+            self._results = run_pipeline(
+                copy.deepcopy(self.collection.documents()), self.pipeline, self.collection.database
+            )
+        return self._results
+
+    async def to_list(self, length=None):
+        results = self.get_results()
+        end = len(results) if length is None else self._position + length
+        items = results[self._position:end]
+        self._position += len(items)
+        return items
+
+    def close(self):
+        self._results = []
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        results = self.get_results()
+        if self._position >= len(results):
+            raise StopAsyncIteration
+        self._position += 1
+        return results[self._position - 1]
+
+
+def get_resume_token(sequence):
+    return {'_data': '%016x' % sequence}
+
+
+def get_sequence(resume_token):
+    return int(resume_token['_data'], 16)
+
+
+class MemoryChangeStream(object):
+    '''
+    Change stream of a `MemoryCollection`, from the moment it was opened
+    or from a resume token.
+    '''
+
+    def __init__(
+        self, collection, pipeline=None, full_document=None, resume_after=None,
+        start_after=None, max_await_time_ms=None, batch_size=None, **kwargs
+    ):
+        self.collection = collection
+        self.pipeline = pipeline or []
+        self.full_document = full_document
+        self.max_await_time_ms = max_await_time_ms
+        self.alive = True
+
+        resume_token = resume_after or start_after
+        if resume_token is None:
+            self._sequence = collection._sequence
+        else:
+            self._sequence = get_sequence(resume_token)
+            collection.check_history(self._sequence)
+
+    @property
+    def resume_token(self):
+        return get_resume_token(self._sequence)
+
+    def next_change(self):
+        for sequence, change in self.collection.get_changes(self._sequence):
+            self._sequence = sequence
+
+            if change['operationType'] == 'invalidate':
+                self.alive = False
+
+            change = copy.deepcopy(change)
+            if change['operationType'] == 'update' and self.full_document == 'updateLookup':
+                document = self.collection._documents.get(freeze(change['documentKey']['_id']))
+                change['fullDocument'] = copy.deepcopy(document)
+
+            if self.pipeline:
+                results = run_pipeline([change], self.pipeline, self.collection.database)
+                if not results:
+                    continue
+                change = results[0]
+
+            return change
+
+        return None
+
+    async def try_next(self):
+        '''
+        Returns the next change, or None if there was none within
+        `max_await_time_ms`.
+        '''
+        if not self.alive:
+            return None
+
+        change = self.next_change()
+        if change is None:
+            await self.collection.wait_for_change(
+                (self.max_await_time_ms or DEFAULT_AWAIT_TIME_MS) / 1000.0
+            )
+            change = self.next_change()
+        return change
+
+    async def next(self):
+        while self.alive:
+            change = await self.try_next()
+            if change is not None:
+                return change
+        raise StopAsyncIteration
+
+    async def close(self):
+        self.alive = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self.next()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+
+class MemoryBulkOperation(object):
+    '''
+    Bulk of writes run, in order, by `execute`.
+    '''
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.operations = []
+
+    def insert(self, document):
+        self.operations.append(('insert', document))
+
+    def find(self, spec):
+        return MemoryBulkSelector(self, spec)
+
+    async def execute(self, **write_concern):
+        result = {'nInserted': 0, 'nMatched': 0, 'nModified': 0, 'nUpserted': 0, 'nRemoved': 0, 'upserted': []}
+
+        for index, (kind, arguments) in enumerate(self.operations):
+            if kind == 'insert':
+                self.collection.insert_document(copy.deepcopy(arguments))
+                result['nInserted'] += 1
+            elif kind == 'update':
+                spec, document, upsert, multi = arguments
+                update = self.collection.update_documents(spec, document, upsert=upsert, multi=multi)
+                if update.get('upserted') is not None:
+                    result['nUpserted'] += 1
+                    result['upserted'].append({'index': index, '_id': update['upserted']})
+                else:
+                    result['nMatched'] += update['n']
+                    result['nModified'] += update['n']
+            elif kind == 'remove':
+                spec, multi = arguments
+                result['nRemoved'] += self.collection.remove_documents(spec, multi=multi)
+
+        self.operations = []
+        return result
+
+
+class MemoryBulkSelector(object):
+    def __init__(self, bulk, spec):
+        self.bulk = bulk
+        self.spec = spec
+        self._upsert = False
+
+    def upsert(self):
+        self._upsert = True
+        return self
+
+    def update_one(self, document):
+        self.bulk.operations.append(('update', (self.spec, document, self._upsert, False)))
+
+    def update(self, document):
+        self.bulk.operations.append(('update', (self.spec, document, self._upsert, True)))
+
+    def replace_one(self, document):
+        self.update_one(document)
+
+    def remove_one(self):
+        self.bulk.operations.append(('remove', (self.spec, False)))
+
+    def remove(self):
+        self.bulk.operations.append(('remove', (self.spec, True)))
+
+
+class MemoryCollection(object):
+    def __init__(self, database, name):
+        self.database = database
+        self.name = name
+        self.full_name = '%s.%s' % (database.name, name)
+        self._documents = OrderedDict()
+        self._indexes = {'_id_': {'key': [('_id', 1)], 'unique': True}}
+        self._sequence = 0
+        self._changes = deque(maxlen=CHANGE_HISTORY)
+        self._waiters = []
+
+    def documents(self):
+        return list(self._documents.values())
+
+    def record_change(self, operation_type, document=None, **fields):
+        self._sequence += 1
+        change = {
+            '_id': get_resume_token(self._sequence),
+            'operationType': operation_type,
+            'clusterTime': Timestamp(int(time.time()), self._sequence),
+            'ns': {'db': self.database.name, 'coll': self.name},
+        }
+        if document is not None:
+            change['documentKey'] = {'_id': document['_id']}
+        change.update(fields)
+        self._changes.append((self._sequence, change))
+
+        waiters, self._waiters = self._waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def get_changes(self, after):
+        self.check_history(after)
+        return [(sequence, change) for sequence, change in self._changes if sequence > after]
+
+    def check_history(self, sequence):
+        if self._changes and sequence < self._changes[0][0] - 1:
+            raise OperationFailure(
+                'Resume of change stream was not possible, as the resume point may no longer be in the oplog.', 286
+            )
+
+    async def wait_for_change(self, timeout):
+        waiter = asyncio.get_event_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait([waiter], timeout=timeout)
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def check_unique(self, document, ignore=None):
+        for name, index in self._indexes.items():
+            if not index.get('unique') or name == '_id_':
+                continue
+
+            key = [freeze(get_value(document, field)) for field, _ in index['key']]
+            for other in self._documents.values():
+                if other is ignore or other is document:
+                    continue
+                if [freeze(get_value(other, field)) for field, _ in index['key']] == key:
+                    raise DuplicateKeyError(
+                        'E11000 duplicate key error index: %s.$%s  dup key: { : %r }' % (
+                            self.full_name, name, key[0] if len(key) == 1 else key
+                        ), 11000
+                    )
+
+    def insert_document(self, document):
+        if '_id' not in document:
+            document['_id'] = ObjectId()
+
+        key = freeze(document['_id'])
+        if key in self._documents:
+            raise DuplicateKeyError(
+                'E11000 duplicate key error index: %s.$_id_  dup key: { : %r }' % (
+                    self.full_name, document['_id']
+                ), 11000
+            )
+
+        self.check_unique(document)
+        self._documents[key] = document
+        self.record_change('insert', document, fullDocument=copy.deepcopy(document))
+        return document['_id']
+
+    def replace_document(self, existing, replacement, operation_type='replace'):
+        self.check_unique(replacement, ignore=existing)
+        self._documents[freeze(existing['_id'])] = replacement
+
+        if operation_type == 'update':
+            self.record_change('update', existing, updateDescription={
+                'updatedFields': dict(
+                    (key, copy.deepcopy(value)) for key, value in replacement.items()
+                    if not equals(existing.get(key, MISSING), value)
+                ),
+                'removedFields': [key for key in existing if key not in replacement],
+            })
+        else:
+            self.record_change('replace', existing, fullDocument=copy.deepcopy(replacement))
+
+    def find_document(self, spec):
+        for document in self._documents.values():
+            if matches(document, spec):
+                return document
+        return None
+
+    def replace_all(self, documents):
+        for document in list(self._documents.values()):
+            self.record_change('delete', document)
+        self._documents = OrderedDict()
+        for document in documents:
+            self.insert_document(copy.deepcopy(document))
+
+    def update_documents(self, spec, document, upsert=False, multi=False):
+        matched = [existing for existing in self._documents.values() if matches(existing, spec)]
+        if not multi:
+            matched = matched[:1]
+
+        operation_type = 'update' if any(key.startswith('$') for key in document) else 'replace'
+        for existing in matched:
+            updated = apply_update(copy.deepcopy(existing), document)
+            self.replace_document(existing, updated, operation_type=operation_type)
+
+        if matched or not upsert:
+            return {'n': len(matched), 'nModified': len(matched), 'updatedExisting': bool(matched), 'ok': 1.0}
+
+        inserted = get_upsert_document(spec)
+        apply_update(inserted, document, inserting=True)
+        self.insert_document(inserted)
+        return {'n': 1, 'nModified': 0, 'updatedExisting': False, 'upserted': inserted['_id'], 'ok': 1.0}
+
+    def remove_documents(self, spec, multi=True):
+        removed = 0
+        for key, document in list(self._documents.items()):
+            if matches(document, spec or {}):
+                del self._documents[key]
+                self.record_change('delete', document)
+                removed += 1
+                if not multi:
+                    break
+        return removed
+
+    def explain_query(self, spec, returned):
+        fields = [field for field in (spec or {}) if not field.startswith('$')]
+        indexed = [
+            name for name, index in self._indexes.items()
+            if fields and index['key'][0][0] in fields
+        ]
+
+        if indexed:
+            plan = {'stage': 'FETCH', 'inputStage': {'stage': 'IXSCAN', 'indexName': indexed[0]}}
+            examined = returned
+        else:
+            plan = {'stage': 'COLLSCAN', 'filter': spec or {}}
+            examined = len(self._documents)
+
+        return {
+            'queryPlanner': {'winningPlan': plan},
+            'executionStats': {
+                'nReturned': returned,
+                'totalDocsExamined': examined,
+                'totalKeysExamined': returned if indexed else 0,
+                'executionTimeMillis': 0,
+            },
+        }
+
+    async def insert(self, doc_or_docs, manipulate=True, **write_concern):
+        documents = doc_or_docs if isinstance(doc_or_docs, list) else [doc_or_docs]
+
+        ids = []
+        for document in documents:
+            if '_id' not in document:
+                document['_id'] = ObjectId()
+            ids.append(self.insert_document(copy.deepcopy(document)))
+
+        return ids if isinstance(doc_or_docs, list) else ids[0]
+
+    async def save(self, document, **write_concern):
+        if '_id' in document:
+            await self.update({'_id': document['_id']}, document, upsert=True)
+            return document['_id']
+        return await self.insert(document)
+
+    async def update(self, spec, document, upsert=False, manipulate=False, multi=False, **write_concern):
+        return self.update_documents(spec, document, upsert=upsert, multi=multi)
+
+    async def remove(self, spec_or_id=None, multi=True, **write_concern):
+        if spec_or_id is not None and not isinstance(spec_or_id, dict):
+            spec_or_id = {'_id': spec_or_id}
+        return {'n': self.remove_documents(spec_or_id, multi=multi), 'ok': 1.0}
+
+    def with_options(self, codec_options=None, read_preference=None, write_concern=None, read_concern=None):
+        # there is a single copy of the data, every read preference reads it
+        return self
+
+    def find(self, spec=None, projection=None, skip=0, limit=0, sort=None, fields=None, **kwargs):
+        if 'read_preference' in kwargs:
+            # like pymongo 3, read preferences are set with with_options
+            raise TypeError("find() got an unexpected keyword argument 'read_preference'")
+        return MemoryCursor(self, spec, projection or fields, skip=skip, limit=limit, sort=sort)
+
+    async def find_one(self, spec_or_id=None, *args, **kwargs):
+        if spec_or_id is not None and not isinstance(spec_or_id, dict):
+            spec_or_id = {'_id': spec_or_id}
+
+        results = await self.find(spec_or_id, *args, **kwargs).limit(-1).to_list(length=1)
+        return results[0] if results else None
+
+    async def count(self):
+        return len(self._documents)
+
+    def aggregate(self, pipeline, **kwargs):
+        return MemoryCommandCursor(self, pipeline)
+
+    def watch(self, pipeline=None, **kwargs):
+        return MemoryChangeStream(self, pipeline, **kwargs)
+
+    async def ensure_index(self, key_or_list, unique=False, name=None, **kwargs):
+        keys = normalize_sort(key_or_list, 1)
+        name = name or get_index_name(keys)
+        index = {'key': keys, 'unique': unique}
+
+        if unique:
+            documents = self.documents()
+            for position, document in enumerate(documents):
+                for other in documents[position + 1:]:
+                    if all(get_value(document, field) == get_value(other, field) for field, _ in keys):
+                        raise DuplicateKeyError(
+                            'E11000 duplicate key error index: %s.$%s  dup key: { : %r }' % (
+                                self.full_name, name, get_value(document, keys[0][0])
+                            ), 11000
+                        )
+
+        self._indexes[name] = index
+        return name
+
+    create_index = ensure_index
+
+    async def drop_index(self, name):
+        self._indexes.pop(name, None)
+
+    async def drop_indexes(self):
+        self._indexes = dict((name, index) for name, index in self._indexes.items() if name == '_id_')
+
+    async def index_information(self):
+        return copy.deepcopy(self._indexes)
+
+    async def drop(self):
+        self.database.drop_collection_sync(self.name)
+
+    def initialize_unordered_bulk_op(self):
+        return MemoryBulkOperation(self)
+
+    initialize_ordered_bulk_op = initialize_unordered_bulk_op
+
+
+class MemoryDatabase(object):
+    def __init__(self, client, name):
+        self.client = client
+        self.connection = client
+        self.name = name
+        self._collections = {}
+
+    def __getitem__(self, name):
+        if name not in self._collections:
+            self._collections[name] = MemoryCollection(self, name)
+        return self._collections[name]
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return self[name]
+
+    def drop_collection_sync(self, name):
+        collection = self._collections.pop(getattr(name, 'name', name), None)
+        if collection is not None:
+            collection.record_change('drop')
+            collection.record_change('invalidate')
+
+    async def drop_collection(self, name):
+        self.drop_collection_sync(name)
+
+    async def collection_names(self, include_system_collections=True):
+        return [name for name, collection in self._collections.items() if collection._documents]
+
+    async def command(self, command, value=1, **kwargs):
+        if isinstance(command, dict):
+            kwargs.update(command)
+            command, value = next(iter(command.items()))
+
+        if command in ('ping', 'ismaster', 'isMaster'):
+            return {'ok': 1.0}
+
+        if command == 'aggregate' and kwargs.get('explain'):
+            pipeline = kwargs.get('pipeline', [])
+            spec = pipeline[0]['$match'] if pipeline and '$match' in pipeline[0] else {}
+            return {'stages': [{'$cursor': self[value].explain_query(spec, 0)}], 'ok': 1.0}
+
+        if command == 'count':
+            return {'n': len(self[value].find(kwargs.get('query')).get_matching()), 'ok': 1.0}
+
+        raise UnsupportedOperation("The memory backend doesn't support the %s command." % command)
+
+
+class MemoryClient(object):
+    '''
+    In-memory client accepting (and ignoring) the arguments of Motor's clients.
+    '''
+
+    connected = True
+
+    def __init__(self, *args, **kwargs):
+        self._databases = {}
+
+    def open_sync(self):
+        return self
+
+    def __getitem__(self, name):
+        if name not in self._databases:
+            self._databases[name] = MemoryDatabase(self, name)
+        return self._databases[name]
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return self[name]
+
+    async def drop_database(self, name):
+        self._databases.pop(getattr(name, 'name', name), None)
+
+    async def database_names(self):
+        return list(self._databases)
+
+    def disconnect(self):
+        pass
+
+    close = disconnect
@@ -0,0 +1,432 @@
+'''
+Evaluation of aggregation pipelines against lists of dicts, used by the
+in-memory backend.
+'''
+import copy
+import random
+
+from aiomotorengine.backends.query import (
+    MISSING, UnsupportedOperation, compare, equals, get_sort_key, get_value,
+    matches, set_value, sort_documents, unset_value
+)
+
+
+def freeze(value):
+    ''' Returns a hashable version of `value`, to group by it. '''
+    if isinstance(value, dict):
+        return tuple((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def get_path(document, path):
+    '''
+    Returns the value of a field path (``$a.b``): arrays of sub-documents
+    give the array of their values.
+    '''
+    value = document
+    for part in path.split('.'):
+        if isinstance(value, dict):
+            value = value.get(part, MISSING)
+        elif isinstance(value, list):
+            value = [
+                item.get(part) for item in value
+                if isinstance(item, dict) and part in item
+            ]
+        else:
+            return MISSING
+
+        if value is MISSING:
+            return MISSING
+    return value
+
+
+def evaluate(expression, document):
+    ''' Evaluates an aggregation expression for `document`. '''
+    if isinstance(expression, str) and expression.startswith('$'):
+        if expression == '$$ROOT' or expression == '$$CURRENT':
+            return document
+        value = get_path(document, expression[1:])
+        return None if value is MISSING else value
+
+    if isinstance(expression, list):
+        return [evaluate(item, document) for item in expression]
+
+    if isinstance(expression, dict):
+        if len(expression) == 1:
+            operator, argument = next(iter(expression.items()))
+            if operator.startswith('$'):
+                return evaluate_operator(operator, argument, document)
+        return dict((key, evaluate(value, document)) for key, value in expression.items())
+
+    return expression
+
+
+def evaluate_operator(operator, argument, document):
+    if operator == '$literal':
+        return argument
+
+    arguments = argument if isinstance(argument, list) else [argument]
+    values = [evaluate(item, document) for item in arguments]
+
+    if operator == '$add':
+        return None if None in values else sum(values)
+    if operator == '$subtract':
+        return None if None in values else values[0] - values[1]
+    if operator == '$multiply':
+        if None in values:
+            return None
+        result = 1
+        for value in values:
+            result *= value
+        return result
+    if operator == '$divide':
+        return None if None in values else values[0] / values[1]
+    if operator == '$mod':
+        return None if None in values else values[0] % values[1]
+    if operator == '$concat':
+        return None if None in values else ''.join(values)
+    if operator == '$toLower':
+        return (values[0] or '').lower()
+    if operator == '$toUpper':
+        return (values[0] or '').upper()
+    if operator == '$size':
+        return len(values[0])
+    if operator == '$ifNull':
+        return values[1] if values[0] is None else values[0]
+    if operator == '$cond':
+        if isinstance(argument, dict):
+            condition, then, otherwise = argument['if'], argument['then'], argument['else']
+        else:
+            condition, then, otherwise = argument
+        return evaluate(then if evaluate(condition, document) else otherwise, document)
+    if operator in ('$eq', '$ne'):
+        result = equals(values[0], values[1])
+        return result if operator == '$eq' else not result
+    if operator in ('$gt', '$gte', '$lt', '$lte'):
+        key, other = get_sort_key(values[0]), get_sort_key(values[1])
+        return {'$gt': key > other, '$gte': key >= other, '$lt': key < other, '$lte': key <= other}[operator]
+    if operator == '$and':
+        return all(values)
+    if operator == '$or':
+        return any(values)
+    if operator == '$not':
+        return not values[0]
+    if operator in ('$year', '$month', '$dayOfMonth', '$hour', '$minute', '$second'):
+        attribute = {
+            '$year': 'year', '$month': 'month', '$dayOfMonth': 'day',
+            '$hour': 'hour', '$minute': 'minute', '$second': 'second',
+        }[operator]
+        return getattr(values[0], attribute)
+    if operator in ('$sum', '$avg', '$min', '$max'):
+        items = values[0] if len(values) == 1 and isinstance(values[0], list) else values
+        return accumulate(operator, items)
+
+    raise UnsupportedOperation("The memory backend doesn't support the expression operator %s." % operator)
+
+
+def accumulate(operator, values):
+    if operator == '$sum':
+        return sum(value for value in values if isinstance(value, (int, float)) and not isinstance(value, bool))
+    if operator == '$avg':
+        numbers = [value for value in values if isinstance(value, (int, float)) and not isinstance(value, bool)]
+        return sum(numbers) / len(numbers) if numbers else None
+    if operator in ('$min', '$max'):
+        values = [value for value in values if value is not None]
+        if not values:
+            return None
+        return (min if operator == '$min' else max)(values, key=get_sort_key)
+    if operator == '$first':
+        return values[0] if values else None
+    if operator == '$last':
+        return values[-1] if values else None
+    if operator == '$push':
+        return list(values)
+    if operator == '$addToSet':
+        result = []
+        for value in values:
+            if not any(equals(value, item) for item in result):
+                result.append(value)
+        return result
+
+    raise UnsupportedOperation("The memory backend doesn't support the accumulator %s." % operator)
+
+
+def run_project(documents, projection):
+    include_id = projection.get('_id', 1) not in (0, False)
+    fields = dict((key, value) for key, value in projection.items() if key != '_id')
+    excluding = not fields or all(value in (0, False) for value in fields.values())
+
+    results = []
+    for document in documents:
+        if excluding:
+            result = copy.deepcopy(document)
+            for path in fields:
+                unset_value(result, path)
+            if not include_id:
+                result.pop('_id', None)
+            results.append(result)
+            continue
+
+        result = {}
+        if include_id and '_id' in document:
+            result['_id'] = document['_id']
+        if '_id' in projection and projection['_id'] not in (0, 1, False, True):
+            result['_id'] = evaluate(projection['_id'], document)
+
+        for path, value in fields.items():
+            if value in (1, True):
+                found = get_value(document, path, MISSING)
+                if found is not MISSING:
+                    set_value(result, path, copy.deepcopy(found))
+            else:
+                set_value(result, path, evaluate(value, document))
+        results.append(result)
+
+    return results
+
+
+def run_add_fields(documents, fields):
+    results = []
+    for document in documents:
+        result = copy.deepcopy(document)
+        for path, expression in fields.items():
+            set_value(result, path, evaluate(expression, document))
+        results.append(result)
+    return results
+
+
+def run_group(documents, specification):
+    groups = {}
+    keys = []
+
+    for document in documents:
+        group_id = evaluate(specification['_id'], document)
+        key = freeze(group_id)
+        if key not in groups:
+            groups[key] = (group_id, [])
+            keys.append(key)
+        groups[key][1].append(document)
+
+    results = []
+    for key in keys:
+        group_id, members = groups[key]
+        result = {'_id': group_id}
+        for field, accumulator in specification.items():
+            if field == '_id':
+                continue
+            operator, expression = next(iter(accumulator.items()))
+            result[field] = accumulate(operator, [evaluate(expression, member) for member in members])
+        results.append(result)
+
+    return results
+
+
+def run_unwind(documents, specification):
+    if isinstance(specification, str):
+        specification = {'path': specification}
+
+    path = specification['path'].lstrip('$')
+    preserve = specification.get('preserveNullAndEmptyArrays', False)
+    index_field = specification.get('includeArrayIndex')
+
+    results = []
+    for document in documents:
+        value = get_value(document, path, MISSING)
+
+        if not isinstance(value, list):
+            if value not in (MISSING, None) or preserve:
+                result = copy.deepcopy(document)
+                if index_field:
+                    result[index_field] = None
+                results.append(result)
+            continue
+
+        if not value and preserve:
+            result = copy.deepcopy(document)
+            unset_value(result, path)
+            if index_field:
+                result[index_field] = None
+            results.append(result)
+
+        for index, item in enumerate(value):
+            result = copy.deepcopy(document)
+            set_value(result, path, copy.deepcopy(item))
+            if index_field:
+                result[index_field] = index
+            results.append(result)
+
+    return results
+
+
+def run_lookup(documents, specification, database):
+    if 'pipeline' in specification:
+        raise UnsupportedOperation("The memory backend doesn't support $lookup with a pipeline.")
+
+    foreign = database[specification['from']].documents()
+    local_field, foreign_field = specification['localField'], specification['foreignField']
+
+    results = []
+    for document in documents:
+        local = get_value(document, local_field)
+        locals_ = local if isinstance(local, list) else [local]
+        result = copy.deepcopy(document)
+        result[specification['as']] = [
+            copy.deepcopy(item) for item in foreign
+            if any(matches(item, {foreign_field: value}) for value in locals_)
+        ]
+        results.append(result)
+    return results
+
+
+def run_bucket_auto(documents, specification):
+    group_by = specification['groupBy']
+    bucket_count = specification['buckets']
+    output = specification.get('output', {'count': {'$sum': 1}})
+
+    items = sorted(
+        ((evaluate(group_by, document), document) for document in documents),
+        key=lambda item: get_sort_key(item[0])
+    )
+    if not items:
+        return []
+
+    size = max(1, -(-len(items) // bucket_count))
+    buckets = []
+    start = 0
+    while start < len(items):
+        end = min(start + size, len(items))
+        # documents with the same value stay in the same bucket
+        while end < len(items) and compare(items[end][0], items[end - 1][0]) == 0:
+            end += 1
+        buckets.append(items[start:end])
+        start = end
+
+    results = []
+    for index, bucket in enumerate(buckets):
+        upper = buckets[index + 1][0][0] if index + 1 < len(buckets) else bucket[-1][0]
+        result = {'_id': {'min': bucket[0][0], 'max': upper}}
+        members = [document for _, document in bucket]
+        for field, accumulator in output.items():
+            operator, expression = next(iter(accumulator.items()))
+            result[field] = accumulate(operator, [evaluate(expression, member) for member in members])
+        results.append(result)
+
+    return results
+
+
+def bind_variables(expression, variables):
+    ''' Replaces the ``$$name`` references of `expression` with the values of `variables`. '''
+    if isinstance(expression, str) and expression.startswith('$$'):
+        name, _, path = expression[2:].partition('.')
+        if name in variables:
+            value = variables[name]
+            if path:
+                value = get_path(value, path)
+            return {'$literal': None if value is MISSING else value}
+        return expression
+
+    if isinstance(expression, list):
+        return [bind_variables(item, variables) for item in expression]
+
+    if isinstance(expression, dict):
+        return dict((key, bind_variables(value, variables)) for key, value in expression.items())
+
+    return expression
+
+
+def run_merge(documents, specification, database):
+    if isinstance(specification, str):
+        specification = {'into': specification}
+
+    target = database[specification['into']]
+    on = specification.get('on', '_id')
+    on = [on] if isinstance(on, str) else list(on)
+    when_matched = specification.get('whenMatched', 'merge')
+    when_not_matched = specification.get('whenNotMatched', 'insert')
+
+    for document in documents:
+        query = dict((field, get_value(document, field)) for field in on)
+        existing = target.find_document(query)
+
+        if existing is None:
+            if when_not_matched == 'insert':
+                target.insert_document(copy.deepcopy(document))
+            elif when_not_matched == 'fail':
+                raise ValueError("$merge found no document matching %r." % query)
+            continue
+
+        if when_matched == 'replace':
+            replacement = copy.deepcopy(document)
+            replacement['_id'] = existing['_id']
+            target.replace_document(existing, replacement)
+        elif when_matched == 'merge':
+            merged = dict(existing)
+            merged.update(copy.deepcopy(document))
+            merged['_id'] = existing['_id']
+            target.replace_document(existing, merged)
+        elif when_matched == 'fail':
+            raise ValueError("$merge found a document matching %r." % query)
+        elif isinstance(when_matched, list):
+            pipeline = bind_variables(when_matched, {'new': document})
+            merged = run_pipeline([copy.deepcopy(existing)], pipeline, database)[0]
+            merged['_id'] = existing['_id']
+            target.replace_document(existing, merged)
+        elif when_matched != 'keepExisting':
+            raise UnsupportedOperation("The memory backend doesn't support $merge with whenMatched %r." % when_matched)
+
+
+def run_pipeline(documents, pipeline, database):
+    '''
+    Runs the aggregation `pipeline` on `documents` (dicts of `database`).
+    '''
+    documents = list(documents)
+
+    for stage in pipeline:
+        name, specification = next(iter(stage.items()))
+
+        if name == '$match':
+            documents = [document for document in documents if matches(document, specification)]
+        elif name == '$project':
+            documents = run_project(documents, specification)
+        elif name in ('$addFields', '$set'):
+            documents = run_add_fields(documents, specification)
+        elif name == '$unset':
+            fields = [specification] if isinstance(specification, str) else specification
+            documents = run_project(documents, dict((field, 0) for field in fields))
+        elif name == '$group':
+            documents = run_group(documents, specification)
+        elif name == '$sort':
+            documents = sort_documents(documents, specification)
+        elif name == '$skip':
+            documents = documents[specification:]
+        elif name == '$limit':
+            documents = documents[:specification]
+        elif name == '$unwind':
+            documents = run_unwind(documents, specification)
+        elif name == '$count':
+            documents = [{specification: len(documents)}] if documents else []
+        elif name == '$sample':
+            documents = random.sample(documents, min(specification['size'], len(documents)))
+        elif name == '$replaceRoot':
+            documents = [evaluate(specification['newRoot'], document) for document in documents]
+        elif name == '$lookup':
+            documents = run_lookup(documents, specification, database)
+        elif name == '$facet':
+            documents = [dict(
+                (facet, run_pipeline(documents, sub_pipeline, database))
+                for facet, sub_pipeline in specification.items()
+            )]
+        elif name == '$bucketAuto':
+            documents = run_bucket_auto(documents, specification)
+        elif name == '$merge':
+            run_merge(documents, specification, database)
+            documents = []
+        elif name == '$out':
+            database[specification].replace_all(documents)
+            documents = []
+        else:
+            raise UnsupportedOperation("The memory backend doesn't support the %s stage." % name)
+
+    return documents
@@ -0,0 +1,443 @@
+'''
+Evaluation of MongoDB query, sort, projection and update documents
+against plain dicts, used by the in-memory backend and by the predicates
+compiled from Q trees.
+'''
+import copy
+import re
+from datetime import datetime
+from decimal import Decimal
+
+from bson import ObjectId
+
+MISSING = object()
+
+PATTERN_TYPE = type(re.compile(''))
+
+REGEX_FLAGS = {'i': re.IGNORECASE, 'm': re.MULTILINE, 's': re.DOTALL, 'x': re.VERBOSE}
+
+
+class UnsupportedOperation(NotImplementedError):
+    pass
+
+
+def get_type_order(value):
+    ''' Position of the type of `value` in MongoDB's comparison order. '''
+    if value is None or value is MISSING:
+        return 1
+    if isinstance(value, bool):
+        return 8
+    if isinstance(value, (int, float, Decimal)):
+        return 2
+    if isinstance(value, str):
+        return 3
+    if isinstance(value, dict):
+        return 4
+    if isinstance(value, (list, tuple)):
+        return 5
+    if isinstance(value, bytes):
+        return 6
+    if isinstance(value, ObjectId):
+        return 7
+    if isinstance(value, datetime):
+        return 9
+    if isinstance(value, PATTERN_TYPE):
+        return 11
+    return 20
+
+
+def get_sort_key(value):
+    order = get_type_order(value)
+
+    if order == 1:
+        return (order, 0)
+    if order == 4:
+        return (order, tuple((key, get_sort_key(item)) for key, item in value.items()))
+    if order == 5:
+        return (order, tuple(get_sort_key(item) for item in value))
+    if order == 11:
+        return (order, value.pattern)
+    if order == 20:
+        return (order, str(value))
+
+    return (order, value)
+
+
+def compare(value, other):
+    '''
+    Compares two values like MongoDB does for `$gt` and friends: returns
+    None for values of different types, which never match.
+    '''
+    if get_type_order(value) != get_type_order(other) or value is None or other is None:
+        return None
+
+    key, other_key = get_sort_key(value), get_sort_key(other)
+    return (key > other_key) - (key < other_key)
+
+
+def equals(value, other):
+    if get_type_order(value) != get_type_order(other):
+        return False
+    if isinstance(value, (list, tuple)):
+        return len(value) == len(other) and all(equals(a, b) for a, b in zip(value, other))
+    if isinstance(value, dict):
+        return list(value) == list(other) and all(equals(value[key], other[key]) for key in value)
+    return value == other
+
+
+def get_values(document, parts):
+    '''
+    Returns every value found at the dotted path `parts` of `document`,
+    descending into arrays like MongoDB does (``a.b`` finds the `b` of
+    every sub-document of the array `a`).
+    '''
+    if not parts:
+        return [document]
+
+    head, rest = parts[0], parts[1:]
+
+    if isinstance(document, dict):
+        if head not in document:
+            return []
+        return get_values(document[head], rest)
+
+    if isinstance(document, list):
+        values = []
+        if head.isdigit() and int(head) < len(document):
+            values.extend(get_values(document[int(head)], rest))
+        for item in document:
+            if isinstance(item, dict):
+                values.extend(get_values(item, parts))
+        return values
+
+    return []
+
+
+def get_value(document, path, default=None):
+    ''' Returns the value at the dotted `path` of `document`, without descending into arrays. '''
+    for part in path.split('.'):
+        if isinstance(document, dict) and part in document:
+            document = document[part]
+        elif isinstance(document, list) and part.isdigit() and int(part) < len(document):
+            document = document[int(part)]
+        else:
+            return default
+    return document
+
+
+def expand(values):
+    ''' The candidate values of a path: every value and the items of the arrays. '''
+    expanded = []
+    for value in values:
+        if isinstance(value, list):
+            expanded.extend(value)
+        expanded.append(value)
+    return expanded
+
+
+def matches_value(candidate, expected):
+    if isinstance(expected, PATTERN_TYPE):
+        return isinstance(candidate, str) and expected.search(candidate) is not None
+    return equals(candidate, expected)
+
+
+def matches_equality(values, expected):
+    if not values:
+        return expected is None
+    return any(matches_value(candidate, expected) for candidate in expand(values))
+
+
+def compile_regex(pattern, options=''):
+    if isinstance(pattern, PATTERN_TYPE):
+        return pattern
+
+    flags = 0
+    for option in options or '':
+        flags |= REGEX_FLAGS.get(option, 0)
+    return re.compile(pattern, flags)
+
+
+def is_operator_document(value):
+    return isinstance(value, dict) and bool(value) and all(key.startswith('$') for key in value)
+
+
+def matches_operators(values, operators):
+    for operator, argument in operators.items():
+        if operator == '$options':
+            continue
+
+        if operator == '$eq':
+            result = matches_equality(values, argument)
+        elif operator == '$ne':
+            result = not matches_equality(values, argument)
+        elif operator in ('$gt', '$gte', '$lt', '$lte'):
+            result = any(
+                comparison is not None and {
+                    '$gt': comparison > 0, '$gte': comparison >= 0,
+                    '$lt': comparison < 0, '$lte': comparison <= 0,
+                }[operator]
+                for comparison in (compare(candidate, argument) for candidate in expand(values))
+            )
+        elif operator == '$in':
+            result = any(matches_equality(values, expected) for expected in argument)
+        elif operator == '$nin':
+            result = not any(matches_equality(values, expected) for expected in argument)
+        elif operator == '$exists':
+            result = bool(values) == bool(argument)
+        elif operator == '$not':
+            if isinstance(argument, (PATTERN_TYPE, str)):
+                argument = {'$regex': argument}
+            result = not matches_operators(values, argument)
+        elif operator == '$regex':
+            regex = compile_regex(argument, operators.get('$options'))
+            result = any(matches_value(candidate, regex) for candidate in expand(values))
+        elif operator == '$size':
+            result = any(isinstance(value, list) and len(value) == argument for value in values)
+        elif operator == '$all':
+            result = any(
+                isinstance(value, list) and all(
+                    any(matches_value(item, expected) for item in value) for expected in argument
+                )
+                for value in values
+            ) if argument else False
+        elif operator == '$elemMatch':
+            result = any(
+                isinstance(value, list) and any(matches_element(item, argument) for item in value)
+                for value in values
+            )
+        elif operator == '$mod':
+            divisor, remainder = argument
+            result = any(
+                isinstance(candidate, (int, float)) and not isinstance(candidate, bool) and
+                candidate % divisor == remainder
+                for candidate in expand(values)
+            )
+        else:
+            raise UnsupportedOperation("The memory backend doesn't support the query operator %s." % operator)
+
+        if not result:
+            return False
+
+    return True
+
+
+def matches_element(item, query):
+    if is_operator_document(query) and not any(key in ('$and', '$or', '$nor') for key in query):
+        return matches_operators([item], query)
+    return isinstance(item, dict) and matches(item, query)
+
+
+def matches_condition(document, path, condition):
+    values = get_values(document, path.split('.'))
+
+    if is_operator_document(condition):
+        return matches_operators(values, condition)
+
+    return matches_equality(values, condition)
+
+
+def matches(document, query):
+    '''
+    Tells whether `document` matches the MongoDB `query`.
+    '''
+    for key, condition in (query or {}).items():
+        if key == '$and':
+            result = all(matches(document, sub_query) for sub_query in condition)
+        elif key == '$or':
+            result = any(matches(document, sub_query) for sub_query in condition)
+        elif key == '$nor':
+            result = not any(matches(document, sub_query) for sub_query in condition)
+        elif key.startswith('$'):
+            raise UnsupportedOperation("The memory backend doesn't support the query operator %s." % key)
+        else:
+            result = matches_condition(document, key, condition)
+
+        if not result:
+            return False
+
+    return True
+
+
+def normalize_sort(sort, direction=None):
+    if sort is None:
+        return []
+    if isinstance(sort, str):
+        return [(sort, direction or 1)]
+    if isinstance(sort, dict):
+        return list(sort.items())
+    return [(key, value) for key, value in sort]
+
+
+def sort_documents(documents, sort):
+    '''
+    Sorts `documents` by the (path, direction) pairs of `sort`. Arrays sort
+    by their smallest item ascending and by their largest item descending.
+    '''
+    documents = list(documents)
+
+    for path, direction in reversed(normalize_sort(sort)):
+        descending = direction == -1
+
+        def key(document, path=path, descending=descending):
+            values = expand(get_values(document, path.split('.')))
+            values = [value for value in values if not isinstance(value, list)] or [None]
+            keys = [get_sort_key(value) for value in values]
+            return max(keys) if descending else min(keys)
+
+        documents.sort(key=key, reverse=descending)
+
+    return documents
+
+
+def set_value(document, path, value):
+    parts = path.split('.')
+    for part in parts[:-1]:
+        if isinstance(document, list):
+            document = document[int(part)]
+            continue
+        if not isinstance(document.get(part), (dict, list)):
+            document[part] = {}
+        document = document[part]
+
+    if isinstance(document, list):
+        index = int(parts[-1])
+        while len(document) <= index:
+            document.append(None)
+        document[index] = value
+    else:
+        document[parts[-1]] = value
+
+
+def unset_value(document, path):
+    parts = path.split('.')
+    parent = get_value(document, '.'.join(parts[:-1])) if len(parts) > 1 else document
+
+    if isinstance(parent, dict):
+        parent.pop(parts[-1], None)
+    elif isinstance(parent, list) and parts[-1].isdigit() and int(parts[-1]) < len(parent):
+        parent[int(parts[-1])] = None
+
+
+def project(document, projection):
+    '''
+    Applies a find projection (inclusion or exclusion of paths).
+    '''
+    if not projection:
+        return document
+
+    if isinstance(projection, (list, tuple)):
+        projection = dict((field, 1) for field in projection)
+
+    include_id = projection.get('_id', 1)
+    fields = dict((key, value) for key, value in projection.items() if key != '_id')
+
+    if fields and all(value in (1, True) for value in fields.values()):
+        result = {}
+        if include_id and '_id' in document:
+            result['_id'] = document['_id']
+        for path in fields:
+            value = get_value(document, path, MISSING)
+            if value is not MISSING:
+                set_value(result, path, value)
+        return result
+
+    result = copy.deepcopy(document)
+    for path in fields:
+        unset_value(result, path)
+    if not include_id:
+        result.pop('_id', None)
+    return result
+
+
+def get_upsert_document(query):
+    ''' The fields of `query` set by equality, which an upsert inserts. '''
+    document = {}
+
+    for key, condition in (query or {}).items():
+        if key == '$and':
+            for sub_query in condition:
+                document.update(get_upsert_document(sub_query))
+        elif not key.startswith('$') and not is_operator_document(condition):
+            set_value(document, key, copy.deepcopy(condition))
+        elif is_operator_document(condition) and '$eq' in condition:
+            set_value(document, key, copy.deepcopy(condition['$eq']))
+
+    return document
+
+
+def add_numbers(value, increment, path):
+    if value is None:
+        return increment
+    if not isinstance(value, (int, float, Decimal)) or isinstance(value, bool):
+        raise ValueError("Cannot apply $inc to a value of non-numeric type (%s)." % path)
+    return value + increment
+
+
+def apply_update(document, update, inserting=False):
+    '''
+    Applies the MongoDB `update` to `document` in place. An update without
+    operators replaces the document (keeping its `_id`).
+    '''
+    if not any(key.startswith('$') for key in update):
+        document_id = document.get('_id')
+        document.clear()
+        document.update(copy.deepcopy(update))
+        if document_id is not None:
+            document['_id'] = document_id
+        return document
+
+    for operator, fields in update.items():
+        for path, argument in fields.items():
+            argument = copy.deepcopy(argument)
+            current = get_value(document, path, MISSING)
+
+            if operator == '$set':
+                set_value(document, path, argument)
+            elif operator == '$setOnInsert':
+                if inserting:
+                    set_value(document, path, argument)
+            elif operator == '$unset':
+                unset_value(document, path)
+            elif operator == '$inc':
+                set_value(document, path, add_numbers(None if current is MISSING else current, argument, path))
+            elif operator == '$mul':
+                set_value(document, path, (0 if current is MISSING else current) * argument)
+            elif operator in ('$min', '$max'):
+                comparison = None if current is MISSING else compare(argument, current)
+                if current is MISSING or (comparison is not None and (
+                    comparison < 0 if operator == '$min' else comparison > 0
+                )):
+                    set_value(document, path, argument)
+            elif operator == '$rename':
+                if current is not MISSING:
+                    unset_value(document, path)
+                    set_value(document, argument, current)
+            elif operator in ('$push', '$addToSet'):
+                items = current if isinstance(current, list) else []
+                if current is MISSING:
+                    set_value(document, path, items)
+                elif not isinstance(current, list):
+                    raise ValueError("Cannot apply %s to a non-array field (%s)." % (operator, path))
+
+                values = argument['$each'] if isinstance(argument, dict) and '$each' in argument else [argument]
+                for value in values:
+                    if operator == '$push' or not any(equals(item, value) for item in items):
+                        items.append(value)
+            elif operator == '$pull':
+                if isinstance(current, list):
+                    current[:] = [
+                        item for item in current
+                        if not (matches_element(item, argument) if isinstance(argument, dict) else equals(item, argument))
+                    ]
+            elif operator == '$pullAll':
+                if isinstance(current, list):
+                    current[:] = [item for item in current if not any(equals(item, value) for value in argument)]
+            elif operator == '$pop':
+                if isinstance(current, list) and current:
+                    current.pop(0 if argument == -1 else -1)
+            elif operator == '$currentDate':
+                set_value(document, path, datetime.utcnow())
+            else:
+                raise UnsupportedOperation("The memory backend doesn't support the update operator %s." % operator)
+
+    return document
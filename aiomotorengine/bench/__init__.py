@@ -0,0 +1,8 @@
+'''
+Load generator measuring how many operations per second one process
+sustains through aiomotorengine, and through raw Motor for comparison.
+
+Usage::
+
+    python -m aiomotorengine.bench --workload read_heavy --concurrency 50 --duration 30
+'''
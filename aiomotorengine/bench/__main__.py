@@ -0,0 +1,100 @@
+import argparse
+import asyncio
+import json
+import sys
+
+from aiomotorengine import connect
+from aiomotorengine.bench import __doc__ as description
+from aiomotorengine.bench.runner import LoadRunner
+from aiomotorengine.bench.workloads import (
+    WORKLOADS, BenchUser, Operations, RawOperations, seed
+)
+from aiomotorengine.connection import cleanup
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(prog='python -m aiomotorengine.bench', description=description.strip())
+    parser.add_argument('--workload', choices=sorted(WORKLOADS), default='mixed')
+    parser.add_argument('--mode', choices=('orm', 'raw', 'both'), default='both')
+    parser.add_argument('--concurrency', type=int, default=10, help='concurrent coroutines')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds per mode')
+    parser.add_argument('--documents', type=int, default=10000, help='users seeded before running')
+    parser.add_argument(
+        '--backend', choices=('motor', 'memory'), default='motor',
+        help="'memory' measures the library alone, without a server"
+    )
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=27017)
+    parser.add_argument('--db', default='aiomotorengine_bench')
+    parser.add_argument('--json', dest='json_output', help='file to write the report to')
+    return parser
+
+
+def print_report(mode, report):
+    print("\n%s: %.1f ops/s, %d errors" % (
+        mode, report['total']['ops_per_second'], report['total']['errors']
+    ))
+    print("%-10s %10s %10s %10s %10s %10s" % ('operation', 'ops/s', 'p50 ms', 'p95 ms', 'p99 ms', 'orm share'))
+
+    for name, stats in sorted(report.items()):
+        if name == 'total' or not stats['operations']:
+            continue
+        share = '-' if stats['orm_share'] is None else '%.0f%%' % (stats['orm_share'] * 100)
+        print("%-10s %10.1f %10.2f %10.2f %10.2f %10s" % (
+            name, stats['ops_per_second'], stats['p50_ms'], stats['p95_ms'], stats['p99_ms'], share
+        ))
+
+
+async def run(options):
+    db = connect(options.db, host=options.host, port=options.port, backend=options.backend)
+    workload = WORKLOADS[options.workload]
+    reports = {}
+
+    try:
+        ids = await seed(options.documents)
+
+        modes = ['orm', 'raw'] if options.mode == 'both' else [options.mode]
+        for mode in modes:
+            if mode == 'orm':
+                operations = Operations(ids)
+            else:
+                operations = RawOperations(ids, db[BenchUser.__collection__])
+
+            runner = LoadRunner(operations, workload, options.concurrency, options.duration)
+            reports[mode] = await runner.run()
+            print_report(mode, reports[mode])
+
+        if 'orm' in reports and 'raw' in reports:
+            raw_throughput = reports['raw']['total']['ops_per_second']
+            if raw_throughput:
+                reports['orm_throughput_ratio'] = reports['orm']['total']['ops_per_second'] / raw_throughput
+                print("\nthe ORM sustains %.0f%% of the raw Motor throughput" % (
+                    reports['orm_throughput_ratio'] * 100
+                ))
+
+        await db[BenchUser.__collection__].drop()
+    finally:
+        cleanup()
+
+    return reports
+
+
+def main(argv=None):
+    options = get_parser().parse_args(argv)
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        reports = loop.run_until_complete(run(options))
+    finally:
+        loop.close()
+
+    if options.json_output:
+        with open(options.json_output, 'w') as output:
+            json.dump(reports, output, indent=2, sort_keys=True)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,104 @@
+import asyncio
+import math
+import random
+import time
+
+from aiomotorengine.monitoring import register_listener, unregister_listener
+
+
+def get_percentile(sorted_samples, percentile):
+    ''' Nearest-rank percentile of already sorted samples. '''
+    if not sorted_samples:
+        return None
+
+    rank = int(math.ceil(percentile / 100.0 * len(sorted_samples))) - 1
+    return sorted_samples[min(max(rank, 0), len(sorted_samples) - 1)]
+
+
+class OrmTimeListener(object):
+    '''
+    Operation listener adding up, per operation, the total time and the time
+    spent outside the network (see `OperationEvent.orm_time`).
+    '''
+
+    def __init__(self):
+        self.durations = {}
+        self.orm_times = {}
+
+    def __call__(self, event):
+        self.durations[event.operation] = self.durations.get(event.operation, 0.0) + event.duration
+        self.orm_times[event.operation] = self.orm_times.get(event.operation, 0.0) + event.orm_time
+
+    def get_share(self, operation):
+        duration = self.durations.get(operation)
+        if not duration:
+            return None
+        return self.orm_times[operation] / duration
+
+
+class LoadRunner(object):
+    '''
+    Runs `concurrency` coroutines, each picking operations of `operations`
+    at random with the weights of `workload`, for `duration` seconds.
+    '''
+
+    def __init__(self, operations, workload, concurrency=10, duration=10.0):
+        self.operations = operations
+        self.workload = workload
+        self.concurrency = concurrency
+        self.duration = duration
+        self.latencies = dict((name, []) for name in workload)
+        self.errors = dict((name, 0) for name in workload)
+
+    async def worker(self, deadline):
+        names = list(self.workload)
+        weights = [self.workload[name] for name in names]
+        functions = dict((name, getattr(self.operations, name)) for name in names)
+
+        while time.perf_counter() < deadline:
+            name = random.choices(names, weights)[0]
+            started = time.perf_counter()
+            try:
+                await functions[name]()
+            except Exception:
+                self.errors[name] += 1
+                continue
+            self.latencies[name].append(time.perf_counter() - started)
+
+    async def run(self):
+        listener = OrmTimeListener()
+        register_listener(listener)
+
+        started = time.perf_counter()
+        try:
+            deadline = started + self.duration
+            await asyncio.gather(*[self.worker(deadline) for _ in range(self.concurrency)])
+        finally:
+            unregister_listener(listener)
+        elapsed = time.perf_counter() - started
+
+        return self.get_report(elapsed, listener)
+
+    def get_report(self, elapsed, listener):
+        report = {'total': {
+            'operations': sum(len(samples) for samples in self.latencies.values()),
+            'errors': sum(self.errors.values()),
+        }}
+        report['total']['ops_per_second'] = report['total']['operations'] / elapsed
+
+        for name, samples in self.latencies.items():
+            samples.sort()
+            report[name] = {
+                'operations': len(samples),
+                'errors': self.errors[name],
+                'ops_per_second': len(samples) / elapsed,
+                'p50_ms': self.to_ms(get_percentile(samples, 50)),
+                'p95_ms': self.to_ms(get_percentile(samples, 95)),
+                'p99_ms': self.to_ms(get_percentile(samples, 99)),
+                'orm_share': listener.get_share(name),
+            }
+
+        return report
+
+    def to_ms(self, seconds):
+        return seconds * 1000.0 if seconds is not None else None
@@ -0,0 +1,103 @@
+import random
+from datetime import datetime
+
+from bson import ObjectId
+
+from aiomotorengine import Document, StringField, IntField, DateTimeField, ListField
+
+PAGE_SIZE = 20
+
+# relative weights of the operations of each workload
+WORKLOADS = {
+    'read_heavy': {'get': 80, 'find_all': 15, 'save': 5},
+    'write_heavy': {'save': 70, 'get': 20, 'find_all': 10},
+    'mixed': {'get': 45, 'find_all': 20, 'save': 35},
+    'get': {'get': 1},
+    'find_all': {'find_all': 1},
+    'save': {'save': 1},
+}
+
+
+class BenchUser(Document):
+    __collection__ = 'bench_users'
+
+    name = StringField(required=True)
+    email = StringField()
+    age = IntField()
+    tags = ListField(StringField())
+    created_at = DateTimeField()
+
+
+def make_user(index):
+    return BenchUser(
+        name='user %d' % index, email='user%d@example.com' % index,
+        age=18 + index % 60, tags=['tag-%d' % (index % 7), 'tag-%d' % (index % 11)],
+        created_at=datetime.utcnow()
+    )
+
+
+def make_user_son(index):
+    ''' The SON of `make_user(index)`, built without the ORM for the raw operations. '''
+    return {
+        '_id': ObjectId(),
+        'name': 'user %d' % index, 'email': 'user%d@example.com' % index,
+        'age': 18 + index % 60, 'tags': ['tag-%d' % (index % 7), 'tag-%d' % (index % 11)],
+        'created_at': datetime.utcnow(),
+    }
+
+
+class Operations(object):
+    '''
+    The operations of a workload, run through the ORM.
+    '''
+
+    name = 'orm'
+
+    def __init__(self, ids):
+        self.ids = ids
+
+    def random_id(self):
+        return random.choice(self.ids)
+
+    async def get(self):
+        await BenchUser.objects.get(self.random_id())
+
+    async def find_all(self):
+        await BenchUser.objects.filter(age__gte=random.randint(18, 77)).limit(PAGE_SIZE).find_all()
+
+    async def save(self):
+        await make_user(random.randint(0, 1000000)).save()
+
+
+class RawOperations(Operations):
+    '''
+    The same operations through raw Motor, as a baseline.
+    '''
+
+    name = 'raw'
+
+    def __init__(self, ids, collection):
+        super(RawOperations, self).__init__(ids)
+        self.collection = collection
+
+    async def get(self):
+        await self.collection.find_one({'_id': self.random_id()})
+
+    async def find_all(self):
+        cursor = self.collection.find({'age': {'$gte': random.randint(18, 77)}}, limit=PAGE_SIZE)
+        await cursor.to_list(length=PAGE_SIZE)
+
+    async def save(self):
+        await self.collection.insert(make_user_son(random.randint(0, 1000000)))
+
+
+async def seed(document_count):
+    '''
+    Recreates the collection with `document_count` users; returns their ids.
+    '''
+    collection = BenchUser.objects.coll()
+    await collection.drop()
+    await collection.create_index('age')
+
+    users = await BenchUser.objects.bulk_insert([make_user(index) for index in range(document_count)])
+    return [user._id for user in users]
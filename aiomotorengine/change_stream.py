@@ -0,0 +1,229 @@
+from datetime import datetime
+
+from easydict import EasyDict as edict
+
+DEFAULT_TOKEN_COLLECTION = '__resume_tokens__'
+
+# the methods of a driver change stream used here (Motor 2.1+, pymongo 3.9+)
+CHANGE_STREAM_METHODS = ('try_next', 'next', 'close', 'alive', 'resume_token')
+
+
+def open_change_stream(collection, pipeline=None, **arguments):
+    '''
+    Opens a change stream on `collection` with the driver `watch`.
+
+    Change streams need MongoDB 3.6+ and Motor 2.1+ (pymongo 3.9+). The
+    Motor 0.5 / pymongo 2.8 this package is pinned to has no `watch`, so
+    with it this raises RuntimeError; the memory backend supports them.
+    '''
+    if getattr(collection, 'watch', None) is None:
+        raise RuntimeError(
+            "Change streams require Motor 2.1+ (pymongo 3.9+) and MongoDB 3.6+: "
+            "the collections of the installed driver have no 'watch'."
+        )
+
+    stream = collection.watch(pipeline, **arguments)
+
+    missing = [name for name in CHANGE_STREAM_METHODS if not hasattr(stream, name)]
+    if missing:
+        raise RuntimeError(
+            "Change streams require Motor 2.1+ (pymongo 3.9+): the change streams "
+            "of the installed driver have no %s." % ", ".join("'%s'" % name for name in missing)
+        )
+
+    return stream
+
+
+def get_change_filter(query):
+    '''
+    Returns the filter of change events whose full document matches `query`
+    (a compiled filter of the document class).
+    '''
+    change_filter = {}
+
+    for key, value in query.items():
+        if key in ('$and', '$or', '$nor'):
+            change_filter[key] = [get_change_filter(item) for item in value]
+        elif key.startswith('$'):
+            change_filter[key] = value
+        else:
+            change_filter['fullDocument.%s' % key] = value
+
+    return change_filter
+
+
+class ChangeEvent(object):
+    '''
+    A change of the watched collection:
+
+    * `operation_type` - ``insert``, ``update``, ``replace``, ``delete``,
+      ``drop``, ``rename``, ``dropDatabase`` or ``invalidate``;
+    * `document_id` - the `_id` of the changed document;
+    * `document` - the full document, as an instance of the document class,
+      if the event has one (see the `full_document` argument of `watch`);
+    * `update_description` - the `updated_fields` and `removed_fields`
+      of ``update`` events;
+    * `resume_token` - the token to resume the stream after this event;
+    * `cluster_time` and `raw`, the event as sent by the server.
+    '''
+
+    def __init__(self, document_class, change):
+        self.raw = change
+        self.operation_type = change['operationType']
+        self.resume_token = change['_id']
+        self.cluster_time = change.get('clusterTime')
+        self.document_id = change.get('documentKey', {}).get('_id')
+
+        full_document = change.get('fullDocument')
+        self.document = None if full_document is None else document_class.from_son(full_document)
+
+        self.update_description = None
+        if 'updateDescription' in change:
+            self.update_description = edict({
+                'updated_fields': change['updateDescription'].get('updatedFields', {}),
+                'removed_fields': change['updateDescription'].get('removedFields', []),
+            })
+
+    def __repr__(self):
+        return '<ChangeEvent %s %r>' % (self.operation_type, self.document_id)
+
+
+class ResumeTokenStore(object):
+    '''
+    Keeps the resume token of the change stream consumer `name` in a
+    collection, so it continues where it stopped after a restart.
+
+    Subclass it and override `load` and `save` to keep the tokens elsewhere.
+    '''
+
+    def __init__(self, name, collection=DEFAULT_TOKEN_COLLECTION):
+        self.name = name
+        self.collection = collection
+
+    async def load(self, database):
+        state = await database[self.collection].find_one({'_id': self.name})
+        if state is None:
+            return None
+        return state.get('token')
+
+    async def save(self, database, token):
+        await database[self.collection].update(
+            {'_id': self.name},
+            {'$set': {'token': token, 'saved_at': datetime.utcnow()}},
+            upsert=True
+        )
+
+
+class ChangeStream(object):
+    '''
+    Async iterator of the :class:`ChangeEvent` of a queryset, returned by
+    `QuerySet.watch`. The server change stream is opened by `open` (called
+    by ``async with``) or by the first read: earlier changes are not seen,
+    unless resuming. Requires Motor 2.1+ (see `open_change_stream`).
+
+    With a `token_store`, the stream resumes from the saved token and saves
+    the token of each event once the next one is asked for (or the stream
+    closed), so an event is never skipped, but the last one may be seen
+    again after a crash.
+    '''
+
+    def __init__(
+        self, queryset, pipeline, full_document=None, resume_after=None, start_after=None,
+        batch_size=None, max_await_time_ms=None, token_store=None, alias=None
+    ):
+        self.queryset = queryset
+        self.pipeline = pipeline
+        self.full_document = full_document
+        self.resume_after = resume_after
+        self.start_after = start_after
+        self.batch_size = batch_size
+        self.max_await_time_ms = max_await_time_ms
+        self.token_store = token_store
+        self.alias = alias
+
+        self._stream = None
+        self._unsaved_token = None
+
+    @property
+    def document_class(self):
+        return self.queryset.__klass__
+
+    @property
+    def resume_token(self):
+        '''
+        The token to resume after the last event returned, which can be
+        kept (it is a BSON document) and given to `watch` as `resume_after`.
+        '''
+        if self._stream is None:
+            return self.start_after or self.resume_after
+        return self._stream.resume_token
+
+    @property
+    def alive(self):
+        return self._stream is None or self._stream.alive
+
+    def get_watch_arguments(self):
+        arguments = {}
+        for name in ('full_document', 'resume_after', 'start_after', 'batch_size', 'max_await_time_ms'):
+            value = getattr(self, name)
+            if value is not None:
+                arguments[name] = value
+        return arguments
+
+    async def open(self):
+        if self._stream is not None:
+            return
+
+        collection = self.queryset.coll(self.alias)
+        if self.token_store is not None and self.resume_after is None and self.start_after is None:
+            self.resume_after = await self.token_store.load(collection.database)
+
+        self._stream = open_change_stream(collection, self.pipeline, **self.get_watch_arguments())
+
+    async def save_token(self):
+        if self.token_store is None or self._unsaved_token is None:
+            return
+
+        await self.token_store.save(self.queryset.coll(self.alias).database, self._unsaved_token)
+        self._unsaved_token = None
+
+    def get_event(self, change):
+        if change is None:
+            return None
+
+        event = ChangeEvent(self.document_class, change)
+        self._unsaved_token = event.resume_token
+        return event
+
+    async def next(self):
+        ''' Waits for the next event. '''
+        await self.open()
+        await self.save_token()
+        return self.get_event(await self._stream.next())
+
+    async def try_next(self):
+        ''' Returns the next event, or None if there was none within `max_await_time_ms`. '''
+        await self.open()
+        await self.save_token()
+        return self.get_event(await self._stream.try_next())
+
+    async def close(self):
+        await self.save_token()
+        if self._stream is not None:
+            await self._stream.close()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self.next()
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            # the last event may not have been handled
+            self._unsaved_token = None
+        await self.close()
@@ -0,0 +1,169 @@
+'''
+Columnar reads of query results, see `QuerySet.to_columns` and
+`QuerySet.to_record_batches`. Requires `numpy` (the 'columns' extra), and
+`pyarrow` for record batches (the 'arrow' extra).
+'''
+from datetime import datetime, timezone
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+from bson.objectid import ObjectId
+
+from aiomotorengine.fields import BooleanField, DateTimeField, FloatField, IntField
+
+DEFAULT_BATCH_SIZE = 10000
+
+FIELD_DTYPES = [
+    (BooleanField, 'bool'),
+    (IntField, 'int64'),
+    (FloatField, 'float64'),
+    (DateTimeField, 'datetime64[ms]'),
+]
+
+
+def get_dtype(field):
+    for field_class, dtype in FIELD_DTYPES:
+        if isinstance(field, field_class):
+            return dtype
+    return 'object'
+
+
+def get_missing_value(dtype):
+    if dtype.kind == 'f':
+        return numpy.nan
+    if dtype.kind == 'M':
+        return numpy.datetime64('NaT')
+    if dtype.kind == 'O':
+        return None
+    return 0
+
+
+def to_datetime64(value):
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+class ColumnBuilder(object):
+    '''
+    Fills one NumPy array per field with the values of raw SON documents,
+    without building documents.
+
+    The dtype of a column comes from its field: int64 for `IntField`,
+    float64 for `FloatField`, datetime64 for `DateTimeField`, bool for
+    `BooleanField` and object for the others (with the values converted by
+    the field `from_son`). `dtype_map` maps field names to other dtypes.
+
+    Arrays start with room for `capacity` values and double when full.
+    Missing values are masked: `get_columns` returns masked arrays for the
+    columns that have some.
+    '''
+
+    def __init__(self, document_class, fields, dtype_map=None, capacity=DEFAULT_BATCH_SIZE):
+        if numpy is None:
+            raise RuntimeError("Columnar reads require the 'numpy' package.")
+
+        dtype_map = dtype_map or {}
+        self.columns = []
+
+        for name in fields:
+            if name == '_id':
+                field, db_field, dtype = None, '_id', 'object'
+            elif name in document_class._fields:
+                field = document_class._fields[name]
+                db_field, dtype = field.db_field, get_dtype(field)
+            else:
+                raise ValueError("Invalid column '%s': Field not found in '%s'." % (name, document_class.__name__))
+
+            dtype = numpy.dtype(dtype_map.get(name, dtype))
+            convert = field.from_son if field is not None and dtype.kind == 'O' else None
+            if dtype.kind == 'M':
+                convert = to_datetime64
+
+            self.columns.append((name, db_field, dtype, convert, get_missing_value(dtype)))
+
+        self.capacity = max(capacity, 1)
+        self.reset()
+
+    @property
+    def names(self):
+        return [column[0] for column in self.columns]
+
+    @property
+    def projection(self):
+        return dict((column[1], True) for column in self.columns)
+
+    def reset(self):
+        self.size = 0
+        self.data = dict(
+            (name, numpy.empty(self.capacity, dtype=dtype)) for name, _, dtype, _, _ in self.columns
+        )
+        self.mask = dict(
+            (name, numpy.zeros(self.capacity, dtype=bool)) for name, _, _, _, _ in self.columns
+        )
+
+    def grow(self):
+        self.capacity *= 2
+        for name, _, dtype, _, _ in self.columns:
+            data = numpy.empty(self.capacity, dtype=dtype)
+            data[:self.size] = self.data[name][:self.size]
+            self.data[name] = data
+
+            mask = numpy.zeros(self.capacity, dtype=bool)
+            mask[:self.size] = self.mask[name][:self.size]
+            self.mask[name] = mask
+
+    def append(self, son):
+        if self.size == self.capacity:
+            self.grow()
+
+        position = self.size
+        for name, db_field, _, convert, missing_value in self.columns:
+            value = son.get(db_field)
+            if value is None:
+                self.data[name][position] = missing_value
+                self.mask[name][position] = True
+                continue
+
+            if convert is not None:
+                value = convert(value)
+            self.data[name][position] = value
+
+        self.size += 1
+
+    def get_columns(self):
+        ''' Returns a dict of the arrays of each field. '''
+        columns = {}
+
+        for name in self.names:
+            data = self.data[name][:self.size]
+            mask = self.mask[name][:self.size]
+            columns[name] = numpy.ma.masked_array(data, mask=mask) if mask.any() else data
+
+        return columns
+
+    def get_record_batch(self):
+        '''
+        Returns the values as an Arrow record batch, missing values being
+        nulls and ObjectIds strings.
+        '''
+        if pyarrow is None:
+            raise RuntimeError("Arrow record batches require the 'pyarrow' package.")
+
+        arrays = []
+        for name, _, dtype, _, _ in self.columns:
+            data = self.data[name][:self.size]
+            if dtype.kind == 'O':
+                # Arrow has no ObjectId type
+                data = [str(value) if isinstance(value, ObjectId) else value for value in data]
+            arrays.append(pyarrow.array(data, mask=self.mask[name][:self.size]))
+
+        return pyarrow.RecordBatch.from_arrays(arrays, names=self.names)
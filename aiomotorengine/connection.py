@@ -16,6 +16,7 @@ try:
 except ImportError:
     pass
 
+from aiomotorengine.backends import get_client_class
 from aiomotorengine.database import Database
 
 DEFAULT_CONNECTION_NAME = 'default'
@@ -67,9 +68,11 @@ def get_connection(alias=DEFAULT_CONNECTION_NAME, db=None):
     if alias not in _connections:
         conn_settings = _connection_settings[alias].copy()
         db = conn_settings.pop('name', None)
+        backend = conn_settings.pop('backend', None)
 
-        connection_class = MotorClient
-        if 'replicaSet' in conn_settings:
+        if backend is not None and backend != 'motor':
+            connection_class = get_client_class(backend)
+        elif 'replicaSet' in conn_settings:
             connection_class = MotorReplicaSetClient
             conn_settings['hosts_or_uri'] = conn_settings.pop('host', None)
 
@@ -79,6 +82,8 @@ def get_connection(alias=DEFAULT_CONNECTION_NAME, db=None):
             # Discard replicaSet if not base string
             if not isinstance(conn_settings['replicaSet'], six.string_types):
                 conn_settings.pop('replicaSet', None)
+        else:
+            connection_class = MotorClient
 
         try:
             _connections[alias] = connection_class(**conn_settings)
@@ -114,6 +119,10 @@ def connect(db, alias=DEFAULT_CONNECTION_NAME, **kwargs):
     `alias` to connect to a different instance of :program:`mongod`.
 
     Extra keyword-arguments are passed to Motor when connecting to the database.
+
+    Pass `backend='memory'` to use an in-memory stand-in for Motor instead
+    of a server (see :mod:`aiomotorengine.backends.memory`), handy for fast
+    tests and benchmarks. `backend` can also be the client class to use.
     """
     global _connections
     if alias not in _connections:
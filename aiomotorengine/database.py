@@ -17,4 +17,4 @@ class Database(object):
         return getattr(self.database, name)
 
     def __getitem__(self, val):
-        return getattr(self.database, val)
+        return self.database[val]
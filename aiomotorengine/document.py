@@ -2,9 +2,10 @@ import six
 
 from aiomotorengine.metaclasses import DocumentMetaClass
 from aiomotorengine.errors import InvalidDocumentError, LoadReferencesRequiredError
+from aiomotorengine.monitoring import track
 
 
-AUTHORIZED_FIELDS = ['_id', '_values']
+AUTHORIZED_FIELDS = ['_id', '_values', 'acknowledged', '_shard_key_values']
 
 
 class BaseDocument(object):
@@ -13,6 +14,10 @@ class BaseDocument(object):
 
         self._id = kw.pop('_id', None)
         self._values = {}
+        # whether the server acknowledged the last save or delete (None before any)
+        self.acknowledged = None
+        # the shard key in the database, set when loaded or saved (see get_identity_filter)
+        self._shard_key_values = None
 
         for key, field in self._fields.items():
             if callable(field.default):
@@ -58,6 +63,25 @@ class BaseDocument(object):
 
     @classmethod
     def from_son(cls, dic):
+        document = cls(**cls.get_field_values_from_son(dic))
+        document.remember_shard_key()
+        return document
+
+    def get_shard_key_values(self):
+        ''' Returns the SON values of the `__shard_key__` fields, by db field. '''
+        values = {}
+        for field_name in self.__shard_key__ or ():
+            field = self._fields[field_name]
+            values[field.db_field] = field.to_son(self.get_field_value(field_name))
+        return values
+
+    def remember_shard_key(self):
+        ''' Keeps the current shard key as the one of the document in the database. '''
+        self._shard_key_values = self.get_shard_key_values()
+
+    @classmethod
+    def get_field_values_from_son(cls, dic):
+        ''' Returns the keyword arguments building the document of `dic`. '''
         field_values = {}
         for name, value in dic.items():
             field = cls.get_field_by_db_name(name)
@@ -66,7 +90,7 @@ class BaseDocument(object):
             else:
                 field_values[name] = value
 
-        return cls(**field_values)
+        return field_values
 
     def to_son(self):
         data = dict()
@@ -92,13 +116,26 @@ class BaseDocument(object):
 
         return True
 
-    async def save(self, alias=None):
+    async def save(self, alias=None, write_concern=None):
         '''
         Creates or updates the current instance of this document.
+
+        `write_concern` (e.g. ``{'w': 'majority', 'j': True}``) overrides the
+        `__write_concern__` of the document class for this write only. The
+        `acknowledged` attribute of the document tells whether the server
+        acknowledged the write (it doesn't with ``w=0``).
         '''
-        return await self.objects.save(self, alias=alias)
+        return await self.objects.save(
+            self, alias=alias, write_concern=write_concern
+        )
 
-    async def delete(self, alias=None):
+    async def reload(self, alias=None):
+        '''
+        Reloads the values of the current instance from the database.
+        '''
+        return await self.objects.reload(self, alias=alias)
+
+    async def delete(self, alias=None, write_concern=None):
         '''
         Deletes the current instance of this Document.
 
@@ -124,7 +161,9 @@ class BaseDocument(object):
 
             io_loop.run_until_complete(create_user())
         '''
-        return await self.objects.remove(instance=self, alias=alias)
+        return await self.objects.remove(
+            instance=self, alias=alias, write_concern=write_concern
+        )
 
     def fill_values_collection(self, collection, field_name, value):
         collection[field_name] = value
@@ -145,15 +184,17 @@ class BaseDocument(object):
                 'loaded_values': []
             }
 
-        for (
-            dereference_function, document_id, values_collection,
-            field_name, fill_values_method
-        ) in references:
-            doc = await dereference_function(document_id)
-            if fill_values_method is None:
-                fill_values_method = self.fill_values_collection
-
-            fill_values_method(values_collection, field_name, doc)
+        with track(self.__class__, 'dereference', self.objects.get_alias(alias)) as operation:
+            operation.add_count(reference_count)
+            for (
+                dereference_function, document_id, values_collection,
+                field_name, fill_values_method
+            ) in references:
+                doc = await dereference_function(document_id)
+                if fill_values_method is None:
+                    fill_values_method = self.fill_values_collection
+
+                fill_values_method(values_collection, field_name, doc)
 
         return {
             'loaded_reference_count': reference_count,
@@ -9,6 +9,22 @@ class LoadReferencesRequiredError(RuntimeError):
     pass
 
 
+class AggregationError(RuntimeError):
+    pass
+
+
+class ReadOnlyDocumentError(RuntimeError):
+    pass
+
+
+class CollectionScanError(RuntimeError):
+    pass
+
+
+class RepeatedQueryError(RuntimeError):
+    pass
+
+
 # E11000 duplicate key error index: test.UniqueFieldDocument.$name_1  dup key: { : "test" }
 PYMONGO_ERROR_REGEX = re.compile(r"(?P<error_code>.+?)\s(?P<error_type>.+?):\s*(?P<index_name>.+?)\s+(?P<error>.+?)")
 
@@ -0,0 +1,165 @@
+import logging
+
+from easydict import EasyDict as edict
+
+from aiomotorengine.errors import CollectionScanError
+
+logger = logging.getLogger(__name__)
+
+_explain_guard = None
+
+
+def get_winning_plan(explain):
+    '''
+    Returns the winning plan of a find or aggregate explain output.
+    '''
+    if 'queryPlanner' in explain:
+        return explain['queryPlanner'].get('winningPlan', {})
+
+    for stage in explain.get('stages', []):
+        if '$cursor' in stage:
+            return get_winning_plan(stage['$cursor'])
+
+    # MongoDB < 3.0 reports the cursor type instead of a plan
+    if 'cursor' in explain:
+        stage = 'COLLSCAN' if explain['cursor'] == 'BasicCursor' else 'IXSCAN'
+        return {'stage': stage, 'cursor': explain['cursor']}
+
+    return {}
+
+
+def get_plan_stages(plan):
+    ''' Returns the names of all the stages of a plan, from the root down. '''
+    stages = []
+    pending = [plan]
+
+    while pending:
+        stage = pending.pop(0)
+        if not stage:
+            continue
+
+        if 'stage' in stage:
+            stages.append(stage['stage'])
+
+        if 'inputStage' in stage:
+            pending.append(stage['inputStage'])
+        pending.extend(stage.get('inputStages', []))
+
+    return stages
+
+
+def get_execution_stats(explain):
+    if 'executionStats' in explain:
+        stats = explain['executionStats']
+        return {
+            'returned': stats.get('nReturned', 0),
+            'docs_examined': stats.get('totalDocsExamined', 0),
+            'keys_examined': stats.get('totalKeysExamined', 0),
+            'time_ms': stats.get('executionTimeMillis', 0),
+        }
+
+    for stage in explain.get('stages', []):
+        if '$cursor' in stage:
+            return get_execution_stats(stage['$cursor'])
+
+    if 'nscannedObjects' in explain:
+        return {
+            'returned': explain.get('n', 0),
+            'docs_examined': explain.get('nscannedObjects', 0),
+            'keys_examined': explain.get('nscanned', 0),
+            'time_ms': explain.get('millis', 0),
+        }
+
+    return {}
+
+
+def summarize(explain):
+    '''
+    Returns the interesting parts of an explain output:
+
+    * `winning_plan` - the plan chosen by the server;
+    * `stages` - the names of the stages of the winning plan;
+    * `collection_scan` - whether the plan scans the whole collection;
+    * `execution_stats` - returned, docs_examined, keys_examined and time_ms
+      (empty if the server did not execute the plan);
+    * `raw` - the explain output itself.
+    '''
+    plan = get_winning_plan(explain)
+    stages = get_plan_stages(plan)
+
+    return edict({
+        'winning_plan': plan,
+        'stages': stages,
+        'collection_scan': 'COLLSCAN' in stages,
+        'execution_stats': get_execution_stats(explain),
+        'raw': explain,
+    })
+
+
+class ExplainGuard(object):
+    '''
+    Checks the plan of every query before running it.
+
+    A query is rejected if it runs as a collection scan or, when
+    `max_examined_ratio` is set, if it examines more than that number of
+    documents per returned document. With `mode='raise'` a
+    :class:`aiomotorengine.errors.CollectionScanError` is raised, with
+    `mode='log'` a warning is logged.
+
+    Each query is explained before being run, so this is meant for tests
+    and development:
+
+    .. code-block:: python
+
+        set_explain_guard(ExplainGuard(mode='raise', max_examined_ratio=10))
+
+    Queries without filters are not checked, as scanning the collection is
+    what they ask for.
+    '''
+
+    def __init__(self, mode='raise', max_examined_ratio=None):
+        if mode not in ('raise', 'log'):
+            raise ValueError("Invalid explain guard mode '%s': use 'raise' or 'log'." % mode)
+
+        self.mode = mode
+        self.max_examined_ratio = max_examined_ratio
+
+    def get_violation(self, summary):
+        if summary.collection_scan:
+            return "runs as a collection scan"
+
+        stats = summary.execution_stats
+        if self.max_examined_ratio is not None and stats:
+            ratio = stats['docs_examined'] / float(max(stats['returned'], 1))
+            if ratio > self.max_examined_ratio:
+                return "examines %.1f documents per returned document (max %s)" % (
+                    ratio, self.max_examined_ratio
+                )
+
+        return None
+
+    def check(self, summary, document_class, operation, query):
+        violation = self.get_violation(summary)
+        if violation is None:
+            return
+
+        message = "%s.%s with filter %r %s." % (
+            document_class.__name__, operation, query, violation
+        )
+
+        if self.mode == 'raise':
+            raise CollectionScanError(message)
+
+        logger.warning(message)
+
+
+def set_explain_guard(guard):
+    '''
+    Installs the :class:`ExplainGuard` checking every query. Pass None to disable it.
+    '''
+    global _explain_guard
+    _explain_guard = guard
+
+
+def get_explain_guard():
+    return _explain_guard
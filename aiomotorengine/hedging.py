@@ -0,0 +1,180 @@
+import asyncio
+import time
+from collections import deque
+
+from pymongo import ReadPreference
+
+
+class HedgeStats(object):
+    '''
+    Counters kept by a `HedgePolicy`.
+
+    * `reads` - number of reads, each read counted once no matter how many
+      requests were sent for it;
+    * `hedges` - number of reads for which a second request was sent;
+    * `hedge_wins` - number of hedged reads answered by the second request;
+    * `errors` - number of reads for which every request failed.
+    '''
+
+    def __init__(self):
+        self.reads = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.errors = 0
+
+    @property
+    def hedge_rate(self):
+        if not self.reads:
+            return 0.0
+        return self.hedges / self.reads
+
+    @property
+    def win_rate(self):
+        if not self.hedges:
+            return 0.0
+        return self.hedge_wins / self.hedges
+
+    def as_dict(self):
+        return {
+            'reads': self.reads,
+            'hedges': self.hedges,
+            'hedge_wins': self.hedge_wins,
+            'errors': self.errors,
+            'hedge_rate': self.hedge_rate,
+            'win_rate': self.win_rate,
+        }
+
+
+class HedgePolicy(object):
+    '''
+    Sends a read a second time if the first request did not answer in time.
+
+    The hedge delay is the `percentile` of the latencies observed for the
+    last `window` reads, bounded by `min_delay_ms` and `max_delay_ms`. Until
+    `min_samples` reads have been observed `initial_delay_ms` is used.
+
+    The second request is sent with `hedge_read_preference`, by default
+    `SECONDARY_PREFERRED` when the first one went to the primary (so the
+    hedge goes to another member while there is a secondary) and `NEAREST`
+    otherwise (which may pick the member of the first request again).
+    Either way a hedge may be answered by a secondary, so a hedged read of
+    the primary can return stale data. Whichever request finishes first
+    wins and the other one is cancelled (which also kills its server
+    cursor).
+
+    A policy keeps its own latency window and `stats`, so share one instance
+    among the reads that should be measured together:
+
+    .. code-block:: python
+
+        users_hedge = HedgePolicy(percentile=95)
+
+        user = await User.objects.hedge(users_hedge).get(user_id)
+        users_hedge.stats.as_dict()
+    '''
+
+    def __init__(
+        self, percentile=95, initial_delay_ms=50, min_delay_ms=2,
+        max_delay_ms=1000, window=1000, min_samples=20,
+        hedge_read_preference=None
+    ):
+        self.percentile = percentile
+        self.initial_delay_ms = initial_delay_ms
+        self.min_delay_ms = min_delay_ms
+        self.max_delay_ms = max_delay_ms
+        self.min_samples = min_samples
+
+        self.hedge_read_preference = hedge_read_preference
+
+        self.stats = HedgeStats()
+        self._latencies = deque(maxlen=window)
+        self._observations = 0
+        self._delay_ms = None
+
+    def observe(self, latency_ms):
+        self._latencies.append(latency_ms)
+        self._observations += 1
+        # recomputing the percentile is O(n log n), do it once in a while
+        # (the window length stops changing once it is full)
+        if self._delay_ms is None or self._observations % 50 == 0:
+            self._delay_ms = self.compute_delay_ms()
+
+    def compute_delay_ms(self):
+        if len(self._latencies) < self.min_samples:
+            return self.initial_delay_ms
+
+        latencies = sorted(self._latencies)
+        index = int(round((len(latencies) - 1) * self.percentile / 100.0))
+        delay = latencies[index]
+
+        return min(max(delay, self.min_delay_ms), self.max_delay_ms)
+
+    def get_delay_ms(self):
+        if self._delay_ms is None:
+            return self.initial_delay_ms
+        return self._delay_ms
+
+    def get_hedge_read_preference(self, read_preference=None):
+        ''' Returns the read preference of the hedge of a read sent with `read_preference`. '''
+        if self.hedge_read_preference is not None:
+            return self.hedge_read_preference
+
+        if read_preference is None or read_preference == ReadPreference.PRIMARY:
+            return ReadPreference.SECONDARY_PREFERRED
+
+        return ReadPreference.NEAREST
+
+    async def run(self, read, read_preference=None):
+        '''
+        Runs `read(read_preference)`, hedging it if it gets too slow.
+
+        `read` must be a coroutine function. It is called with None for the
+        first request, sent with `read_preference` (None meaning the
+        primary), and with the hedge read preference for the hedge.
+        '''
+        self.stats.reads += 1
+        started = time.monotonic()
+
+        first = asyncio.ensure_future(read(None))
+        done, pending = await self._wait([first], self.get_delay_ms() / 1000.0)
+        if done:
+            return self._finish(first, started)
+
+        self.stats.hedges += 1
+        hedge = asyncio.ensure_future(read(self.get_hedge_read_preference(read_preference)))
+        requests = [first, hedge]
+
+        while requests:
+            done, pending = await self._wait(requests)
+            for request in done:
+                if request.exception() is None:
+                    self._cancel(pending)
+                    if request is hedge:
+                        self.stats.hedge_wins += 1
+                    return self._finish(request, started)
+            requests = list(pending)
+
+        # both requests failed, report the one that was sent first
+        self.stats.errors += 1
+        return first.result()
+
+    async def _wait(self, requests, timeout=None):
+        try:
+            return await asyncio.wait(
+                requests, timeout=timeout,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+        except asyncio.CancelledError:
+            self._cancel(requests)
+            raise
+
+    def _cancel(self, requests):
+        for request in requests:
+            request.cancel()
+
+    def _finish(self, request, started):
+        if request.exception() is not None:
+            self.stats.errors += 1
+        else:
+            self.observe((time.monotonic() - started) * 1000.0)
+        return request.result()
@@ -0,0 +1,336 @@
+import asyncio
+import copy
+import logging
+import time
+
+from aiomotorengine.backends.pipeline import freeze
+from aiomotorengine.backends.query import expand, get_values, matches, sort_documents
+from aiomotorengine.change_stream import open_change_stream
+
+logger = logging.getLogger(__name__)
+
+# a replica further behind the server than this (in seconds) is not used
+DEFAULT_MAX_LAG = 5.0
+
+# how long each read of the change stream waits for a change, which is
+# also how often an idle replica hears from the server
+DEFAULT_MAX_AWAIT_TIME_MS = 1000
+
+# seconds to wait before reloading a replica whose change stream failed
+DEFAULT_RETRY_INTERVAL = 1.0
+
+_replicas = {}
+
+
+class LocalReplica(object):
+    '''
+    Copy of a whole collection kept in memory and current by tailing a
+    change stream, used to answer `get`, `find_all` and `count` of document
+    classes with ``__local_replica__ = True`` without a round trip:
+
+    .. code-block:: python
+
+        class Plan(Document):
+            __local_replica__ = True
+            __local_replica_indexes__ = ('code', )
+
+            code = StringField()
+            price = IntField()
+
+        await start_local_replicas(Plan)
+        plan = await Plan.objects.get(code='premium')  # answered locally
+
+    Filters are evaluated in Python (see `QNode.to_predicate`). Equality and
+    `$in` filters on the `_id` or on a field of `__local_replica_indexes__`
+    only look at the matching documents instead of the whole collection.
+
+    Queries go to the server while the replica is loading, when it is
+    more than `max_lag` seconds behind (the last change seen is that old,
+    or the change stream didn't answer for that long) and after the change
+    stream failed, until it has been reopened and the collection reloaded.
+    Changes arrive asynchronously, so a read following a write may not see
+    it yet.
+
+    Change streams need Motor 2.1+ (see `open_change_stream`): with an
+    older driver `start` raises RuntimeError.
+    '''
+
+    def __init__(
+        self, document_class, alias=None, max_lag=DEFAULT_MAX_LAG,
+        max_await_time_ms=DEFAULT_MAX_AWAIT_TIME_MS, retry_interval=DEFAULT_RETRY_INTERVAL
+    ):
+        self.document_class = document_class
+        self.alias = document_class.objects.get_alias(alias)
+        self.max_lag = max_lag
+        self.max_await_time_ms = max_await_time_ms
+        self.retry_interval = retry_interval
+        self.indexes = dict(
+            (document_class._fields[field_name].db_field, {})
+            for field_name in document_class.__local_replica_indexes__
+        )
+
+        self.ready = False
+        self.lag = 0.0
+        self.last_seen = None
+        self._documents = {}
+        self._positions = {}
+        self._counter = 0
+        self._task = None
+
+    def reset(self, sons):
+        self._documents = {}
+        self._positions = {}
+        for index in self.indexes.values():
+            index.clear()
+
+        for son in sons:
+            self.put(son)
+
+    def get_index_keys(self, son, field):
+        return set(freeze(value) for value in expand(get_values(son, field.split('.'))))
+
+    def put(self, son):
+        key = freeze(son['_id'])
+        self.remove(son['_id'])
+
+        self._counter += 1
+        self._documents[key] = son
+        self._positions[key] = self._counter
+
+        for field, index in self.indexes.items():
+            for value in self.get_index_keys(son, field):
+                index.setdefault(value, set()).add(key)
+
+    def remove(self, _id):
+        key = freeze(_id)
+        son = self._documents.pop(key, None)
+        if son is None:
+            return
+
+        del self._positions[key]
+        for field, index in self.indexes.items():
+            for value in self.get_index_keys(son, field):
+                keys = index.get(value)
+                keys.discard(key)
+                if not keys:
+                    del index[value]
+
+    def apply(self, change):
+        '''
+        Applies a change stream event. Returns False for the events ending
+        the stream (drop, rename, dropDatabase and invalidate).
+        '''
+        operation_type = change['operationType']
+
+        if operation_type in ('insert', 'replace', 'update'):
+            son = change.get('fullDocument')
+            if son is None:
+                # deleted since, its delete event follows
+                self.remove(change['documentKey']['_id'])
+            else:
+                self.put(son)
+        elif operation_type == 'delete':
+            self.remove(change['documentKey']['_id'])
+        else:
+            return False
+
+        return True
+
+    def is_current(self):
+        if not self.ready or self.lag > self.max_lag:
+            return False
+        return asyncio.get_event_loop().time() - self.last_seen <= self.max_lag
+
+    def get_candidates(self, query):
+        '''
+        Returns the documents that may match `query`, using the indexes for
+        the first equality or `$in` filter on an indexed field.
+        '''
+        for field, value in (query or {}).items():
+            if field != '_id' and field not in self.indexes:
+                continue
+
+            if isinstance(value, dict) and any(key.startswith('$') for key in value):
+                if list(value) != ['$in']:
+                    continue
+                values = value['$in']
+            else:
+                values = [value]
+
+            if field == '_id':
+                keys = set(freeze(item) for item in values) & set(self._documents)
+            else:
+                index = self.indexes[field]
+                keys = set()
+                for item in values:
+                    keys |= index.get(freeze(item), set())
+
+            return [self._documents[key] for key in sorted(keys, key=self._positions.__getitem__)]
+
+        return list(self._documents.values())
+
+    def filter(self, query, predicate=None):
+        if predicate is None:
+            return [son for son in self.get_candidates(query) if matches(son, query)]
+        return [son for son in self.get_candidates(query) if predicate(son)]
+
+    def find(self, query, predicate=None, sort=None, skip=None, limit=None):
+        '''
+        Returns copies of the documents matching `query` (a compiled filter)
+        or, if given, `predicate`, which must accept the same documents.
+        '''
+        sons = self.filter(query, predicate)
+
+        if sort:
+            sons = sort_documents(sons, sort)
+        if skip:
+            sons = sons[skip:]
+        if limit:
+            sons = sons[:limit]
+
+        return [copy.deepcopy(son) for son in sons]
+
+    def find_one(self, query, predicate=None):
+        sons = self.filter(query, predicate)
+        return copy.deepcopy(sons[0]) if sons else None
+
+    def count(self, query, predicate=None):
+        return len(self.filter(query, predicate))
+
+    def get_watch_arguments(self):
+        return {'full_document': 'updateLookup', 'max_await_time_ms': self.max_await_time_ms}
+
+    def open_stream(self):
+        collection = self.document_class.objects.coll(self.alias)
+        return open_change_stream(collection, **self.get_watch_arguments())
+
+    async def load(self):
+        '''
+        Opens a change stream then reads the whole collection, so no change
+        made during the read is missed. Returns the change stream.
+        '''
+        stream = self.open_stream()
+        try:
+            # the stream only starts on its first read
+            change = await stream.try_next()
+            sons = await self.document_class.objects.coll(self.alias).find({}).to_list(length=None)
+        except Exception:
+            await stream.close()
+            raise
+
+        self.reset(sons)
+        if change is not None:
+            self.apply(change)
+
+        self.lag = 0.0
+        self.last_seen = asyncio.get_event_loop().time()
+        self.ready = True
+        return stream
+
+    async def follow(self, stream):
+        loop = asyncio.get_event_loop()
+
+        while True:
+            change = await stream.try_next()
+            self.last_seen = loop.time()
+
+            if change is None:
+                self.lag = 0.0
+                if not stream.alive:
+                    return
+                continue
+
+            cluster_time = change.get('clusterTime')
+            if cluster_time is not None:
+                self.lag = max(0.0, time.time() - cluster_time.time)
+
+            if not self.apply(change):
+                return
+
+    async def run(self, stream=None):
+        while True:
+            try:
+                if stream is None:
+                    stream = await self.load()
+                await self.follow(stream)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception(
+                    "The local replica of '%s' lost its change stream.", self.document_class.__collection__
+                )
+            finally:
+                self.ready = False
+                if stream is not None:
+                    await stream.close()
+                    stream = None
+
+            await asyncio.sleep(self.retry_interval)
+
+    async def start(self):
+        '''
+        Loads the collection and keeps following its changes in a
+        background task, until `stop` is called.
+        '''
+        if self._task is not None:
+            return
+
+        stream = await self.load()
+        self._task = asyncio.ensure_future(self.run(stream))
+
+    async def stop(self):
+        self.ready = False
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+def get_document_classes(base=None):
+    from aiomotorengine.document import Document
+
+    for subclass in (base or Document).__subclasses__():
+        yield subclass
+        for child in get_document_classes(subclass):
+            yield child
+
+
+async def start_local_replicas(*document_classes, **kwargs):
+    '''
+    Starts (see `LocalReplica.start`) the replicas of `document_classes`,
+    by default of every document class with ``__local_replica__ = True``.
+    Keyword arguments (`alias`, `max_lag`...) are given to `LocalReplica`.
+
+    Returns the replicas.
+    '''
+    if not document_classes:
+        document_classes = []
+        for document_class in get_document_classes():
+            if document_class.__local_replica__ and document_class not in document_classes:
+                document_classes.append(document_class)
+
+    replicas = []
+    for document_class in document_classes:
+        replica = LocalReplica(document_class, **kwargs)
+        key = (document_class, replica.alias)
+
+        if key in _replicas:
+            await _replicas[key].stop()
+
+        await replica.start()
+        _replicas[key] = replica
+        replicas.append(replica)
+
+    return replicas
+
+
+async def stop_local_replicas():
+    for key in list(_replicas):
+        await _replicas.pop(key).stop()
+
+
+def get_local_replica(document_class, alias):
+    return _replicas.get((document_class, alias))
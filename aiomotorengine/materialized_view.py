@@ -0,0 +1,229 @@
+import asyncio
+import logging
+from datetime import datetime
+
+import six
+
+from aiomotorengine import DESCENDING
+from aiomotorengine.metaclasses import DocumentMetaClass
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATE_COLLECTION = '__materialized_views__'
+
+# stages whose output rows combine several source documents
+GROUPING_STAGES = ('$group', '$bucket', '$bucketAuto', '$sortByCount', '$count')
+
+
+class MaterializedView(object):
+    '''
+    Stores the results of an aggregation in a collection so they can be read
+    with indexed queries instead of re-running the pipeline.
+
+    .. code-block:: python
+
+        daily_totals = MaterializedView(
+            Order.objects.aggregate.group_by(
+                Order.day, Aggregation.sum(Order.total, alias='total')
+            ),
+            collection='daily_totals',
+        )
+
+        await daily_totals.refresh()
+        DailyTotal = daily_totals.as_document('DailyTotal', total=IntField())
+        totals = await DailyTotal.objects.filter(total__gt=1000).find_all()
+
+    With `mode='merge'` (the default) the results are written with `$merge`
+    using `on`, `when_matched` and `when_not_matched`. With `mode='out'` the
+    target collection is rebuilt with `$out` on every refresh.
+
+    If `watermark` is set (a field of the source document such as
+    `updated_at`), a merge refresh only aggregates the source documents whose
+    watermark is greater than the one seen by the previous refresh. The
+    watermark is kept in `state_collection`, so it survives restarts.
+
+    The rows of an incremental refresh only account for the new documents,
+    so for grouped pipelines `when_matched` must be a pipeline combining
+    them with the existing rows, such as the one built by `accumulate`:
+
+    .. code-block:: python
+
+        daily_totals = MaterializedView(
+            Order.objects.aggregate.group_by(
+                Order.day, Aggregation.sum(Order.total, alias='total')
+            ),
+            collection='daily_totals', watermark=Order.created_at,
+            when_matched=MaterializedView.accumulate('total'),
+        )
+
+    Sums and counts can be accumulated; averages, minimums of updated
+    documents and the like need a full refresh.
+    '''
+
+    def __init__(
+        self, aggregation, collection, mode='merge', on='_id',
+        when_matched='replace', when_not_matched='insert', watermark=None,
+        state_collection=DEFAULT_STATE_COLLECTION
+    ):
+        if mode not in ('merge', 'out'):
+            raise ValueError("Invalid materialized view mode '%s': use 'merge' or 'out'." % mode)
+
+        if mode == 'out' and watermark is not None:
+            raise ValueError("A materialized view with mode 'out' can't be refreshed incrementally.")
+
+        if watermark is not None and not isinstance(when_matched, list) and when_matched != 'fail':
+            stages = [next(iter(stage)) for stage in aggregation.to_query()]
+            if any(stage in GROUPING_STAGES for stage in stages):
+                raise ValueError(
+                    "An incremental materialized view of a grouped pipeline needs a 'when_matched' "
+                    "pipeline combining the new rows with the existing ones (see MaterializedView.accumulate)."
+                )
+
+        self.aggregation = aggregation
+        self.collection = collection
+        self.mode = mode
+        self.on = on
+        self.when_matched = when_matched
+        self.when_not_matched = when_not_matched
+        self.watermark = watermark
+        self.state_collection = state_collection
+        self._task = None
+
+    @staticmethod
+    def accumulate(*fields):
+        '''
+        Returns a `when_matched` pipeline adding the `fields` of the new
+        rows to the ones of the existing rows.
+        '''
+        return [{'$set': dict(
+            (field, {'$add': [{'$ifNull': ['$%s' % field, 0]}, '$$new.%s' % field]})
+            for field in fields
+        )}]
+
+    @property
+    def source(self):
+        return self.aggregation.queryset.__klass__
+
+    def get_watermark_field_name(self):
+        if isinstance(self.watermark, six.string_types):
+            return self.source._fields[self.watermark].db_field
+        return self.watermark.db_field
+
+    def get_output_stage(self):
+        if self.mode == 'out':
+            return {'$out': self.collection}
+
+        return {'$merge': {
+            'into': self.collection,
+            'on': self.on,
+            'whenMatched': self.when_matched,
+            'whenNotMatched': self.when_not_matched,
+        }}
+
+    def get_pipeline(self, since=None, until=None):
+        pipeline = list(self.aggregation.to_query())
+
+        if self.watermark is not None and (since is not None or until is not None):
+            bounds = {}
+            if since is not None:
+                bounds['$gt'] = since
+            if until is not None:
+                bounds['$lte'] = until
+            pipeline.insert(0, {'$match': {self.get_watermark_field_name(): bounds}})
+
+        pipeline.append(self.get_output_stage())
+        return pipeline
+
+    def get_state_collection(self, alias=None):
+        return self.aggregation.queryset.coll(alias).database[self.state_collection]
+
+    async def get_state(self, alias=None):
+        state = await self.get_state_collection(alias).find_one({'_id': self.collection})
+        return state or {}
+
+    async def get_latest_watermark(self, alias=None):
+        field_name = self.get_watermark_field_name()
+        cursor = self.aggregation.queryset.coll(alias).find(
+            {field_name: {'$exists': True}}, sort=[(field_name, DESCENDING)], limit=1
+        )
+        docs = await cursor.to_list(length=1)
+        if not docs:
+            return None
+        return docs[0][field_name]
+
+    async def refresh(self, full=False, alias=None):
+        '''
+        Runs the pipeline and writes its results to the target collection.
+
+        Incremental views only aggregate the documents changed since the
+        previous refresh, unless `full` is True. Returns the watermark the
+        view is now up to date with (None for views without watermark).
+        '''
+        since = until = None
+
+        if self.watermark is not None:
+            if not full:
+                since = (await self.get_state(alias)).get('watermark')
+
+            until = await self.get_latest_watermark(alias)
+            if until is None or (since is not None and until <= since):
+                return since
+
+        cursor = self.aggregation.queryset.coll(alias).aggregate(
+            self.get_pipeline(since=since, until=until),
+            **self.aggregation.get_aggregate_arguments(allow_disk_use=True)
+        )
+        async for item in cursor:  # $merge and $out don't return documents
+            pass
+
+        await self.get_state_collection(alias).update(
+            {'_id': self.collection},
+            {'$set': {'watermark': until, 'refreshed_at': datetime.utcnow()}},
+            upsert=True
+        )
+
+        return until
+
+    def schedule(self, interval, alias=None):
+        '''
+        Refreshes the view every `interval` seconds in a background task.
+
+        Failed refreshes are logged and retried on the next run. Returns the
+        task; call `stop` to cancel it.
+        '''
+        async def run():
+            while True:
+                try:
+                    await self.refresh(alias=alias)
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    logger.exception(
+                        "Refreshing materialized view '%s' failed.", self.collection
+                    )
+                await asyncio.sleep(interval)
+
+        self.stop()
+        self._task = asyncio.ensure_future(run())
+        return self._task
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def as_document(self, name, **fields):
+        '''
+        Returns a read-only Document class reading the target collection.
+
+        `fields` declares the fields of the view rows; rows keep any other
+        value as a dynamic field.
+        '''
+        from aiomotorengine.document import Document
+
+        attrs = dict(fields)
+        attrs['__collection__'] = self.collection
+        attrs['__alias__'] = self.source.__alias__
+        attrs['__read_only__'] = True
+
+        return DocumentMetaClass(name, (Document, ), attrs)
@@ -67,6 +67,45 @@ class DocumentMetaClass(type):
         if '__alias__' not in attrs:
             new_class.__alias__ = None
 
+        if '__write_concern__' not in attrs:
+            new_class.__write_concern__ = None
+
+        if '__tenant_aware__' not in attrs:
+            new_class.__tenant_aware__ = True
+
+        if '__rollups__' not in attrs:
+            new_class.__rollups__ = []
+
+        if '__read_only__' not in attrs:
+            new_class.__read_only__ = False
+
+        if '__shard_key__' not in attrs:
+            new_class.__shard_key__ = None
+        else:
+            unknown_fields = [
+                field_name for field_name in new_class.__shard_key__ or ()
+                if field_name not in doc_fields
+            ]
+            if unknown_fields:
+                msg = ("Shard key fields not found in %s: %s" %
+                       (name, ", ".join(unknown_fields)))
+                raise InvalidDocumentError(msg)
+
+        if '__local_replica__' not in attrs:
+            new_class.__local_replica__ = False
+
+        if '__local_replica_indexes__' not in attrs:
+            new_class.__local_replica_indexes__ = ()
+        else:
+            unknown_fields = [
+                field_name for field_name in new_class.__local_replica_indexes__
+                if field_name not in doc_fields
+            ]
+            if unknown_fields:
+                msg = ("Local replica index fields not found in %s: %s" %
+                       (name, ", ".join(unknown_fields)))
+                raise InvalidDocumentError(msg)
+
         setattr(new_class, 'objects', classproperty(lambda *args, **kw: QuerySet(new_class)))
 
         return new_class
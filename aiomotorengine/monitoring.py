@@ -0,0 +1,349 @@
+import bisect
+import contextvars
+import logging
+import math
+import time
+
+from bson import BSON
+
+from aiomotorengine.errors import RepeatedQueryError
+from aiomotorengine.tracing import Span, get_span_attributes, get_tracer
+
+logger = logging.getLogger(__name__)
+
+_listeners = []
+_measure_bytes = False
+
+# the operation running in the current context, which nested operations
+# (e.g. the gets of a dereference) report their duration to
+_current_operation = contextvars.ContextVar('aiomotorengine_operation', default=None)
+
+
+def register_listener(listener, measure_bytes=False):
+    '''
+    Registers a callable receiving an :class:`OperationEvent` after every
+    database operation (find, get, count, save, bulk_insert, update, remove,
+    aggregate and dereference).
+
+    Measuring the size of the documents read and written means encoding them
+    to BSON, so it only happens if some listener asks for it with
+    `measure_bytes`.
+
+    Listeners are called synchronously, so they must be fast; errors they
+    raise are logged and ignored (except the :class:`RepeatedQueryError` of
+    the N+1 query detector).
+    '''
+    global _measure_bytes
+
+    _listeners.append((listener, measure_bytes))
+    _measure_bytes = any(measure for _, measure in _listeners)
+
+
+def unregister_listener(listener):
+    global _measure_bytes
+
+    _listeners[:] = [(registered, measure) for registered, measure in _listeners if registered != listener]
+    _measure_bytes = any(measure for _, measure in _listeners)
+
+
+def get_filter_shape(query):
+    '''
+    Returns the shape of a query: the query with every value replaced by
+    ``?``, so queries that only differ by their values have the same shape.
+
+    For instance ``{'name': 'Bernardo', 'age': {'$gt': 20}}`` has the shape
+    ``{age: {$gt: ?}, name: ?}``.
+    '''
+    if isinstance(query, dict):
+        return "{%s}" % ", ".join(
+            "%s: %s" % (key, get_filter_shape(value))
+            for key, value in sorted(query.items(), key=lambda item: str(item[0]))
+        )
+
+    if isinstance(query, (list, tuple)):
+        if query and all(isinstance(value, dict) for value in query):
+            # $and / $or clauses are part of the shape
+            return "[%s]" % ", ".join(get_filter_shape(value) for value in query)
+        return "[?]"
+
+    return "?"
+
+
+class OperationEvent(object):
+    '''
+    Describes one database operation:
+
+    * `document_class` and `operation` (e.g. ``'find_all'``);
+    * `alias` of the connection used;
+    * `filter_shape` of the query (see :func:`get_filter_shape`), if any;
+    * `count` of documents read, written or affected;
+    * `bytes` of BSON read or written (only if a listener asked to measure them);
+    * `duration`, `network_time` and `hydration_time` (building documents
+      from SON or SON from documents) in seconds;
+    * `nested_time`, the time spent in operations run during this one (the
+      gets of a dereference, the dereference of a `find_all`...), which are
+      reported with their own events;
+    * `error`, the exception raised, if the operation failed.
+    '''
+
+    __slots__ = (
+        'document_class', 'operation', 'alias', 'filter_shape', 'count',
+        'bytes', 'duration', 'network_time', 'hydration_time', 'nested_time', 'error',
+    )
+
+    def __init__(self, document_class, operation, alias, filter_shape=None):
+        self.document_class = document_class
+        self.operation = operation
+        self.alias = alias
+        self.filter_shape = filter_shape
+        self.count = 0
+        self.bytes = None
+        self.duration = 0.0
+        self.network_time = 0.0
+        self.hydration_time = 0.0
+        self.nested_time = 0.0
+        self.error = None
+
+    @property
+    def orm_time(self):
+        ''' Time spent in the library itself: everything but the network and nested operations. '''
+        return max(self.duration - self.network_time - self.nested_time, 0.0)
+
+
+class _Timer(object):
+    __slots__ = ('tracker', 'attribute', 'started', 'span')
+
+    def __init__(self, tracker, attribute, span_name):
+        self.tracker = tracker
+        self.attribute = attribute
+        self.span = None
+        if tracker.tracer is not None:
+            self.span = Span(tracker.tracer, '%s %s' % (tracker.name, span_name))
+
+    def __enter__(self):
+        if self.span is not None:
+            self.tracker.run_in_span_context(self.span.__enter__)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        event = self.tracker.event
+        elapsed = time.perf_counter() - self.started
+        setattr(event, self.attribute, getattr(event, self.attribute) + elapsed)
+
+        if self.span is not None:
+            self.tracker.run_in_span_context(self.span.__exit__, exc_type, exc_value, traceback)
+
+
+class OperationTracker(object):
+    '''
+    Measures an operation and sends its event to the listeners when done.
+
+    .. code-block:: python
+
+        with track(User, 'find_all', alias, query) as operation:
+            with operation.network():
+                docs = await cursor.to_list(100)
+            with operation.hydration():
+                users = [User.from_son(doc) for doc in docs]
+            operation.add_documents(docs)
+
+    The span of a `detached` operation is started in a copy of the current
+    context, so it never becomes the current span of the caller: only its
+    network and hydration spans are its children. Streams use it, since
+    their block yields to the caller's code between rows.
+    '''
+
+    def __init__(self, document_class, operation, alias, query=None, detached=False):
+        filter_shape = None
+        if query is not None:
+            filter_shape = get_filter_shape(query)
+
+        self.event = OperationEvent(document_class, operation, alias, filter_shape)
+        self.name = '%s %s' % (operation, document_class.__name__)
+        self.tracer = get_tracer()
+        self.detached = detached
+        self._span = None
+        self._context = None
+        self._parent = None
+        self._token = None
+        self._started = None
+
+    def network(self):
+        return _Timer(self, 'network_time', 'network')
+
+    def hydration(self):
+        return _Timer(self, 'hydration_time', 'hydration')
+
+    def run_in_span_context(self, function, *args):
+        if self._context is None:
+            return function(*args)
+        return self._context.run(function, *args)
+
+    def add_count(self, count):
+        self.event.count += count
+
+    def add_documents(self, documents):
+        self.event.count += len(documents)
+
+        if _measure_bytes:
+            size = sum(len(BSON.encode(document)) for document in documents)
+            self.event.bytes = (self.event.bytes or 0) + size
+
+    def __enter__(self):
+        if self.tracer is not None:
+            if self.detached:
+                self._context = contextvars.copy_context()
+            self._span = Span(self.tracer, self.name, get_span_attributes(self.event))
+            self.run_in_span_context(self._span.__enter__)
+
+        if not self.detached:
+            # a detached operation yields to its caller, whose operations
+            # are not part of it
+            self._parent = _current_operation.get()
+            self._token = _current_operation.set(self)
+
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.event.duration = time.perf_counter() - self._started
+        self.event.error = exc_value
+
+        if self._token is not None:
+            _current_operation.reset(self._token)
+            if self._parent is not None:
+                self._parent.event.nested_time += self.event.duration
+
+        if self._span is not None:
+            self._span.span.set_attribute('aiomotorengine.count', self.event.count)
+            self.run_in_span_context(self._span.__exit__, exc_type, exc_value, traceback)
+
+        emit(self.event)
+
+
+class _NullTimer(object):
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+class _NullTracker(object):
+    ''' Tracker used while nobody listens: does nothing, allocates nothing. '''
+    __slots__ = ()
+
+    _timer = _NullTimer()
+
+    def network(self):
+        return self._timer
+
+    def hydration(self):
+        return self._timer
+
+    def add_count(self, count):
+        pass
+
+    def add_documents(self, documents):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+NULL_TRACKER = _NullTracker()
+
+
+def track(document_class, operation, alias, query=None, detached=False):
+    '''
+    Returns the tracker of an operation (a no-op one if there are no
+    listeners and tracing is disabled).
+    '''
+    if not _listeners and get_tracer() is None:
+        return NULL_TRACKER
+
+    return OperationTracker(document_class, operation, alias, query, detached)
+
+
+def emit(event):
+    for listener, measure_bytes in list(_listeners):
+        try:
+            listener(event)
+        except RepeatedQueryError:
+            raise
+        except Exception:
+            logger.exception("Operation listener %r failed.", listener)
+
+
+class LatencyHistogram(object):
+    '''
+    Listener aggregating operation durations per (document class, operation).
+
+    Durations are counted in logarithmic buckets (each `growth` times wider
+    than the previous one), so memory does not grow with the number of
+    operations and percentiles are accurate to within a bucket.
+
+    .. code-block:: python
+
+        histogram = LatencyHistogram()
+        register_listener(histogram)
+        ...
+        histogram.percentiles()
+        # {('User', 'find_all'): {'count': 120, 'errors': 0, 'p50': 0.0021, ...}}
+    '''
+
+    def __init__(self, min_duration=0.00001, max_duration=60.0, growth=1.1):
+        bucket_count = int(math.ceil(math.log(max_duration / min_duration, growth))) + 1
+        self.bounds = [min_duration * (growth ** index) for index in range(bucket_count)]
+        self._histograms = {}
+
+    def get_key(self, event):
+        return (event.document_class.__name__, event.operation)
+
+    def __call__(self, event):
+        key = self.get_key(event)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = {
+                'buckets': [0] * (len(self.bounds) + 1), 'count': 0, 'errors': 0,
+            }
+
+        histogram['buckets'][bisect.bisect_left(self.bounds, event.duration)] += 1
+        histogram['count'] += 1
+        if event.error is not None:
+            histogram['errors'] += 1
+
+    def get_percentile(self, buckets, count, percentile):
+        rank = count * percentile / 100.0
+        seen = 0
+        for index, bucket_count in enumerate(buckets):
+            seen += bucket_count
+            if seen >= rank and bucket_count:
+                return self.bounds[min(index, len(self.bounds) - 1)]
+        return self.bounds[-1]
+
+    def percentiles(self, percentiles=(50, 95, 99)):
+        '''
+        Returns the count, errors and percentiles (upper bounds, in seconds)
+        of every (document class name, operation) seen.
+        '''
+        result = {}
+
+        for key, histogram in self._histograms.items():
+            stats = {'count': histogram['count'], 'errors': histogram['errors']}
+            for percentile in percentiles:
+                stats['p%s' % percentile] = self.get_percentile(
+                    histogram['buckets'], histogram['count'], percentile
+                )
+            result[key] = stats
+
+        return result
+
+    def reset(self):
+        self._histograms = {}
@@ -0,0 +1,204 @@
+import asyncio
+from datetime import datetime
+
+from aiomotorengine import ASCENDING
+from aiomotorengine.backends.query import get_value
+from aiomotorengine.utils import kill_cursor
+
+DEFAULT_CHECKPOINT_COLLECTION = '__scan_checkpoints__'
+
+
+class ScanCheckpointStore(object):
+    '''
+    Keeps the progress of the parallel scan `name` in a collection, so a
+    scan that stopped can be resumed.
+
+    Subclass it and override `load`, `save` and `clear` to keep the
+    progress elsewhere.
+    '''
+
+    def __init__(self, name, collection=DEFAULT_CHECKPOINT_COLLECTION):
+        self.name = name
+        self.collection = collection
+
+    async def load(self, database):
+        state = await database[self.collection].find_one({'_id': self.name})
+        if state is None:
+            return None
+        return state['partitions']
+
+    async def save(self, database, partitions):
+        await database[self.collection].update(
+            {'_id': self.name},
+            {'$set': {'partitions': partitions, 'saved_at': datetime.utcnow()}},
+            upsert=True
+        )
+
+    async def clear(self, database):
+        await database[self.collection].remove({'_id': self.name})
+
+
+class ParallelScan(object):
+    '''
+    Async iterator of the documents of a queryset read by concurrent
+    cursors, one per range of `field`, returned by `QuerySet.parallel_scan`.
+
+    The ranges are computed with a `$bucketAuto` stage. Each cursor reads
+    its range in `field` order; documents are yielded as they arrive, so
+    the overall order is undefined.
+
+    With a `checkpoint` store, the ranges and the last document handled in
+    each of them are saved every `checkpoint_interval` documents and when
+    the scan is closed. A new scan with the same store continues where the
+    previous one stopped (a document may be seen twice if the scan stopped
+    while it was being handled). Once the whole scan is done the checkpoint
+    is cleared. Resuming requires `field` to be unique.
+    '''
+
+    def __init__(
+        self, queryset, query_filters, partitions, field='_id', checkpoint=None,
+        checkpoint_interval=1000, batch_size=None, queue_size=1000, lazy=None, alias=None
+    ):
+        self.queryset = queryset
+        self.query_filters = query_filters
+        self.partitions = partitions
+        self.field = field
+        self.checkpoint = checkpoint
+        self.checkpoint_interval = checkpoint_interval
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.lazy = lazy
+        self.alias = alias
+
+        self._iterator = None
+
+    @property
+    def database(self):
+        return self.queryset.coll(self.alias).database
+
+    async def get_partitions(self):
+        '''
+        Returns the ranges to read, as dicts with their `min`, `max` and
+        whether the range `includes_max` (only the last one does).
+        '''
+        pipeline = [
+            {'$bucketAuto': {'groupBy': '$%s' % self.field, 'buckets': self.partitions}},
+        ]
+        if self.query_filters:
+            pipeline.insert(0, {'$match': self.query_filters})
+
+        buckets = []
+        async for bucket in self.queryset.aggregate.raw(pipeline).stream(as_dict=True, alias=self.alias):
+            buckets.append(bucket['_id'])
+
+        return [
+            {
+                'min': bucket['min'], 'max': bucket['max'],
+                'includes_max': index == len(buckets) - 1, 'done': False,
+            }
+            for index, bucket in enumerate(buckets)
+        ]
+
+    def get_partition_query(self, partition):
+        if 'last' in partition:
+            bounds = {'$gt': partition['last']}
+        else:
+            bounds = {'$gte': partition['min']}
+
+        bounds['$lte' if partition['includes_max'] else '$lt'] = partition['max']
+
+        if not self.query_filters:
+            return {self.field: bounds}
+        return {'$and': [self.query_filters, {self.field: bounds}]}
+
+    async def read(self, partition, queue):
+        cursor = self.queryset.coll(self.alias).find(
+            self.get_partition_query(partition), sort=[(self.field, ASCENDING)]
+        )
+        if self.batch_size is not None:
+            cursor.batch_size(self.batch_size)
+
+        try:
+            async for son in cursor:
+                await queue.put((partition, son))
+        except asyncio.CancelledError:
+            kill_cursor(cursor)
+            raise
+        except Exception as error:
+            await queue.put((partition, error))
+            return
+
+        await queue.put((partition, None))
+
+    async def save_checkpoint(self, partitions):
+        if self.checkpoint is not None:
+            await self.checkpoint.save(self.database, partitions)
+
+    async def iterate(self):
+        partitions = None
+        if self.checkpoint is not None:
+            partitions = await self.checkpoint.load(self.database)
+
+        if partitions is None:
+            partitions = await self.get_partitions()
+            await self.save_checkpoint(partitions)
+
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        tasks = [
+            asyncio.ensure_future(self.read(partition, queue))
+            for partition in partitions if not partition['done']
+        ]
+        running = len(tasks)
+        handled = 0
+        completed = False
+
+        try:
+            while running:
+                partition, son = await queue.get()
+
+                if isinstance(son, Exception):
+                    raise son
+
+                if son is None:
+                    partition['done'] = True
+                    running -= 1
+                    await self.save_checkpoint(partitions)
+                    continue
+
+                documents = await self.queryset.hydrate([son], lazy=self.lazy)
+                yield documents[0]
+
+                # asking for the next document means this one was handled
+                partition['last'] = get_value(son, self.field)
+                handled += 1
+                if handled % self.checkpoint_interval == 0:
+                    await self.save_checkpoint(partitions)
+
+            completed = True
+            if self.checkpoint is not None:
+                await self.checkpoint.clear(self.database)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+            if not completed:
+                await self.save_checkpoint(partitions)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._iterator is None:
+            self._iterator = self.iterate()
+        return await self._iterator.__anext__()
+
+    async def close(self):
+        ''' Stops the cursors and saves the checkpoint. '''
+        if self._iterator is not None:
+            await self._iterator.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
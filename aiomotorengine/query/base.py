@@ -1,3 +1,4 @@
+from aiomotorengine.backends.query import compare, expand, get_values, matches
 from aiomotorengine.fields.base_field import BaseField
 
 
@@ -10,3 +11,29 @@ class QueryOperator(object):
 
     def to_query(self, value):
         raise NotImplementedError()
+
+    def to_predicate(self, field_name, value):
+        '''
+        Returns a function telling whether a SON document matches
+        `to_query(field_name, value)`, evaluated in Python. Operators
+        override it with faster, specialized predicates.
+        '''
+        query = self.to_query(field_name, value)
+        return lambda document: matches(document, query)
+
+    def get_comparison_predicate(self, field_name, value, accept):
+        '''
+        Predicate matching documents with a value at `field_name` of the same
+        type as `value` for which `accept(comparison)` is true, `comparison`
+        being negative, zero or positive like in `cmp`.
+        '''
+        path = field_name.split('.')
+
+        def predicate(document):
+            for candidate in expand(get_values(document, path)):
+                comparison = compare(candidate, value)
+                if comparison is not None and accept(comparison):
+                    return True
+            return False
+
+        return predicate
@@ -1,3 +1,4 @@
+from aiomotorengine.backends.query import get_values
 from aiomotorengine.query.base import QueryOperator
 
 
@@ -44,5 +45,9 @@ class ExistsQueryOperator(QueryOperator):
             }
         }
 
+    def to_predicate(self, field_name, value):
+        path = field_name.split('.')
+        return lambda document: bool(get_values(document, path)) == bool(value)
+
     def get_value(self, field, value):
         return value
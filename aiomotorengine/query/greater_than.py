@@ -40,3 +40,6 @@ class GreaterThanQueryOperator(QueryOperator):
         return {
             field_name: {"$gt": value}
         }
+
+    def to_predicate(self, field_name, value):
+        return self.get_comparison_predicate(field_name, value, lambda comparison: comparison > 0)
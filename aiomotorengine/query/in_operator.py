@@ -1,3 +1,4 @@
+from aiomotorengine.backends.query import get_values, matches_equality
 from aiomotorengine.query.base import QueryOperator
 
 
@@ -47,3 +48,12 @@ class InQueryOperator(QueryOperator):
 
     def get_value(self, field, value):
         return [field.to_son(val) for val in value]
+
+    def to_predicate(self, field_name, value):
+        path = field_name.split('.')
+
+        def predicate(document):
+            values = get_values(document, path)
+            return any(matches_equality(values, expected) for expected in value)
+
+        return predicate
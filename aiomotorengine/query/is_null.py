@@ -1,3 +1,4 @@
+from aiomotorengine.backends.query import get_values, matches_equality
 from aiomotorengine.query.base import QueryOperator
 
 
@@ -51,5 +52,15 @@ class IsNullQueryOperator(QueryOperator):
                 }
             }
 
+    def to_predicate(self, field_name, value):
+        path = field_name.split('.')
+
+        def predicate(document):
+            values = get_values(document, path)
+            is_null = matches_equality(values, None)
+            return is_null if value else bool(values) and not is_null
+
+        return predicate
+
     def get_value(self, field, value):
         return value
@@ -40,3 +40,6 @@ class LesserThanOrEqualQueryOperator(QueryOperator):
         return {
             field_name: {"$lte": value}
         }
+
+    def to_predicate(self, field_name, value):
+        return self.get_comparison_predicate(field_name, value, lambda comparison: comparison <= 0)
@@ -1,3 +1,4 @@
+from aiomotorengine.backends.query import get_values, matches_equality
 from aiomotorengine.query.base import QueryOperator
 
 
@@ -40,3 +41,7 @@ class NotEqualQueryOperator(QueryOperator):
         return {
             field_name: {"$ne": value}
         }
+
+    def to_predicate(self, field_name, value):
+        path = field_name.split('.')
+        return lambda document: not matches_equality(get_values(document, path), value)
@@ -11,5 +11,9 @@ class NotOperator(QueryOperator):
             }
         }
 
+    def to_predicate(self, field_name, operator, value):
+        predicate = operator.to_predicate(field_name, value)
+        return lambda document: not predicate(document)
+
     def get_value(self, field, value):
         return value
@@ -2,7 +2,8 @@ import copy
 
 # Adapted from https://github.com/MongoEngine/mongoengine/blob/master/mongoengine/queryset/visitor.py
 
-from aiomotorengine.query_builder.transform import transform_query
+from aiomotorengine.backends.query import matches
+from aiomotorengine.query_builder.transform import transform_predicate, transform_query
 
 
 class QNodeVisitor(object):
@@ -93,6 +94,32 @@ class QNode(object):
     def accept(self, visitor, document):
         raise NotImplementedError
 
+    def to_predicate(self, document):
+        '''
+        Compiles the query tree to a Python function telling whether a
+        document matches it, without asking the server.
+
+        The function takes SON dicts (as read from the collection) or
+        instances of `document`, which are converted with `to_son` first.
+
+        .. code-block:: python
+
+            is_adult = (Q(age__gte=18) & Q(email__exists=True)).to_predicate(User)
+            adults = [user for user in users if is_adult(user)]
+        '''
+        predicate = self.get_predicate(document)
+
+        def matches_document(item):
+            if not isinstance(item, dict):
+                item = item.to_son()
+            return predicate(item)
+
+        return matches_document
+
+    def get_predicate(self, document):
+        ''' Returns the predicate of this node, taking SON dicts. '''
+        raise NotImplementedError
+
     def _combine(self, other, operation):
         """Combine this node with another node into a QCombination object.
         """
@@ -141,6 +168,19 @@ class QCombination(QNode):
 
         return visitor.visit_combination(self)
 
+    def get_predicate(self, document):
+        predicates = []
+        for node in self.children:
+            if isinstance(node, QNode):
+                predicates.append(node.get_predicate(document))
+            else:
+                # a child already compiled by to_query
+                predicates.append(lambda son, query=node: matches(son, query))
+
+        if self.operation == self.OR:
+            return lambda son: any(predicate(son) for predicate in predicates)
+        return lambda son: all(predicate(son) for predicate in predicates)
+
     @property
     def empty(self):
         return not bool(self.children)
@@ -184,6 +224,9 @@ class Q(QNode):
     def accept(self, visitor, document):
         return visitor.visit_query(self)
 
+    def get_predicate(self, document):
+        return transform_predicate(document, **self.query)
+
     @property
     def empty(self):
         return not bool(self.query)
@@ -196,6 +239,11 @@ class QNot(QNode):
     def accept(self, visitor, document):
         return self.to_query(document)
 
+    def get_predicate(self, document):
+        # negates field by field, like the query sent to the server
+        query = self.to_query(document)
+        return lambda son: matches(son, query)
+
     def to_query(self, document):
         query = self.query.to_query(document)
         result = {}
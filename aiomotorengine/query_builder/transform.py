@@ -1,5 +1,7 @@
-import collections
+import collections.abc
+from functools import partial
 
+from aiomotorengine.backends.query import get_values, matches, matches_equality
 from aiomotorengine.query.base import QueryOperator
 from aiomotorengine.query.exists import ExistsQueryOperator
 from aiomotorengine.query.greater_than import GreaterThanQueryOperator
@@ -31,11 +33,15 @@ class DefaultOperator(QueryOperator):
             field_name: value
         }
 
+    def to_predicate(self, field_name, value):
+        path = field_name.split('.')
+        return lambda document: matches_equality(get_values(document, path), value)
+
 
 # from http://stackoverflow.com/questions/3232943/update-value-of-a-nested-dictionary-of-varying-depth
 def update(d, u):
     for k, v in u.items():
-        if isinstance(v, collections.Mapping):
+        if isinstance(v, collections.abc.Mapping):
             r = update(d.get(k, {}), v)
             d[k] = r
         else:
@@ -43,12 +49,15 @@ def update(d, u):
     return d
 
 
-def transform_query(document, **query):
-    mongo_query = {}
-
+def get_query_parts(document, query):
+    '''
+    Yields the (field name, operator, value) of each filter of `query`, with
+    the db field path as name and the value converted by the operator. Raw
+    queries are yielded with 'raw' as name and no operator.
+    '''
     for key, value in sorted(query.items()):
         if key == 'raw':
-            update(mongo_query, value)
+            yield key, None, value
             continue
 
         if '__' not in key:
@@ -72,11 +81,42 @@ def transform_query(document, **query):
             operator = OPERATORS.get(operator, DefaultOperator)()
             field_value = operator.get_value(fields[-1], value)
 
+        yield field_name, operator, field_value
+
+
+def transform_query(document, **query):
+    mongo_query = {}
+
+    for field_name, operator, field_value in get_query_parts(document, query):
+        if operator is None:
+            update(mongo_query, field_value)
+            continue
+
         update(mongo_query, operator.to_query(field_name, field_value))
 
     return mongo_query
 
 
+def transform_predicate(document, **query):
+    '''
+    Returns a function telling whether a SON document matches the filters of
+    `query`, the Python counterpart of `transform_query`.
+    '''
+    predicates = []
+
+    for field_name, operator, field_value in get_query_parts(document, query):
+        if operator is None:
+            predicates.append(partial(matches, query=field_value))
+            continue
+
+        predicates.append(operator.to_predicate(field_name, field_value))
+
+    if len(predicates) == 1:
+        return predicates[0]
+
+    return lambda son: all(predicate(son) for predicate in predicates)
+
+
 def validate_fields(document, query):
     from aiomotorengine.fields.embedded_document_field import EmbeddedDocumentField
     from aiomotorengine.fields.list_field import ListField
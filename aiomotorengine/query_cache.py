@@ -0,0 +1,246 @@
+import asyncio
+import logging
+import weakref
+from collections import OrderedDict
+
+from bson import BSON
+from bson.son import SON
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+_caches = weakref.WeakSet()
+
+# namespaces some cache has entries or reads in flight for, with the number
+# of such caches: writes to other collections skip invalidation entirely
+_active_namespaces = {}
+
+
+def add_active_namespace(namespace):
+    _active_namespaces[namespace] = _active_namespaces.get(namespace, 0) + 1
+
+
+def remove_active_namespace(namespace):
+    count = _active_namespaces.pop(namespace) - 1
+    if count:
+        _active_namespaces[namespace] = count
+
+
+def release_namespaces(keys_by_namespace, reads):
+    for namespace in set(keys_by_namespace) | set(reads):
+        remove_active_namespace(namespace)
+
+
+class CacheEntry(object):
+    __slots__ = ('data', 'stored_at')
+
+    def __init__(self, data, stored_at):
+        self.data = data
+        self.stored_at = stored_at
+
+    def get_value(self):
+        return BSON(self.data).decode()['value']
+
+
+class QueryCache(object):
+    '''
+    LRU cache of query results, used by the querysets that called
+    `QuerySet.cache`.
+
+    Results are kept as BSON, so every hit decodes fresh SON and builds new
+    documents, and the cache holds at most `max_bytes` of it. Any write
+    made through a `QuerySet` invalidates the entries of its collection
+    (in every cache); writes made by other means are only seen when the
+    entries expire.
+
+    `hits`, `stale_hits`, `misses` and `evictions` count what happened.
+    '''
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._entries = OrderedDict()
+        self._keys_by_namespace = {}
+        # [reads in flight, generation] per namespace, only while reading
+        self._reads = {}
+        self._refreshing = set()
+
+        _caches.add(self)
+        weakref.finalize(self, release_namespaces, self._keys_by_namespace, self._reads)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_key(self, namespace, operation, query, sort=None, skip=None, limit=None, projection=None):
+        '''
+        Returns the key of a query: its collection `namespace` plus the
+        compiled filter, sort, skip, limit and projection, encoded as BSON
+        so that equal queries share an entry.
+        '''
+        return namespace, operation, BSON.encode(SON([
+            ('query', query or {}),
+            ('sort', [list(item) for item in sort or ()]),
+            ('skip', skip or 0),
+            ('limit', limit or 0),
+            ('projection', projection),
+        ]))
+
+    def get_time(self):
+        return asyncio.get_event_loop().time()
+
+    def is_active(self, namespace):
+        ''' Tells whether the cache has entries or reads in flight for `namespace`. '''
+        return namespace in self._keys_by_namespace or namespace in self._reads
+
+    def update_active(self, namespace, was_active):
+        is_active = self.is_active(namespace)
+        if is_active and not was_active:
+            add_active_namespace(namespace)
+        elif was_active and not is_active:
+            remove_active_namespace(namespace)
+
+    def start_read(self, namespace):
+        ''' Returns the generation of `namespace`, which writes bump while the read runs. '''
+        was_active = self.is_active(namespace)
+        reads = self._reads.setdefault(namespace, [0, 0])
+        reads[0] += 1
+        self.update_active(namespace, was_active)
+        return reads[1]
+
+    def end_read(self, namespace):
+        reads = self._reads[namespace]
+        reads[0] -= 1
+        if not reads[0]:
+            del self._reads[namespace]
+            self.update_active(namespace, True)
+
+    def get_generation(self, namespace):
+        reads = self._reads.get(namespace)
+        return reads[1] if reads is not None else 0
+
+    async def fetch(self, key, read, ttl, stale_while_revalidate=0):
+        '''
+        Returns the cached result of `key` if it is younger than `ttl`
+        seconds, or else the result of awaiting `read()`, which is cached.
+
+        Results older than `ttl` but younger than `ttl` plus
+        `stale_while_revalidate` are still returned while `read()` refreshes
+        them in the background.
+        '''
+        entry = self._entries.get(key)
+
+        if entry is not None:
+            age = self.get_time() - entry.stored_at
+
+            if age <= ttl:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return entry.get_value()
+
+            if age <= ttl + stale_while_revalidate:
+                self.stale_hits += 1
+                self._entries.move_to_end(key)
+                if key not in self._refreshing:
+                    self._refreshing.add(key)
+                    asyncio.ensure_future(self.refresh(key, read))
+                return entry.get_value()
+
+            self.discard(key)
+
+        self.misses += 1
+        generation = self.start_read(key[0])
+        try:
+            value = await read()
+            self.put(key, value, generation)
+        finally:
+            self.end_read(key[0])
+        return value
+
+    async def refresh(self, key, read):
+        generation = self.start_read(key[0])
+        try:
+            self.put(key, await read(), generation)
+        except Exception:
+            logger.exception("Refreshing a cached %s of '%s' failed.", key[1], key[0][1])
+        finally:
+            self.end_read(key[0])
+            self._refreshing.discard(key)
+
+    def put(self, key, value, generation):
+        namespace = key[0]
+        if self.get_generation(namespace) != generation:
+            # the collection was written to while reading
+            return
+
+        data = BSON.encode({'value': value})
+        if len(data) > self.max_bytes:
+            return
+
+        self.discard(key)
+        while self._entries and self.size + len(data) > self.max_bytes:
+            self.discard(next(iter(self._entries)))
+            self.evictions += 1
+
+        was_active = self.is_active(namespace)
+        self._entries[key] = CacheEntry(data, self.get_time())
+        self._keys_by_namespace.setdefault(namespace, set()).add(key)
+        self.size += len(data)
+        self.update_active(namespace, was_active)
+
+    def discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+
+        self.size -= len(entry.data)
+        keys = self._keys_by_namespace[key[0]]
+        keys.discard(key)
+        if not keys:
+            del self._keys_by_namespace[key[0]]
+            self.update_active(key[0], True)
+
+    def invalidate(self, namespace):
+        ''' Drops the entries of the collection `namespace` (an alias and a collection name). '''
+        reads = self._reads.get(namespace)
+        if reads is not None:
+            reads[1] += 1
+        for key in list(self._keys_by_namespace.get(namespace, ())):
+            self.discard(key)
+
+    def clear(self):
+        for key in list(self._entries):
+            self.discard(key)
+
+
+_default_cache = QueryCache()
+
+
+def set_query_cache(cache):
+    '''
+    Sets the cache used by `QuerySet.cache` when it is not given one.
+    '''
+    global _default_cache
+    _default_cache = cache
+
+
+def get_query_cache():
+    return _default_cache
+
+
+def has_cached_queries():
+    ''' Tells whether some cache has entries or reads in flight. '''
+    return bool(_active_namespaces)
+
+
+def invalidate_collection(namespace):
+    if namespace not in _active_namespaces:
+        return
+
+    for cache in list(_caches):
+        cache.invalidate(namespace)
@@ -1,16 +1,39 @@
+import asyncio
+import logging
 import sys
 
 from pymongo.errors import DuplicateKeyError
 from easydict import EasyDict as edict
 from bson.objectid import ObjectId
+from bson.son import SON
 
-from aiomotorengine import ASCENDING
+from aiomotorengine import ASCENDING, parallel
 from aiomotorengine.aggregation.base import Aggregation
-from aiomotorengine.connection import get_connection
-from aiomotorengine.errors import UniqueKeyViolationError
+from aiomotorengine.connection import get_connection, DEFAULT_CONNECTION_NAME
+from aiomotorengine.errors import UniqueKeyViolationError, ReadOnlyDocumentError
+from aiomotorengine.explain import get_explain_guard, summarize
+from aiomotorengine.monitoring import track, NULL_TRACKER
+from aiomotorengine.query_cache import get_query_cache, has_cached_queries, invalidate_collection
+from aiomotorengine.tenancy import get_tenant, get_tenant_resolver
+from aiomotorengine.utils import kill_cursor
+
+logger = logging.getLogger(__name__)
 
 DEFAULT_LIMIT = 1000
 
+# server side time limit (maxTimeMS) for find, count and aggregate,
+# None means no limit
+DEFAULT_MAX_TIME_MS = None
+
+
+def set_default_timeout(max_time_ms):
+    '''
+    Sets the server side time limit, in milliseconds, used by every query that
+    does not call `QuerySet.timeout`. Pass None to remove the limit.
+    '''
+    global DEFAULT_MAX_TIME_MS
+    DEFAULT_MAX_TIME_MS = max_time_ms
+
 
 class QuerySet(object):
     def __init__(self, klass):
@@ -19,22 +42,39 @@ class QuerySet(object):
         self._limit = None
         self._skip = None
         self._order_fields = []
+        self._max_time_ms = None
+        self._read_preference = None
+        self._hedge_policy = None
+        self._cache_ttl = None
+        self._cache_stale_while_revalidate = 0
+        self._query_cache = None
 
     @property
     def is_lazy(self):
         return self.__klass__.__lazy__
 
-    def coll(self, alias=None):
+    def get_alias(self, alias=None):
         if alias is not None:
-            conn = get_connection(alias=alias)
-        elif self.__klass__.__alias__ is not None:
-            conn = get_connection(alias=self.__klass__.__alias__)
-        else:
-            conn = get_connection()
+            return alias
+
+        if self.__klass__.__alias__ is not None:
+            return self.__klass__.__alias__
+
+        return DEFAULT_CONNECTION_NAME
+
+    def coll(self, alias=None):
+        alias = self.get_alias(alias)
 
+        resolver = get_tenant_resolver()
+        if resolver is not None and self.__klass__.__tenant_aware__:
+            tenant = get_tenant()
+            if tenant is not None:
+                return resolver.get_collection(self.__klass__, alias, tenant)
+
+        conn = get_connection(alias=alias)
         return conn[self.__klass__.__collection__]
 
-    async def create(self, alias=None, **kwargs):
+    async def create(self, alias=None, write_concern=None, **kwargs):
         '''
         Creates and saved a new instance of the document.
 
@@ -59,34 +99,148 @@ class QuerySet(object):
             io_loop.run_until_complete(create_user())
         '''
         document = self.__klass__(**kwargs)
-        return await self.save(document=document, alias=alias)
+        return await self.save(
+            document=document, alias=alias, write_concern=write_concern
+        )
 
     def update_field_on_save_values(self, document, creating):
         for field_name, field in self.__klass__._fields.items():
             if field.on_save is not None:
                 setattr(document, field_name, field.on_save(document, creating))
 
-    async def save(self, document, alias=None):
+    def get_write_concern(self, write_concern=None):
+        '''
+        Returns the write concern options to send along with a write.
+
+        An explicit `write_concern` (e.g. ``{'w': 0}`` or
+        ``{'w': 'majority', 'j': True}``) wins over the `__write_concern__`
+        of the document class. An empty dict means the client's default.
+        '''
+        if write_concern is None:
+            write_concern = self.__klass__.__write_concern__
+
+        return dict(write_concern or {})
+
+    def is_acknowledged(self, write_concern):
+        ''' Tells whether the server will acknowledge a write with this concern '''
+        return not (
+            write_concern.get('w', 1) == 0 and
+            not write_concern.get('j') and
+            not write_concern.get('fsync')
+        )
+
+    async def save(self, document, alias=None, write_concern=None):
+        self.check_writable()
         if self.validate_document(document):
             await self.ensure_index(alias=alias)
-            return await self.save_document(document, alias=alias)
+            return await self.save_document(
+                document, alias=alias, write_concern=write_concern
+            )
 
-    async def save_document(self, document, alias=None):
+    async def save_document(self, document, alias=None, write_concern=None):
         ''' Insert or update document '''
-        self.update_field_on_save_values(document, document._id is not None)
-        doc = document.to_son()
+        with track(self.__klass__, 'save', self.get_alias(alias)) as operation:
+            with operation.hydration():
+                self.update_field_on_save_values(document, document._id is not None)
+                doc = document.to_son()
+            operation.add_documents([doc])
+            write_concern = self.get_write_concern(write_concern)
+
+            if document._id is not None:
+                with operation.network():
+                    await self.coll(alias).update(
+                        self.get_identity_filter(document), doc, **write_concern
+                    )
+            else:
+                try:
+                    with operation.network():
+                        doc_id = await self.coll(alias).insert(doc, **write_concern)
+                except DuplicateKeyError as e:
+                    raise UniqueKeyViolationError.from_pymongo(
+                        str(e), self.__klass__
+                    )
+                document._id = doc_id
+                with operation.network():
+                    await self.update_rollups([document], alias=alias)
+            document.remember_shard_key()
+            self.invalidate_cache(alias)
+        document.acknowledged = self.is_acknowledged(write_concern)
+        return document
+
+    async def update_rollups(self, documents, alias=None):
+        '''
+        Applies the `__rollups__` of the document class for inserted `documents`.
+        '''
+        if not self.__klass__.__rollups__:
+            return
+
+        database = self.coll(alias).database
+        for rollup in self.__klass__.__rollups__:
+            await rollup.apply(database, documents)
+
+    def get_identity_filter(self, document):
+        '''
+        Returns the filter matching only `document`: its `_id` plus the values
+        of the `__shard_key__` fields, if the document class has one.
+
+        Including the shard key lets a sharded cluster route the operation to
+        a single shard instead of broadcasting it. The shard key values are the
+        ones the document was loaded or last saved with, so a document whose
+        shard key was changed since is still found (changing the shard key of
+        a document needs MongoDB 4.2+).
+        '''
+        query = {'_id': document._id}
 
-        if document._id is not None:
-            await self.coll(alias).update({'_id': document._id}, doc)
+        if document._shard_key_values is None:
+            query.update(document.get_shard_key_values())
         else:
-            try:
-                doc_id = await self.coll(alias).insert(doc)
-            except DuplicateKeyError as e:
-                raise UniqueKeyViolationError.from_pymongo(
-                    str(e), self.__klass__
-                )
-            document._id = doc_id
-        return document
+            query.update(document._shard_key_values)
+
+        return query
+
+    def check_shard_key(self, query, operation):
+        '''
+        Logs a warning (only if debug logging is enabled for this module)
+        when `query` does not include the first `__shard_key__` field and
+        would be broadcast to all shards.
+        '''
+        shard_key = self.__klass__.__shard_key__
+        if not shard_key or not logger.isEnabledFor(logging.DEBUG):
+            return
+
+        prefix = self.__klass__._fields[shard_key[0]].db_field
+        if prefix not in (query or {}):
+            logger.warning(
+                "%s.%s with filter %r does not include the shard key prefix '%s' "
+                "and will be sent to every shard.",
+                self.__klass__.__name__, operation, query, prefix
+            )
+
+    def get_local_replica(self, alias=None):
+        '''
+        Returns the local replica answering the reads of this queryset, if
+        the document class has ``__local_replica__ = True`` and its replica
+        is current (see :class:`aiomotorengine.local_replica.LocalReplica`).
+        '''
+        if not self.__klass__.__local_replica__:
+            return None
+
+        if self.__klass__.__tenant_aware__ and get_tenant_resolver() is not None and get_tenant() is not None:
+            return None
+
+        from aiomotorengine.local_replica import get_local_replica
+
+        replica = get_local_replica(self.__klass__, self.get_alias(alias))
+        if replica is None or not replica.is_current():
+            return None
+
+        return replica
+
+    def check_writable(self):
+        if self.__klass__.__read_only__:
+            raise ReadOnlyDocumentError(
+                "Documents of class '%s' are read-only." % self.__klass__.__name__
+            )
 
     def validate_document(self, document):
         if not isinstance(document, self.__klass__):
@@ -97,17 +251,54 @@ class QuerySet(object):
 
         return document.validate()
 
-    async def bulk_insert(self, documents, callback=None, alias=None):
+    async def bulk_insert(self, documents, callback=None, alias=None, write_concern=None):
         '''
         Inserts all documents passed to this method in one go.
+
+        Pass ``write_concern={'w': 0}`` for fire-and-forget inserts: ids are
+        generated on the client, so the documents still get their `_id`, and
+        their `acknowledged` attribute is False.
         '''
+        self.check_writable()
+
+        with track(self.__klass__, 'bulk_insert', self.get_alias(alias)) as operation:
+            with operation.hydration():
+                if parallel.use_process_pool(self.__klass__, len(documents)):
+                    docs_to_insert = await self.to_son_in_process_pool(documents)
+                else:
+                    docs_to_insert = self.to_son_for_insert(documents)
+
+            if docs_to_insert is None:
+                return
+
+            operation.add_documents(docs_to_insert)
+
+            with operation.network():
+                doc_ids = await self.coll(alias).insert(
+                    docs_to_insert, **self.get_write_concern(write_concern)
+                )
+
+            acknowledged = self.is_acknowledged(self.get_write_concern(write_concern))
+            for object_index, object_id in enumerate(doc_ids):
+                documents[object_index]._id = object_id
+                documents[object_index].acknowledged = acknowledged
+                documents[object_index].remember_shard_key()
+            self.invalidate_cache(alias)
+
+            with operation.network():
+                await self.update_rollups(documents, alias=alias)
+        return documents
 
-        is_valid = True
+    def to_son_for_insert(self, documents):
+        '''
+        Validates `documents` and returns their SON, or None if one of them
+        isn't valid.
+        '''
         docs_to_insert = []
 
         for document_index, document in enumerate(documents):
             try:
-                is_valid = is_valid and self.validate_document(document)
+                is_valid = self.validate_document(document)
             except Exception:
                 err = sys.exc_info()[1]
                 raise ValueError("Validation for document %d in the documents you are saving failed with: %s" % (
@@ -116,18 +307,23 @@ class QuerySet(object):
                 ))
 
             if not is_valid:
-                return
+                return None
 
             docs_to_insert.append(document.to_son())
 
-        if not is_valid:
-            return
+        return docs_to_insert
 
-        doc_ids = await self.coll(alias).insert(docs_to_insert)
+    async def to_son_in_process_pool(self, documents):
+        for document_index, document in enumerate(documents):
+            if not isinstance(document, self.__klass__):
+                raise ValueError("Validation for document %d in the documents you are saving failed with: %s" % (
+                    document_index,
+                    "This queryset for class '%s' can't save an instance of type '%s'." % (
+                        self.__klass__.__name__, document.__class__.__name__
+                    )
+                ))
 
-        for object_index, object_id in enumerate(doc_ids):
-            documents[object_index]._id = object_id
-        return documents
+        return await parallel.to_son(documents)
 
     def transform_definition(self, definition):
         from aiomotorengine.fields.base_field import BaseField
@@ -142,27 +338,54 @@ class QuerySet(object):
 
         return result
 
-    async def update(self, definition, alias=None):
+    async def update(self, definition, alias=None, write_concern=None):
+        '''
+        Updates all documents matching the filters (if any) with `$set`.
+
+        Returns an object with `count`, `updated_existing` and `acknowledged`.
+        If the write concern asked for no acknowledgement (``w=0``), the
+        server does not report anything back: `acknowledged` is False and
+        both `count` and `updated_existing` are None.
+        '''
 
+        self.check_writable()
         definition = self.transform_definition(definition)
+        write_concern = self.get_write_concern(write_concern)
 
         update_filters = {}
         if self._filters:
             update_filters = self.get_query_from_filters(self._filters)
+        self.check_shard_key(update_filters, 'update')
 
         update_arguments = dict(
             spec=update_filters,
             document={'$set': definition},
             multi=True,
         )
-        res = await self.coll(alias).update(**update_arguments)
+        update_arguments.update(write_concern)
+
+        with track(self.__klass__, 'update', self.get_alias(alias), update_filters) as operation:
+            with operation.network():
+                res = await self.coll(alias).update(**update_arguments)
+            self.invalidate_cache(alias)
+            if res:
+                operation.add_count(int(res['n']))
+
+        if not self.is_acknowledged(write_concern):
+            return edict({
+                "count": None,
+                "updated_existing": None,
+                "acknowledged": False
+            })
+
         return edict({
             "count": int(res['n']),
-            "updated_existing": res['updatedExisting']
+            "updated_existing": res['updatedExisting'],
+            "acknowledged": True
         })
 
     # TODO rewrite docstring
-    async def delete(self, alias=None):
+    async def delete(self, alias=None, write_concern=None):
         '''
         Removes all instances of this document that match the specified filters (if any).
 
@@ -190,25 +413,63 @@ class QuerySet(object):
             io_loop.run_until_complete(saving_delete())
         '''
 
-        return await self.remove(alias=alias)
+        return await self.remove(alias=alias, write_concern=write_concern)
 
-    async def remove(self, instance=None, alias=None):
+    async def remove(self, instance=None, alias=None, write_concern=None):
+        '''
+        Removes the given instance or all documents matching the filters.
+
+        Returns the number of removed documents, or None if the write
+        concern asked for no acknowledgement (``w=0``). A removed `instance`
+        also gets its `acknowledged` attribute set.
+        '''
+        self.check_writable()
+        write_concern = self.get_write_concern(write_concern)
 
         if instance is not None:
+            remove_filters = None
             if hasattr(instance, '_id') and instance._id:
-                res = await self.coll(alias).remove(instance._id)
+                remove_filters = self.get_identity_filter(instance)
         else:
+            remove_filters = {}
             if self._filters:
                 remove_filters = self.get_query_from_filters(self._filters)
-                res = await self.coll(alias).remove(remove_filters)
-            else:
-                res = await self.coll(alias).remove()
+            self.check_shard_key(remove_filters, 'remove')
+
+        res = None
+        with track(self.__klass__, 'remove', self.get_alias(alias), remove_filters) as operation:
+            with operation.network():
+                if remove_filters:
+                    res = await self.coll(alias).remove(
+                        remove_filters, **write_concern
+                    )
+                elif instance is None:
+                    res = await self.coll(alias).remove(**write_concern)
+            self.invalidate_cache(alias)
+            if res:
+                operation.add_count(res['n'])
+
+        if instance is not None and remove_filters:
+            instance.acknowledged = self.is_acknowledged(write_concern)
+
+        if not self.is_acknowledged(write_concern):
+            return None
+
+        if res is None:
+            # the instance was never saved
+            return 0
+
         return res['n']
 
     async def get(self, id=None, alias=None, **kwargs):
         '''
         Gets a single item of the current queryset collection using it's id.
 
+        Filters passed as keyword arguments are added to the id, which lets
+        sharded documents include their shard key::
+
+            event = await Event.objects.get(event_id, tenant_id=tenant_id)
+
         In order to query a different database, please specify the `alias` of the database to query.
         '''
 
@@ -224,21 +485,106 @@ class QuerySet(object):
             filters = {
                 "_id": id
             }
+            if kwargs:
+                filters.update(self.get_query_from_filters(Q(**kwargs)))
         else:
             filters = Q(**kwargs)
             filters = self.get_query_from_filters(filters)
 
-        instance = await self.coll(alias).find_one(filters)
-        if instance is None:
-            return None
-        else:
-            doc = self.__klass__.from_son(instance)
+        replica = self.get_local_replica(alias)
+        if replica is None:
+            self.check_shard_key(filters, 'get')
+            await self.check_query_plan(filters, 'get', alias=alias)
+
+        async def read(read_preference):
+            return await self._find_one(
+                filters, alias=alias, read_preference=read_preference
+            )
+
+        with track(self.__klass__, 'get', self.get_alias(alias), filters) as operation:
+            if replica is not None:
+                instance = replica.find_one(filters)
+            else:
+                with operation.network():
+                    instance = await self._read(read)
+
+            if instance is None:
+                return None
+
+            operation.add_documents([instance])
+            with operation.hydration():
+                doc = self.__klass__.from_son(instance)
+
             if self.is_lazy:
                 return doc
             else:
                 await doc.load_references()
                 return doc
 
+    async def reload(self, document, alias=None):
+        '''
+        Reloads the values of `document` from the database.
+
+        The document is looked up by its id and shard key (see
+        `get_identity_filter`). Returns the document, or None if it is not in
+        the database anymore.
+        '''
+        son = await self._find_one(self.get_identity_filter(document), alias=alias)
+        if son is None:
+            return None
+
+        document._values = self.__klass__.from_son(son)._values
+        document.remember_shard_key()
+
+        if not self.is_lazy:
+            await document.load_references()
+
+        return document
+
+    async def _read(self, read):
+        if self._hedge_policy is None:
+            return await read(None)
+        return await self._hedge_policy.run(read, self._read_preference)
+
+    def get_read_collection(self, alias=None, read_preference=None):
+        '''
+        Returns the collection to read from with `read_preference` (by
+        default the one of `read_preference()`) and the arguments to give
+        to its `find`/`find_one`.
+
+        Drivers with `with_options` (pymongo 3+) get a copy of the
+        collection using the read preference; Motor 0.5 / pymongo 2.8 take
+        it as an argument of `find`.
+        '''
+        coll = self.coll(alias)
+
+        if read_preference is None:
+            read_preference = self._read_preference
+
+        if read_preference is None:
+            return coll, {}
+
+        if hasattr(coll, 'with_options'):
+            return coll.with_options(read_preference=read_preference), {}
+
+        return coll, {'read_preference': read_preference}
+
+    async def _find_one(self, filters, alias=None, read_preference=None):
+        coll, read_arguments = self.get_read_collection(alias, read_preference)
+
+        max_time_ms = self.get_max_time_ms()
+        if max_time_ms is None:
+            return await coll.find_one(filters, **read_arguments)
+
+        cursor = coll.find(filters, **read_arguments).limit(-1)
+        cursor.max_time_ms(max_time_ms)
+        try:
+            docs = await cursor.to_list(length=1)
+        except asyncio.CancelledError:
+            kill_cursor(cursor)
+            raise
+        return docs[0] if docs else None
+
     def get_query_from_filters(self, filters):
         if not filters:
             return {}
@@ -246,8 +592,23 @@ class QuerySet(object):
         query = filters.to_query(self.__klass__)
         return query
 
-    def _get_find_cursor(self, alias):
-        find_arguments = {}
+    def to_predicate(self):
+        '''
+        Returns a function telling whether a document (or a SON dict) matches
+        the filters of this queryset, evaluated in Python (see `QNode.to_predicate`).
+
+        Usage::
+
+            is_admin = User.objects.filter(is_admin=True).to_predicate()
+            admins = [user for user in users if is_admin(user)]
+        '''
+        if not self._filters:
+            return lambda item: True
+
+        return self._filters.to_predicate(self.__klass__)
+
+    def _get_find_cursor(self, alias, query_filters=None, read_preference=None):
+        coll, find_arguments = self.get_read_collection(alias, read_preference)
 
         if self._order_fields:
             find_arguments['sort'] = self._order_fields
@@ -258,9 +619,16 @@ class QuerySet(object):
         if self._skip:
             find_arguments['skip'] = self._skip
 
-        query_filters = self.get_query_from_filters(self._filters)
+        if query_filters is None:
+            query_filters = self.get_query_from_filters(self._filters)
+
+        cursor = coll.find(query_filters, **find_arguments)
+
+        max_time_ms = self.get_max_time_ms()
+        if max_time_ms is not None:
+            cursor.max_time_ms(max_time_ms)
 
-        return self.coll(alias).find(query_filters, **find_arguments)
+        return cursor
 
     def filter(self, *arguments, **kwargs):
         '''
@@ -354,6 +722,110 @@ class QuerySet(object):
         self._limit = limit
         return self
 
+    def timeout(self, max_time_ms):
+        '''
+        Limits the time the server may spend on subsequent queries (`maxTimeMS`).
+
+        Applies to `get`, `find_all`, `count` and aggregations started from
+        this queryset. Overrides the default set with `set_default_timeout`.
+
+        Usage::
+
+            users = await User.objects.filter(name="Bernardo").timeout(500).find_all()
+        '''
+
+        self._max_time_ms = max_time_ms
+        return self
+
+    def read_preference(self, read_preference):
+        '''
+        Routes subsequent reads (`get`, `find_all`, `count`) with the given pymongo read preference.
+
+        Usage::
+
+            from pymongo import ReadPreference
+
+            users = await User.objects.read_preference(
+                ReadPreference.SECONDARY_PREFERRED
+            ).find_all()
+        '''
+
+        self._read_preference = read_preference
+        return self
+
+    def hedge(self, policy):
+        '''
+        Hedges subsequent `get` and `find_all` calls with the given :class:`aiomotorengine.hedging.HedgePolicy`.
+
+        If the first request did not answer within the policy delay, the same
+        query is sent again with the policy hedge read preference (see
+        `HedgePolicy.get_hedge_read_preference`) and the first answer wins,
+        so a hedged read may return data from a secondary. Pass None to
+        disable hedging.
+
+        Usage::
+
+            from aiomotorengine.hedging import HedgePolicy
+
+            policy = HedgePolicy(percentile=95)
+            user = await User.objects.hedge(policy).get(user_id)
+            print(policy.stats.as_dict())
+        '''
+
+        self._hedge_policy = policy
+        return self
+
+    def cache(self, ttl, stale_while_revalidate=0, cache=None):
+        '''
+        Caches the results of subsequent `find_all` and `count` calls for
+        `ttl` seconds, keyed by the compiled filters, sorting, skip and limit.
+
+        Results up to `stale_while_revalidate` seconds older than `ttl` are
+        still returned, while the query runs again in the background. Writes
+        made through a queryset of the same document class invalidate the
+        cached results. `cache` defaults to the cache set with
+        :func:`aiomotorengine.query_cache.set_query_cache`.
+
+        Usage::
+
+            plans = await Plan.objects.filter(status='active').order_by('rank').limit(50).cache(
+                ttl=5, stale_while_revalidate=30
+            ).find_all()
+        '''
+
+        self._cache_ttl = ttl
+        self._cache_stale_while_revalidate = stale_while_revalidate
+        self._query_cache = cache
+        return self
+
+    def get_cache_namespace(self, alias=None):
+        return self.get_alias(alias), self.coll(alias).full_name
+
+    def invalidate_cache(self, alias=None):
+        ''' Drops the cached results of queries on this queryset collection. '''
+        if not has_cached_queries():
+            # nothing is cached, don't pay for the namespace
+            return
+        invalidate_collection(self.get_cache_namespace(alias))
+
+    async def _read_cached(self, operation, query_filters, read, alias=None, sort=None, skip=None, limit=None):
+        if self._cache_ttl is None:
+            return await read()
+
+        cache = self._query_cache
+        if cache is None:
+            cache = get_query_cache()
+        key = cache.get_key(
+            self.get_cache_namespace(alias), operation, query_filters, sort=sort, skip=skip, limit=limit
+        )
+        return await cache.fetch(key, read, self._cache_ttl, self._cache_stale_while_revalidate)
+
+    def get_max_time_ms(self):
+        if self._max_time_ms is not None:
+            return self._max_time_ms
+
+        return DEFAULT_MAX_TIME_MS
+
     def order_by(self, field_name, direction=ASCENDING):
         '''
         Specified the order to be used when returning documents in subsequent queries.
@@ -401,20 +873,223 @@ class QuerySet(object):
         else:
             to_list_arguments['length'] = DEFAULT_LIMIT
 
-        cursor = self._get_find_cursor(alias=alias)
-
+        query_filters = self.get_query_from_filters(self._filters)
+        replica = self.get_local_replica(alias)
+        if replica is not None:
+            predicate = self.to_predicate()
+        else:
+            self.check_shard_key(query_filters, 'find_all')
+            await self.check_query_plan(query_filters, 'find_all', alias=alias)
         self._filters = {}
 
-        docs = await cursor.to_list(**to_list_arguments)
+        async def read(read_preference):
+            cursor = self._get_find_cursor(
+                alias=alias, query_filters=query_filters,
+                read_preference=read_preference
+            )
+            try:
+                return await cursor.to_list(**to_list_arguments)
+            except asyncio.CancelledError:
+                kill_cursor(cursor)
+                raise
+
+        with track(self.__klass__, 'find_all', self.get_alias(alias), query_filters) as operation:
+            if replica is not None:
+                docs = replica.find(
+                    query_filters, predicate, sort=self._order_fields,
+                    skip=self._skip, limit=to_list_arguments['length']
+                )
+            else:
+                with operation.network():
+                    docs = await self._read_cached(
+                        'find_all', query_filters, lambda: self._read(read), alias=alias,
+                        sort=self._order_fields, skip=self._skip, limit=to_list_arguments['length']
+                    )
+            operation.add_documents(docs)
 
-        result = []
-        for doc in docs:
-            obj = self.__klass__.from_son(doc)
+            return await self.hydrate(docs, lazy=lazy, operation=operation)
 
+    async def hydrate(self, docs, lazy=None, operation=NULL_TRACKER):
+        '''
+        Builds documents from raw SON dicts, loading their references unless lazy.
+        '''
+        with operation.hydration():
+            result = [self.__klass__.from_son(doc) for doc in docs]
+
+        for obj in result:
             if (lazy is not None and not lazy) or not obj.is_lazy:
                 await obj.load_references(obj._fields)
 
-            result.append(obj)
+        return result
+
+    def _get_column_cursor(self, builder, alias=None):
+        find_arguments = {}
+        if self._order_fields:
+            find_arguments['sort'] = self._order_fields
+        if self._limit:
+            find_arguments['limit'] = self._limit
+        if self._skip:
+            find_arguments['skip'] = self._skip
+
+        query_filters = self.get_query_from_filters(self._filters)
+        self._filters = {}
+
+        cursor = self.coll(alias).find(query_filters, builder.projection, **find_arguments)
+
+        max_time_ms = self.get_max_time_ms()
+        if max_time_ms is not None:
+            cursor.max_time_ms(max_time_ms)
+
+        return query_filters, cursor
+
+    async def to_columns(self, fields, dtype_map=None, batch_size=None, alias=None):
+        '''
+        Returns a dict with a NumPy array of the values of each of `fields`
+        for the documents matching the filters (honouring `order_by`,
+        `skip` and `limit`, with no default limit).
+
+        Only the requested fields are read and no document is built: the
+        raw values fill arrays typed after the fields (see
+        :class:`aiomotorengine.columns.ColumnBuilder`), growing by doubling
+        from `batch_size` (or the limit) values. Requires `numpy`.
+
+        Usage::
+
+            columns = await User.objects.filter(is_active=True).to_columns(
+                ['age', 'created_at'], dtype_map={'age': 'int32'}
+            )
+            columns['age'].mean()
+        '''
+        from aiomotorengine.columns import ColumnBuilder, DEFAULT_BATCH_SIZE
+
+        builder = ColumnBuilder(
+            self.__klass__, fields, dtype_map=dtype_map,
+            capacity=self._limit or batch_size or DEFAULT_BATCH_SIZE
+        )
+        query_filters, cursor = self._get_column_cursor(builder, alias=alias)
+
+        with track(self.__klass__, 'to_columns', self.get_alias(alias), query_filters) as operation:
+            try:
+                async for son in cursor:
+                    builder.append(son)
+            except asyncio.CancelledError:
+                kill_cursor(cursor)
+                raise
+            operation.add_count(builder.size)
+
+        return builder.get_columns()
+
+    async def to_record_batches(self, fields, dtype_map=None, batch_size=None, alias=None):
+        '''
+        Yields the values of `fields` for the documents matching the filters
+        as Arrow record batches of `batch_size` rows, typed like the columns
+        of `to_columns`. Requires `numpy` and `pyarrow`.
+
+        Usage::
+
+            async for batch in Event.objects.to_record_batches(['kind', 'value'], batch_size=50000):
+                writer.write_batch(batch)
+        '''
+        from aiomotorengine.columns import ColumnBuilder, DEFAULT_BATCH_SIZE
+
+        batch_size = batch_size or DEFAULT_BATCH_SIZE
+        builder = ColumnBuilder(self.__klass__, fields, dtype_map=dtype_map, capacity=batch_size)
+        query_filters, cursor = self._get_column_cursor(builder, alias=alias)
+
+        try:
+            async for son in cursor:
+                builder.append(son)
+                if builder.size == batch_size:
+                    yield builder.get_record_batch()
+                    builder.reset()
+        except asyncio.CancelledError:
+            kill_cursor(cursor)
+            raise
+
+        if builder.size:
+            yield builder.get_record_batch()
+
+    async def _fetch_facets(self, facets, alias=None):
+        query_filters = self.get_query_from_filters(self._filters)
+        self._filters = {}
+
+        aggregation = self.aggregate.raw([
+            {'$match': query_filters},
+            {'$facet': facets},
+        ])
+
+        # close the stream here, so its cursor and operation are done when
+        # this returns rather than when the generator is collected
+        rows = aggregation.stream(as_dict=True, alias=alias)
+        try:
+            async for row in rows:
+                return row
+        finally:
+            await rows.aclose()
+
+        return {}
+
+    async def page_with_total(self, lazy=None, alias=None):
+        '''
+        Returns a page of documents (honouring `order_by`, `skip` and `limit`)
+        and the total number of documents matching the filters, fetched with a
+        single `$facet` aggregation instead of `find_all` plus `count`.
+
+        Usage::
+
+            users, total = await User.objects.filter(is_admin=True).order_by(
+                'first_name'
+            ).skip(20).limit(10).page_with_total()
+        '''
+        page = []
+        if self._order_fields:
+            page.append({'$sort': SON(self._order_fields)})
+        if self._skip:
+            page.append({'$skip': self._skip})
+        page.append({'$limit': self._limit or DEFAULT_LIMIT})
+
+        row = await self._fetch_facets({
+            'items': page,
+            'total': [{'$count': 'total'}],
+        }, alias=alias)
+
+        total = row.get('total') or [{}]
+        documents = await self.hydrate(row.get('items', []), lazy=lazy)
+
+        return documents, total[0].get('total', 0)
+
+    async def count_by(self, filters, alias=None):
+        '''
+        Counts, in a single `$facet` aggregation, the documents matching each
+        of the named `filters` (Q objects or dicts of filter arguments) among
+        the documents matching the queryset filters.
+
+        Usage::
+
+            counts = await User.objects.filter(is_admin=False).count_by({
+                'active': Q(is_active=True),
+                'recent': {'created_at__gt': last_week},
+            })
+            # {'active': 10, 'recent': 2}
+        '''
+        from aiomotorengine.query_builder.node import Q
+
+        facets = {}
+        for name, named_filter in filters.items():
+            if isinstance(named_filter, dict):
+                named_filter = Q(**named_filter)
+
+            facets[name] = [
+                {'$match': self.get_query_from_filters(named_filter)},
+                {'$count': 'count'},
+            ]
+
+        row = await self._fetch_facets(facets, alias=alias)
+
+        result = {}
+        for name in filters:
+            counts = row.get(name) or [{}]
+            result[name] = counts[0].get('count', 0)
 
         return result
 
@@ -422,9 +1097,129 @@ class QuerySet(object):
         '''
         Returns the number of documents in the collection that match the specified filters, if any.
         '''
-        cursor = self._get_find_cursor(alias=alias)
+        query_filters = self.get_query_from_filters(self._filters)
+        replica = self.get_local_replica(alias)
+        if replica is not None:
+            predicate = self.to_predicate()
+        else:
+            await self.check_query_plan(query_filters, 'count', alias=alias)
+        self._filters = {}
+
+        with track(self.__klass__, 'count', self.get_alias(alias), query_filters) as operation:
+            if replica is not None:
+                count = replica.count(query_filters, predicate)
+            else:
+                cursor = self._get_find_cursor(alias=alias, query_filters=query_filters)
+                with operation.network():
+                    count = await self._read_cached('count', query_filters, cursor.count, alias=alias)
+            operation.add_count(count)
+        return count
+
+    async def explain(self, alias=None):
+        '''
+        Returns the query plan of the current filters, sorting, skip and limit.
+
+        The result has the `winning_plan`, its `stages`, whether it is a
+        `collection_scan`, the `execution_stats` (returned, docs_examined,
+        keys_examined and time_ms) and the `raw` explain output.
+
+        Usage::
+
+            plan = await User.objects.filter(email="bernardo@gmail.com").explain()
+            assert not plan.collection_scan
+        '''
+        query_filters = self.get_query_from_filters(self._filters)
+        self._filters = {}
+
+        cursor = self._get_find_cursor(alias=alias, query_filters=query_filters)
+        return summarize(await cursor.explain())
+
+    async def check_query_plan(self, query_filters, operation, alias=None):
+        '''
+        Checks the plan of a query with the explain guard, if one is installed
+        (see :func:`aiomotorengine.explain.set_explain_guard`).
+        '''
+        guard = get_explain_guard()
+        if guard is None or not query_filters:
+            return
+
+        cursor = self._get_find_cursor(alias=alias, query_filters=query_filters)
+        summary = summarize(await cursor.explain())
+        guard.check(summary, self.__klass__, operation, query_filters)
+
+    def parallel_scan(
+        self, partitions, field='_id', checkpoint=None, checkpoint_interval=1000,
+        batch_size=None, lazy=None, alias=None
+    ):
+        '''
+        Returns a :class:`aiomotorengine.parallel_scan.ParallelScan` reading the
+        documents matching the filters with `partitions` concurrent cursors,
+        each over a range of `field` (an indexed field, the `_id` by default).
+        Documents are yielded as they arrive, in no particular order.
+
+        Pass a :class:`aiomotorengine.parallel_scan.ScanCheckpointStore` as
+        `checkpoint` to be able to resume a scan that stopped.
+
+        Usage::
+
+            store = ScanCheckpointStore('export-users')
+            async with User.objects.filter(is_active=True).parallel_scan(
+                partitions=8, checkpoint=store
+            ) as scan:
+                async for user in scan:
+                    await export(user)
+        '''
+        from aiomotorengine.parallel_scan import ParallelScan
+
+        if field != '_id':
+            field = self.__klass__._fields[field].db_field
+
+        query_filters = self.get_query_from_filters(self._filters)
+        self._filters = {}
+
+        return ParallelScan(
+            self, query_filters, partitions, field=field, checkpoint=checkpoint,
+            checkpoint_interval=checkpoint_interval, batch_size=batch_size, lazy=lazy, alias=alias
+        )
+
+    def watch(
+        self, full_document=None, resume_after=None, start_after=None, batch_size=None,
+        max_await_time_ms=None, token_store=None, alias=None
+    ):
+        '''
+        Returns a :class:`aiomotorengine.change_stream.ChangeStream` of the
+        changes of this queryset collection, as `ChangeEvent` objects whose
+        `document` is built with `from_son`.
+
+        Filters apply to the full document of the events, so pass
+        ``full_document='updateLookup'`` to get (and filter) the documents of
+        ``update`` events; ``delete`` events never match filters.
+
+        Usage::
+
+            store = ResumeTokenStore('search-indexer')
+            async with User.objects.filter(is_admin=True).watch(
+                full_document='updateLookup', token_store=store
+            ) as stream:
+                async for event in stream:
+                    print(event.operation_type, event.document)
+
+        Pass `resume_after` (the `resume_token` of a stream or an event) or a
+        `token_store` to continue after a restart. `batch_size` and
+        `max_await_time_ms` are sent to the server.
+        '''
+        from aiomotorengine.change_stream import ChangeStream, get_change_filter
+
+        pipeline = []
+        if self._filters:
+            pipeline.append({'$match': get_change_filter(self.get_query_from_filters(self._filters))})
         self._filters = {}
-        return await cursor.count()
+
+        return ChangeStream(
+            self, pipeline, full_document=full_document, resume_after=resume_after,
+            start_after=start_after, batch_size=batch_size, max_await_time_ms=max_await_time_ms,
+            token_store=token_store, alias=alias
+        )
 
     @property
     def aggregate(self):
@@ -0,0 +1,108 @@
+import logging
+import os
+import traceback
+from contextvars import ContextVar
+
+from aiomotorengine.errors import RepeatedQueryError
+from aiomotorengine.monitoring import register_listener, unregister_listener
+
+logger = logging.getLogger(__name__)
+
+PACKAGE_PATH = os.path.dirname(os.path.abspath(__file__))
+
+_current_scope = ContextVar('aiomotorengine_repeated_queries', default=None)
+_active_scopes = 0
+
+
+def get_call_site_stack():
+    ''' Returns the formatted stack without the frames of this package. '''
+    frames = [
+        frame for frame in traceback.extract_stack()
+        if not os.path.abspath(frame.filename).startswith(PACKAGE_PATH)
+    ]
+    return "".join(traceback.format_list(frames))
+
+
+def on_operation(event):
+    scope = _current_scope.get()
+    if scope is not None:
+        scope.count(event)
+
+
+class detect_repeated_queries(object):
+    '''
+    Context manager detecting N+1 queries: the same operation, with the same
+    filter shape (see :func:`aiomotorengine.monitoring.get_filter_shape`),
+    running more than `threshold` times in the scope. This is what happens
+    when code loops over `find_all()` results and calls `load_references()`
+    or `objects.get()` for each item.
+
+    With `mode='raise'` a :class:`aiomotorengine.errors.RepeatedQueryError`
+    is raised after the offending operation, with `mode='log'` a warning is
+    logged (once per shape); both include the stack of the call site.
+
+    The scope is kept in a context variable, so concurrent requests handled
+    in their own tasks are counted separately:
+
+    .. code-block:: python
+
+        async def handle(request):
+            with detect_repeated_queries(threshold=10):
+                ...
+
+    Every operation is tracked while a scope is active, so this is meant
+    for development and staging.
+    '''
+
+    def __init__(self, threshold=5, mode='raise'):
+        if mode not in ('raise', 'log'):
+            raise ValueError("Invalid repeated queries mode '%s': use 'raise' or 'log'." % mode)
+
+        self.threshold = threshold
+        self.mode = mode
+        self.counts = {}
+        self.reported = set()
+        self._token = None
+
+    def get_key(self, event):
+        return (event.document_class.__name__, event.operation, event.filter_shape)
+
+    def count(self, event):
+        key = self.get_key(event)
+        self.counts[key] = self.counts.get(key, 0) + 1
+
+        # failed operations (e.g. a dereference failing because one of its
+        # gets was reported) are counted but don't replace their error
+        if self.counts[key] <= self.threshold or event.error is not None or key in self.reported:
+            return
+        self.reported.add(key)
+
+        message = "%s.%s with filter %s ran more than %d times in the same scope (N+1 queries?) at:\n%s" % (
+            key[0], key[1], key[2] or '{}', self.threshold, get_call_site_stack()
+        )
+
+        if self.mode == 'raise':
+            raise RepeatedQueryError(message)
+
+        logger.warning(message)
+
+    def __enter__(self):
+        global _active_scopes
+
+        if not _active_scopes:
+            register_listener(on_operation)
+        _active_scopes += 1
+
+        self.counts = {}
+        self.reported = set()
+        self._token = _current_scope.set(self)
+        return self
+
+    def __exit__(self, *args):
+        global _active_scopes
+
+        _current_scope.reset(self._token)
+
+        _active_scopes -= 1
+        if not _active_scopes:
+            unregister_listener(on_operation)
@@ -0,0 +1,139 @@
+from datetime import datetime
+
+from aiomotorengine.backends.pipeline import freeze
+
+BUCKETS = ('minute', 'hour', 'day', 'month', 'year')
+
+
+def truncate(value, bucket):
+    '''
+    Truncates a datetime to the start of its `bucket`.
+    '''
+    if bucket not in BUCKETS:
+        raise ValueError("Invalid rollup bucket '%s': use one of %s." % (bucket, ", ".join(BUCKETS)))
+
+    value = value.replace(second=0, microsecond=0)
+    if bucket == 'minute':
+        return value
+
+    value = value.replace(minute=0)
+    if bucket == 'hour':
+        return value
+
+    value = value.replace(hour=0)
+    if bucket == 'day':
+        return value
+
+    value = value.replace(day=1)
+    if bucket == 'month':
+        return value
+
+    return value.replace(month=1)
+
+
+class Rollup(object):
+    '''
+    Counters of a document kept up to date as documents are inserted.
+
+    Each inserted document increments, in `collection`, the row identified
+    by the values of its `group_by` fields and by its `time_field` truncated
+    to `bucket` (minute, hour, day, month or year):
+
+    * `count` (if not None) is the name of the counter of documents;
+    * `sums` maps field names of the document to the names of the counters
+      summing their values.
+
+    .. code-block:: python
+
+        class PageView(Document):
+            __rollups__ = [
+                Rollup(
+                    'page_views_per_day', group_by=['user'], time_field='created_at',
+                    bucket='day', sums={'duration': 'total_duration'}
+                ),
+            ]
+
+            user = StringField()
+            duration = IntField()
+            created_at = DateTimeField(auto_now_on_insert=True)
+
+    Rows look like ``{'user': 'bernardo', 'created_at': datetime(2016, 1, 1),
+    'count': 3, 'total_duration': 42}``. Rows are keyed by the grouping
+    fields, so an index on them keeps the upserts (and the reads) cheap.
+
+    Inserts through `save` and `bulk_insert` apply all the increments of the
+    batch with one unordered bulk of `$inc` upserts. Updates and removes
+    don't touch the counters.
+    '''
+
+    def __init__(self, collection, group_by=(), time_field=None, bucket='day', count='count', sums=None):
+        if time_field is not None and bucket not in BUCKETS:
+            raise ValueError("Invalid rollup bucket '%s': use one of %s." % (bucket, ", ".join(BUCKETS)))
+
+        self.collection = collection
+        self.group_by = list(group_by)
+        self.time_field = time_field
+        self.bucket = bucket
+        self.count = count
+        self.sums = dict(sums or {})
+
+    def get_key(self, document):
+        key = {}
+
+        for field_name in self.group_by:
+            field = document._fields[field_name]
+            key[field.db_field] = field.to_son(document.get_field_value(field_name))
+
+        if self.time_field is not None:
+            field = document._fields[self.time_field]
+            value = document.get_field_value(self.time_field)
+            if isinstance(value, datetime):
+                value = truncate(value, self.bucket)
+            key[field.db_field] = value
+
+        return key
+
+    def get_increments(self, document):
+        increments = {}
+
+        if self.count is not None:
+            increments[self.count] = 1
+
+        for field_name, counter in self.sums.items():
+            value = document.get_field_value(field_name)
+            if value is not None:
+                increments[counter] = value
+
+        return increments
+
+    def collect(self, documents):
+        '''
+        Returns the (key, increments) pairs for `documents`, one per row.
+        '''
+        rows = {}
+
+        for document in documents:
+            key = self.get_key(document)
+            # list and embedded document values aren't hashable
+            row_id = freeze(key)
+
+            if row_id not in rows:
+                rows[row_id] = (key, {})
+
+            increments = rows[row_id][1]
+            for counter, value in self.get_increments(document).items():
+                increments[counter] = increments.get(counter, 0) + value
+
+        return list(rows.values())
+
+    async def apply(self, database, documents):
+        rows = self.collect(documents)
+        if not rows:
+            return 0
+
+        bulk = database[self.collection].initialize_unordered_bulk_op()
+        for key, increments in rows:
+            bulk.find(key).upsert().update_one({'$inc': increments})
+        await bulk.execute()
+
+        return len(rows)
@@ -0,0 +1,142 @@
+from collections import OrderedDict
+from contextvars import ContextVar
+
+from aiomotorengine.connection import get_connection
+
+DEFAULT_MAX_HANDLES = 1024
+
+_current_tenant = ContextVar('aiomotorengine_tenant', default=None)
+_tenant_resolver = None
+
+
+def get_tenant():
+    ''' Returns the tenant of the current context (None if no tenant is set). '''
+    return _current_tenant.get()
+
+
+def set_tenant(tenant):
+    '''
+    Sets the tenant of the current context.
+
+    Returns a token that can be given to `reset_tenant` to restore the
+    previous tenant. Tasks started after this call inherit the tenant.
+    '''
+    return _current_tenant.set(tenant)
+
+
+def reset_tenant(token):
+    _current_tenant.reset(token)
+
+
+class use_tenant(object):
+    '''
+    Context manager that sets the tenant of the current context.
+
+    .. code-block:: python
+
+        with use_tenant('acme'):
+            users = await User.objects.find_all()  # reads from acme's database
+    '''
+
+    def __init__(self, tenant):
+        self.tenant = tenant
+        self._token = None
+
+    def __enter__(self):
+        self._token = set_tenant(self.tenant)
+        return self.tenant
+
+    def __exit__(self, *args):
+        reset_tenant(self._token)
+
+
+def set_tenant_resolver(resolver):
+    '''
+    Installs the :class:`TenantResolver` consulted by `QuerySet.coll`.
+
+    Pass None to stop routing by tenant.
+    '''
+    global _tenant_resolver
+    _tenant_resolver = resolver
+
+
+def get_tenant_resolver():
+    return _tenant_resolver
+
+
+class TenantResolver(object):
+    '''
+    Picks the database and collection of a document for a tenant.
+
+    `database` and `collection_prefix` are either format strings (using
+    ``{tenant}``) or callables receiving the tenant. If `database` is None
+    the database of the connection is kept, which is the usual setup when
+    tenants share a database and only the collection prefix changes:
+
+    .. code-block:: python
+
+        # one database per tenant
+        set_tenant_resolver(TenantResolver(database='tenant_{tenant}'))
+
+        # one collection per tenant, all in the connection's database
+        set_tenant_resolver(TenantResolver(collection_prefix='{tenant}_'))
+
+    All tenants of an alias share the alias' Motor client (and so its pool).
+    Resolved collection handles are kept in a LRU of at most `max_handles`
+    entries.
+
+    Documents with `__tenant_aware__ = False` are never routed.
+    '''
+
+    def __init__(self, database=None, collection_prefix=None, max_handles=DEFAULT_MAX_HANDLES):
+        self.database = database
+        self.collection_prefix = collection_prefix
+        self.max_handles = max_handles
+        self._handles = OrderedDict()
+
+    def _format(self, value, tenant):
+        if value is None:
+            return None
+
+        if callable(value):
+            return value(tenant)
+
+        return value.format(tenant=tenant)
+
+    def resolve(self, document_class, tenant):
+        '''
+        Returns a (database name, collection name) tuple for the tenant.
+
+        The database name is None when the connection database must be used.
+        '''
+        database_name = self._format(self.database, tenant)
+        collection_name = document_class.__collection__
+
+        prefix = self._format(self.collection_prefix, tenant)
+        if prefix:
+            collection_name = "%s%s" % (prefix, collection_name)
+
+        return database_name, collection_name
+
+    def get_collection(self, document_class, alias, tenant):
+        database_name, collection_name = self.resolve(document_class, tenant)
+        key = (alias, database_name, collection_name)
+
+        collection = self._handles.get(key)
+        if collection is not None:
+            self._handles.move_to_end(key)
+            return collection
+
+        collection = get_connection(alias=alias, db=database_name)[collection_name]
+
+        self._handles[key] = collection
+        while len(self._handles) > self.max_handles:
+            self._handles.popitem(last=False)
+
+        return collection
+
+    def clear(self):
+        self._handles.clear()
+
+    def __len__(self):
+        return len(self._handles)
@@ -0,0 +1,79 @@
+try:
+    from opentelemetry import trace
+except ImportError:
+    trace = None
+
+_tracer = None
+
+
+def enable_tracing(tracer=None):
+    '''
+    Creates an OpenTelemetry span for every database operation.
+
+    Spans are named after the operation and the document class (e.g.
+    ``find_all User``) and use the active context as parent, so they nest
+    under the spans of the application. Hydration and network round trips
+    are child spans of their operation, and the ``objects.get`` calls made
+    by ``load_references`` are children of its ``dereference`` span.
+
+    `tracer` defaults to the tracer of the global tracer provider; any
+    object with OpenTelemetry's `start_as_current_span` works, so
+    `opentelemetry-api` is only needed if no tracer is given.
+    '''
+    global _tracer
+
+    if tracer is None:
+        if trace is None:
+            raise RuntimeError(
+                "Tracing requires the 'opentelemetry-api' package (or an explicit tracer)."
+            )
+        tracer = trace.get_tracer('aiomotorengine')
+
+    _tracer = tracer
+
+
+def disable_tracing():
+    global _tracer
+    _tracer = None
+
+
+def get_tracer():
+    return _tracer
+
+
+def get_span_attributes(event):
+    attributes = {
+        'db.system': 'mongodb',
+        'db.operation': event.operation,
+        'db.mongodb.collection': event.document_class.__collection__,
+        'aiomotorengine.document': event.document_class.__name__,
+        'aiomotorengine.alias': event.alias,
+    }
+
+    if event.filter_shape is not None:
+        # the shape has no values, so it can't leak personal data
+        attributes['db.statement'] = event.filter_shape
+
+    return attributes
+
+
+class Span(object):
+    '''
+    Context manager starting a span as the current one and ending it,
+    recording the exception if its block raises.
+    '''
+
+    __slots__ = ('_manager', 'span')
+
+    def __init__(self, tracer, name, attributes=None):
+        self._manager = tracer.start_as_current_span(
+            name, attributes=attributes, record_exception=True, set_status_on_exception=True
+        )
+        self.span = None
+
+    def __enter__(self):
+        self.span = self._manager.__enter__()
+        return self.span
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return self._manager.__exit__(exc_type, exc_value, traceback)
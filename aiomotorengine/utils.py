@@ -1,5 +1,9 @@
+import asyncio
+import logging
 import sys
 
+logger = logging.getLogger(__name__)
+
 
 try:
     from ujson import loads, dumps
@@ -43,3 +47,23 @@ def get_class(module_name, klass=None):
     except AttributeError:
         err = sys.exc_info()
         raise ImportError("Can't find class %s (%s)." % (module_name, str(err)))
+
+
+def kill_cursor(cursor):
+    '''
+    Schedules a killCursors for `cursor` without waiting for the answer.
+
+    Used when the task awaiting a cursor is cancelled, so the server stops
+    working on a result nobody is going to read.
+    '''
+    try:
+        result = cursor.close()
+        if result is not None:
+            asyncio.ensure_future(result).add_done_callback(log_kill_cursor_error)
+    except Exception:
+        logger.debug("Failed to kill cursor %r.", cursor, exc_info=True)
+
+
+def log_kill_cursor_error(future):
+    if not future.cancelled() and future.exception() is not None:
+        logger.debug("Failed to kill cursor.", exc_info=future.exception())
@@ -0,0 +1,249 @@
+'''
+Benchmarks of the ORM overhead: hydration (`from_son`), serialization
+(`to_son`), validation, query compilation, `filter()` chaining and
+dereferencing, plus ORM against raw Motor for inserts and reads.
+
+Run against the in-memory backend (the default) or a local mongod::
+
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --backend mongod --host localhost --port 27017
+
+Results are written as JSON. Pass `--baseline` with the results of a
+previous release to fail when a benchmark got slower than `--tolerance`.
+'''
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+
+import aiomotorengine
+from aiomotorengine import Q, connect
+from aiomotorengine.connection import cleanup
+from aiomotorengine.query_builder.transform import transform_query
+
+from benchmarks.schemas import (
+    BenchCustomer, BenchOrder, make_customer, make_order, make_order_son
+)
+
+DATABASE_NAME = 'aiomotorengine_benchmarks'
+
+
+class Benchmark(object):
+    '''
+    A function run `number` times per sample, `repeat` samples. Coroutine
+    functions are awaited.
+    '''
+
+    def __init__(self, name, function, number):
+        self.name = name
+        self.function = function
+        self.number = number
+
+    async def sample(self):
+        function, number = self.function, self.number
+        is_coroutine = asyncio.iscoroutinefunction(function)
+
+        started = time.perf_counter()
+        if is_coroutine:
+            for _ in range(number):
+                await function()
+        else:
+            for _ in range(number):
+                function()
+        return (time.perf_counter() - started) / number
+
+    async def run(self, repeat):
+        samples = [await self.sample() for _ in range(repeat)]
+        return {
+            'number': self.number,
+            'repeat': repeat,
+            'min_us': min(samples) * 1e6,
+            'median_us': statistics.median(samples) * 1e6,
+            'max_us': max(samples) * 1e6,
+        }
+
+
+async def prepare_data(db, document_count):
+    await db[BenchCustomer.__collection__].drop()
+    await db[BenchOrder.__collection__].drop()
+
+    customers = [await make_customer(index).save() for index in range(document_count)]
+    for index, customer in enumerate(customers):
+        await make_order(index, customer=customer).save()
+
+    orders = await db[BenchOrder.__collection__].find({}, limit=document_count).to_list(length=document_count)
+    return customers, orders
+
+
+def get_benchmarks(db, customers, orders, number):
+    order = make_order(1, customer=customers[0])
+    order_son = make_order_son(1)
+    raw_orders = db[BenchOrder.__collection__]
+    # built once, so the raw baseline doesn't pay for building and serializing documents
+    raw_order = make_order(1).to_son()
+    raw_order.pop('_id', None)
+    batch = len(orders)
+
+    async def save_orm():
+        await make_order(1).save()
+
+    async def insert_raw():
+        await raw_orders.insert(dict(raw_order))
+
+    async def find_all_orm():
+        await BenchOrder.objects.filter(status='active').limit(batch).find_all(lazy=True)
+
+    async def find_all_raw():
+        await raw_orders.find({'status': 'active'}, limit=batch).to_list(length=batch)
+
+    async def load_references():
+        # hydrating fresh documents, as loaded references can't be loaded again
+        await BenchOrder.objects.hydrate(orders, lazy=False)
+
+    def q_to_query():
+        # built on each call, as compiling a Q tree rewrites it in place
+        query = Q(status='active') & (Q(total__gt=10) | Q(tags__in=['tag-1', 'tag-2']))
+        query.to_query(BenchOrder)
+
+    def filter_chain():
+        BenchOrder.objects.filter(status='active').filter(total__gt=10).order_by('number').skip(10).limit(20)
+
+    return [
+        Benchmark('document.from_son', lambda: BenchOrder.from_son(order_son), number),
+        Benchmark('document.to_son', order.to_son, number),
+        Benchmark('document.validate', order.validate, number),
+        Benchmark('query.q_to_query', q_to_query, number),
+        Benchmark(
+            'query.transform_query',
+            lambda: transform_query(BenchOrder, status='active', total__gt=10, shipping_address__city='Springfield'),
+            number
+        ),
+        Benchmark('queryset.filter_chain', filter_chain, number),
+        Benchmark('queryset.hydrate_with_references.%d' % batch, load_references, max(number // batch, 1)),
+        Benchmark('write.insert.orm', save_orm, max(number // 10, 1)),
+        Benchmark('write.insert.raw', insert_raw, max(number // 10, 1)),
+        Benchmark('read.find_all.%d.orm' % batch, find_all_orm, max(number // batch, 1)),
+        Benchmark('read.find_all.%d.raw' % batch, find_all_raw, max(number // batch, 1)),
+    ]
+
+
+def get_overheads(results):
+    '''
+    Returns, for each benchmark measured through the ORM and through raw
+    Motor, how many times slower the ORM is.
+    '''
+    overheads = {}
+
+    for name, result in results.items():
+        if not name.endswith('.orm'):
+            continue
+
+        base = name[:-len('.orm')]
+        if base + '.raw' in results:
+            overheads[base] = result['min_us'] / results[base + '.raw']['min_us']
+
+    return overheads
+
+
+def compare(results, baseline, tolerance):
+    ''' Returns the benchmarks slower than in `baseline` by more than `tolerance`. '''
+    regressions = {}
+
+    for name, result in results.items():
+        previous = baseline.get('results', {}).get(name)
+        if previous is None:
+            continue
+
+        ratio = result['min_us'] / previous['min_us']
+        if ratio > 1 + tolerance:
+            regressions[name] = ratio
+
+    return regressions
+
+
+async def run(options):
+    if options.backend == 'memory':
+        db = connect(DATABASE_NAME, backend='memory')
+    else:
+        db = connect(DATABASE_NAME, host=options.host, port=options.port)
+
+    try:
+        customers, orders = await prepare_data(db, options.documents)
+
+        results = {}
+        for benchmark in get_benchmarks(db, customers, orders, options.number):
+            if options.filter and options.filter not in benchmark.name:
+                continue
+
+            results[benchmark.name] = await benchmark.run(options.repeat)
+            print("%-40s %12.2f us" % (benchmark.name, results[benchmark.name]['min_us']))
+
+        await db[BenchCustomer.__collection__].drop()
+        await db[BenchOrder.__collection__].drop()
+    finally:
+        cleanup()
+
+    return {
+        'meta': {
+            'version': aiomotorengine.__version__,
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'backend': options.backend,
+            'date': datetime.utcnow().isoformat(),
+        },
+        'results': results,
+        'orm_overhead': get_overheads(results),
+    }
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n\n')[0])
+    parser.add_argument('--backend', choices=('memory', 'mongod'), default='memory')
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=27017)
+    parser.add_argument('--number', type=int, default=1000, help='calls per sample')
+    parser.add_argument('--repeat', type=int, default=5, help='samples per benchmark')
+    parser.add_argument('--documents', type=int, default=100, help='orders in the collection')
+    parser.add_argument('--filter', help='only run benchmarks whose name contains this')
+    parser.add_argument('--output', help='file to write the JSON results to')
+    parser.add_argument('--baseline', help='JSON results to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='allowed slowdown against the baseline')
+    return parser
+
+
+def main(argv=None):
+    options = get_parser().parse_args(argv)
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        report = loop.run_until_complete(run(options))
+    finally:
+        loop.close()
+
+    for name, overhead in sorted(report['orm_overhead'].items()):
+        print("%-40s %11.2fx raw Motor" % (name, overhead))
+
+    if options.output:
+        with open(options.output, 'w') as output:
+            json.dump(report, output, indent=2, sort_keys=True)
+
+    if options.baseline:
+        with open(options.baseline) as baseline:
+            regressions = compare(report['results'], json.load(baseline), options.tolerance)
+
+        for name, ratio in sorted(regressions.items()):
+            print("REGRESSION %-29s %11.2fx slower" % (name, ratio))
+
+        if regressions:
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
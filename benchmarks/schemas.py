@@ -0,0 +1,87 @@
+'''
+Representative documents for the benchmarks: an order with an embedded
+address, a list of embedded line items, a list of tags and a reference to
+its customer.
+'''
+from datetime import datetime
+
+from bson import ObjectId
+
+from aiomotorengine import (
+    Document, StringField, IntField, FloatField, BooleanField, DateTimeField,
+    ListField, EmbeddedDocumentField, ReferenceField
+)
+
+
+class BenchCustomer(Document):
+    __collection__ = 'bench_customers'
+
+    name = StringField(required=True)
+    email = StringField()
+    vip = BooleanField(default=False)
+
+
+class BenchAddress(Document):
+    street = StringField()
+    city = StringField()
+    zip_code = StringField()
+    country = StringField()
+
+
+class BenchLineItem(Document):
+    sku = StringField(required=True)
+    quantity = IntField(default=1)
+    price = FloatField()
+    discounts = ListField(FloatField())
+
+
+class BenchOrder(Document):
+    __collection__ = 'bench_orders'
+    __lazy__ = True
+
+    number = IntField(required=True)
+    status = StringField()
+    total = FloatField()
+    created_at = DateTimeField()
+    tags = ListField(StringField())
+    shipping_address = EmbeddedDocumentField(BenchAddress)
+    items = ListField(EmbeddedDocumentField(BenchLineItem))
+    customer = ReferenceField(BenchCustomer)
+
+
+def make_customer(index):
+    return BenchCustomer(
+        name='customer %d' % index, email='customer%d@example.com' % index,
+        vip=index % 10 == 0
+    )
+
+
+def make_order(index, customer=None, item_count=10):
+    items = [
+        BenchLineItem(
+            sku='sku-%d' % item, quantity=item % 3 + 1, price=9.99 + item,
+            discounts=[0.1, 0.05]
+        )
+        for item in range(item_count)
+    ]
+
+    return BenchOrder(
+        number=index,
+        status='active' if index % 2 else 'shipped',
+        total=sum(item.price * item.quantity for item in items),
+        created_at=datetime(2016, 1, 1),
+        tags=['tag-%d' % tag for tag in range(5)],
+        shipping_address=BenchAddress(
+            street='%d Main St' % index, city='Springfield', zip_code='12345', country='US'
+        ),
+        items=items,
+        customer=customer,
+    )
+
+
+def make_order_son(index, customer_id=None, item_count=10):
+    order = make_order(index, item_count=item_count)
+    son = order.to_son()
+    son['_id'] = ObjectId()
+    son['customer'] = customer_id or ObjectId()
+    return son
@@ -12,6 +12,8 @@ tests_require = [
     'ipdb',
     'coveralls',
     'mongoengine',
+    'numpy',
+    'pyarrow',
     'docutils',
     'jinja2',
     'sphinx',
@@ -54,6 +56,9 @@ AIOMotorEngine is an asynchronous MongoDB ORM. AIOMotorEngine uses Asyncio's eve
     use_2to3=True,
     extras_require={
         'tests': tests_require,
+        'tracing': ['opentelemetry-api'],
+        'columns': ['numpy'],
+        'arrow': ['numpy', 'pyarrow'],
     },
     entry_points={
         'console_scripts': [
@@ -1,4 +1,5 @@
 #!/usr/bin/env python
+import os
 import unittest
 import nose.tools
 import asyncio
@@ -7,6 +8,9 @@ from functools import wraps
 import aiomotorengine.connection
 from aiomotorengine import connect
 
+# 'memory' runs the tests without a mongod (see aiomotorengine.backends.memory)
+TEST_BACKEND = os.environ.get('AIOMOTORENGINE_TEST_BACKEND')
+
 
 class AsyncTestCase(unittest.TestCase):
     ''' Base class for all test cases with asyncio event loop and mongodb '''
@@ -15,7 +19,8 @@ class AsyncTestCase(unittest.TestCase):
         asyncio.set_event_loop(None)
         if auto_connect:
             self.db = connect(
-                "test", host="localhost", port=27017, io_loop=self.io_loop
+                "test", host="localhost", port=27017, io_loop=self.io_loop,
+                backend=TEST_BACKEND
             )
 
     def tearDown(self):
@@ -6,7 +6,7 @@ from preggy import expect
 
 from aiomotorengine import (
     Document, StringField, BooleanField, ListField,
-    DESCENDING, DateTimeField, IntField, Aggregation
+    DESCENDING, DateTimeField, IntField, Aggregation, Q
 )
 from tests import AsyncTestCase, async_test
 
@@ -175,3 +175,139 @@ class TestAggregation(AsyncTestCase):
 
         for state in results:
             expect(state.avgCityPop).to_be_greater_than(2000000)
+
+    def test_aggregation_uses_queryset_timeout(self):
+        aggregation = City.objects.timeout(2000).aggregate
+        expect(aggregation.get_aggregate_arguments()).to_be_like({'maxTimeMS': 2000})
+
+        aggregation = City.objects.aggregate
+        expect(aggregation.get_aggregate_arguments()).to_be_like({})
+
+    @async_test
+    async def test_can_stream_aggregation_results(self):
+        aggregation = City.objects.aggregate.group_by(
+            City.state,
+            Aggregation.avg(City.pop, alias="avg_pop")
+        )
+
+        rows = []
+        async for row in aggregation.stream(batch_size=2, allow_disk_use=True, as_dict=True):
+            rows.append(row)
+
+        expect(rows).to_length(4)
+        for row in rows:
+            expect(row).to_be_instance_of(dict)
+            expect(row).to_include('state')
+            expect(row['avg_pop']).to_be_greater_than(10000)
+
+    @async_test
+    async def test_can_stream_hydrated_documents(self):
+        aggregation = City.objects.aggregate.match(state='ny')
+
+        async for city in aggregation.stream(hydrate=True):
+            expect(city).to_be_instance_of(City)
+            expect(city.state).to_equal('ny')
+
+    @async_test
+    async def test_stream_failure_raises_aggregation_error(self):
+        from aiomotorengine.errors import AggregationError
+
+        aggregation = City.objects.aggregate.raw([{'$invalid': {}}])
+        try:
+            async for row in aggregation.stream():
+                pass
+        except AggregationError as e:
+            expect(e).to_be_instance_of(RuntimeError)
+        else:
+            assert False, "Should not have gotten this far"
+
+    def test_can_build_extended_pipeline(self):
+        query = User.objects.aggregate.match(
+            Q(number_of_documents__gt=100) | Q(is_admin=True)
+        ).project(
+            User.email, docs=User.number_of_documents
+        ).skip(10).limit(5).sample(3).count_documents('total').to_query()
+
+        expect(query).to_be_like([
+            {'$match': {'$or': [
+                {'number_of_documents': {'$gt': 100}}, {'is_admin': True}
+            ]}},
+            {'$project': {'email': 1, 'docs': '$number_of_documents'}},
+            {'$skip': 10},
+            {'$limit': 5},
+            {'$sample': {'size': 3}},
+            {'$count': 'total'},
+        ])
+
+    def test_can_build_lookup_facet_and_bucket(self):
+        query = City.objects.aggregate.lookup(
+            User, City.city, 'email', 'users'
+        ).facet(
+            total=City.objects.aggregate.count_documents('total'),
+            top=[{'$limit': 1}],
+        ).to_query()
+
+        expect(query).to_be_like([
+            {'$lookup': {
+                'from': 'AggregationUser', 'localField': 'city',
+                'foreignField': 'email', 'as': 'users'
+            }},
+            {'$facet': {'total': [{'$count': 'total'}], 'top': [{'$limit': 1}]}},
+        ])
+
+        query = City.objects.aggregate.bucket(
+            City.pop, [10000, 30000, 50001], default='other',
+            output=[Aggregation.count(), Aggregation.push(City.city, alias='cities')]
+        ).to_query()
+
+        expect(query).to_be_like([
+            {'$bucket': {
+                'groupBy': '$pop', 'boundaries': [10000, 30000, 50001],
+                'default': 'other',
+                'output': {'count': {'$sum': 1}, 'cities': {'$push': '$city'}}
+            }},
+        ])
+
+    @async_test
+    async def test_can_use_extra_accumulators(self):
+        result = await City.objects.aggregate.group_by(
+            City.state,
+            Aggregation.min(City.pop, alias='min_pop'),
+            Aggregation.max(City.pop, alias='max_pop'),
+            Aggregation.first(City.city, alias='first_city'),
+            Aggregation.last(City.city, alias='last_city'),
+            Aggregation.add_to_set(City.city, alias='cities'),
+            Aggregation.count(alias='number_of_cities'),
+        ).order_by(City.state).fetch()
+
+        expect(result).to_length(4)
+        for state in result:
+            expect(state.min_pop).to_be_lesser_or_equal_to(state.max_pop)
+            expect(state.first_city).to_equal(state.last_city)
+            expect(state.cities).to_length(1)
+
+        total = sum([state.number_of_cities for state in result])
+        expect(total).to_equal(500)
+
+    def test_can_optimize_pipeline(self):
+        aggregation = User.objects.aggregate.unwind(User.list_items).match(
+            email="heynemann@gmail.com"
+        ).match(is_admin=True)
+
+        expect(aggregation.to_query()[0]).to_include('$unwind')
+
+        expect(aggregation.optimize().to_query()).to_be_like([
+            {'$match': {'email': 'heynemann@gmail.com', 'is_admin': True}},
+            {'$unwind': '$list_items'},
+        ])
+
+        expect(aggregation.index_usage()).to_be_like([
+            {'stage': 0, 'operator': '$match', 'can_use_index': True},
+            {'stage': 1, 'operator': '$unwind', 'can_use_index': False},
+        ])
+
+    @async_test
+    async def test_can_explain_aggregation(self):
+        result = await City.objects.aggregate.match(state='ny').explain()
+        expect(result.raw['ok']).to_equal(1.0)
+        expect(result).to_include('collection_scan')
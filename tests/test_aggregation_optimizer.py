@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+
+from preggy import expect
+
+from aiomotorengine.aggregation.optimizer import get_index_usage, optimize_pipeline
+from tests import AsyncTestCase
+
+
+class TestAggregationOptimizer(AsyncTestCase):
+    def setUp(self):
+        super(TestAggregationOptimizer, self).setUp(auto_connect=False)
+
+    def test_moves_match_before_unwind_of_other_field(self):
+        pipeline = optimize_pipeline([
+            {'$unwind': '$tags'},
+            {'$match': {'state': 'ny'}},
+        ])
+
+        expect(pipeline).to_be_like([
+            {'$match': {'state': 'ny'}},
+            {'$unwind': '$tags'},
+        ])
+
+    def test_keeps_match_on_unwound_field(self):
+        pipeline = [
+            {'$unwind': '$tags'},
+            {'$match': {'tags.name': 'python'}},
+        ]
+
+        expect(optimize_pipeline(pipeline)).to_be_like(pipeline)
+
+    def test_moves_match_before_projection_of_same_field(self):
+        expect(optimize_pipeline([
+            {'$project': {'state': 1, 'pop': 1}},
+            {'$match': {'state': 'ny'}},
+        ])).to_be_like([
+            {'$match': {'state': 'ny'}},
+            {'$project': {'state': 1, 'pop': 1}},
+        ])
+
+        pipeline = [
+            {'$project': {'state': '$city'}},
+            {'$match': {'state': 'ny'}},
+        ]
+        expect(optimize_pipeline(pipeline)).to_be_like(pipeline)
+
+    def test_keeps_match_after_projection_of_sub_fields(self):
+        for projection, match in [
+            ({'b.c': 0}, {'b.c': {'$exists': False}}),
+            ({'b.c': 0}, {'b': {'c': 1}}),
+            ({'b.c': 0}, {'b.c.d': 1}),
+            ({'b.c': 1}, {'b': {'c': 1}}),
+            ({'b': 1, '_id': 0}, {'_id': 1}),
+            ({'b': 1}, {'a': 1}),
+        ]:
+            pipeline = [{'$project': projection}, {'$match': match}]
+            expect(optimize_pipeline(pipeline)).to_be_like(pipeline)
+
+        for projection, match in [
+            ({'b.c': 0}, {'b.d': 1}),
+            ({'b': 1}, {'b.c': 1}),
+            ({'b': 1}, {'_id': 1}),
+        ]:
+            expect(optimize_pipeline([{'$project': projection}, {'$match': match}])).to_be_like(
+                [{'$match': match}, {'$project': projection}]
+            )
+
+    def test_merges_adjacent_matches(self):
+        expect(optimize_pipeline([
+            {'$match': {'state': 'ny'}},
+            {'$sort': {'pop': -1}},
+            {'$match': {'pop': {'$gt': 10}}},
+            {'$match': {'state': 'ca'}},
+        ])).to_be_like([
+            {'$match': {'$and': [{'state': 'ny', 'pop': {'$gt': 10}}, {'state': 'ca'}]}},
+            {'$sort': {'pop': -1}},
+        ])
+
+    def test_keeps_match_with_expression(self):
+        pipeline = [
+            {'$unwind': '$tags'},
+            {'$match': {'$expr': {'$gt': ['$a', '$b']}}},
+        ]
+
+        expect(optimize_pipeline(pipeline)).to_be_like(pipeline)
+
+    def test_moves_limit_next_to_sort(self):
+        expect(optimize_pipeline([
+            {'$sort': {'pop': -1}},
+            {'$project': {'city': 1}},
+            {'$limit': 10},
+        ])).to_be_like([
+            {'$sort': {'pop': -1}},
+            {'$limit': 10},
+            {'$project': {'city': 1}},
+        ])
+
+    def test_index_usage(self):
+        usage = get_index_usage([
+            {'$match': {'state': 'ny'}},
+            {'$sort': {'pop': -1}},
+            {'$unwind': '$tags'},
+            {'$match': {'tags': 'python'}},
+        ])
+
+        expect([stage['can_use_index'] for stage in usage]).to_be_like(
+            [True, True, False, False]
+        )
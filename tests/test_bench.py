@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+
+from preggy import expect
+
+from aiomotorengine.bench.runner import LoadRunner, get_percentile
+from aiomotorengine.bench.workloads import make_user, make_user_son
+from tests import AsyncTestCase, async_test
+
+
+class FakeOperations(object):
+    def __init__(self):
+        self.calls = 0
+
+    async def get(self):
+        self.calls += 1
+
+    async def save(self):
+        raise ValueError("failed")
+
+
+class TestLoadRunner(AsyncTestCase):
+    def setUp(self):
+        super(TestLoadRunner, self).setUp(auto_connect=False)
+
+    def test_percentile(self):
+        samples = list(range(1, 101))
+
+        expect(get_percentile(samples, 50)).to_equal(50)
+        expect(get_percentile(samples, 99)).to_equal(99)
+        expect(get_percentile(samples, 100)).to_equal(100)
+        expect(get_percentile([], 50)).to_be_null()
+
+    def test_raw_user_matches_document(self):
+        son = make_user_son(5)
+        expected = make_user(5).to_son()
+
+        expect(son.pop('_id')).not_to_be_null()
+        expect(son.pop('created_at')).not_to_be_null()
+        del expected['created_at']
+        expect(son).to_equal(expected)
+
+    @async_test
+    async def test_run(self):
+        operations = FakeOperations()
+        runner = LoadRunner(operations, {'get': 3, 'save': 1}, concurrency=2, duration=0.05)
+
+        report = await runner.run()
+
+        expect(report['get']['operations']).to_equal(operations.calls)
+        expect(report['get']['p50_ms']).not_to_be_null()
+        expect(report['save']['operations']).to_equal(0)
+        expect(report['save']['errors']).to_be_greater_than(0)
+        expect(report['total']['errors']).to_equal(report['save']['errors'])
+        expect(report['total']['ops_per_second']).to_be_greater_than(0)
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+
+import asyncio
+from unittest import mock
+
+from preggy import expect
+
+from aiomotorengine import Document, StringField
+from aiomotorengine.queryset import QuerySet
+from aiomotorengine.utils import kill_cursor
+from tests import AsyncTestCase, async_test
+
+
+class CancelledUser(Document):
+    __collection__ = "CancelledUser"
+    name = StringField()
+
+
+class HangingCursor(object):
+    ''' Cursor whose reads never answer, recording whether it was closed. '''
+
+    def __init__(self):
+        self.closed = False
+        self.reading = asyncio.Event()
+
+    def max_time_ms(self, max_time_ms):
+        return self
+
+    async def hang(self):
+        self.reading.set()
+        await asyncio.Event().wait()
+
+    async def to_list(self, length=None):
+        await self.hang()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        await self.hang()
+
+    def close(self):
+        self.closed = True
+
+
+class HangingCollection(object):
+    def __init__(self):
+        self.cursors = []
+
+    def get_cursor(self):
+        cursor = HangingCursor()
+        self.cursors.append(cursor)
+        return cursor
+
+    def find(self, *args, **kwargs):
+        return self.get_cursor()
+
+    def aggregate(self, *args, **kwargs):
+        return self.get_cursor()
+
+
+class TestCancellation(AsyncTestCase):
+    def setUp(self):
+        super(TestCancellation, self).setUp(auto_connect=False)
+        self.collection = HangingCollection()
+        self.patch = mock.patch.object(QuerySet, 'coll', lambda queryset, alias=None: self.collection)
+        self.patch.start()
+
+    def tearDown(self):
+        self.patch.stop()
+        super(TestCancellation, self).tearDown()
+
+    async def cancel(self, coroutine):
+        task = asyncio.ensure_future(coroutine)
+        while not self.collection.cursors or not self.collection.cursors[0].reading.is_set():
+            await asyncio.sleep(0)
+
+        expect(self.collection.cursors[0].closed).to_be_false()
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        else:
+            assert False, "Should not have gotten this far"
+
+    @async_test
+    async def test_cancelled_find_all_kills_the_cursor(self):
+        await self.cancel(CancelledUser.objects.filter(name="Bernardo").find_all())
+
+        expect(self.collection.cursors[0].closed).to_be_true()
+
+    @async_test
+    async def test_cancelled_stream_kills_the_cursor(self):
+        async def consume():
+            async for row in CancelledUser.objects.aggregate.raw([{'$match': {}}]).stream():
+                pass
+
+        await self.cancel(consume())
+
+        expect(self.collection.cursors[0].closed).to_be_true()
+
+    def test_kill_cursor_logs_errors(self):
+        class BrokenCursor(object):
+            def close(self):
+                raise RuntimeError('connection lost')
+
+        with self.assertLogs('aiomotorengine.utils', level='DEBUG') as logs:
+            kill_cursor(BrokenCursor())
+
+        expect(logs.output[0]).to_include('connection lost')
@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+
+import inspect
+import unittest
+from unittest import mock
+
+from preggy import expect
+
+try:
+    from pymongo.change_stream import ChangeStream as DriverChangeStream
+    from pymongo.collection import Collection as DriverCollection
+except ImportError:
+    DriverChangeStream = DriverCollection = None
+
+try:
+    from motor.motor_asyncio import AsyncIOMotorChangeStream
+except ImportError:
+    AsyncIOMotorChangeStream = None
+
+from aiomotorengine import connect, Document, StringField, IntField
+from aiomotorengine.change_stream import CHANGE_STREAM_METHODS, ResumeTokenStore, get_change_filter
+from aiomotorengine.queryset import QuerySet
+from tests import AsyncTestCase, async_test
+
+
+class Account(Document):
+    __collection__ = "ChangeStreamAccount"
+
+    name = StringField()
+    balance = IntField(db_field='b')
+
+
+class TestChangeStream(AsyncTestCase):
+    # change streams need a replica set, so these tests use the memory backend
+    def setUp(self):
+        super(TestChangeStream, self).setUp(auto_connect=False)
+        self.db = connect("test", backend="memory")
+
+    def test_change_filter(self):
+        expect(get_change_filter({'b': {'$gt': 1}, '$or': [{'name': 'a'}, {'name': 'b'}]})).to_equal({
+            'fullDocument.b': {'$gt': 1},
+            '$or': [{'fullDocument.name': 'a'}, {'fullDocument.name': 'b'}],
+        })
+
+    @async_test
+    async def test_typed_events(self):
+        stream = Account.objects.watch(full_document='updateLookup', max_await_time_ms=10)
+        expect(await stream.try_next()).to_be_null()
+
+        account = await Account.objects.create(name="a", balance=10)
+        await Account.objects.filter(name="a").update({Account.balance: 20})
+        await account.delete()
+
+        event = await stream.next()
+        expect(event.operation_type).to_equal('insert')
+        expect(event.document).to_be_instance_of(Account)
+        expect(event.document.balance).to_equal(10)
+        expect(event.document_id).to_equal(account._id)
+
+        event = await stream.next()
+        expect(event.operation_type).to_equal('update')
+        expect(event.update_description.updated_fields).to_equal({'b': 20})
+        expect(event.document).to_be_null()  # deleted before the lookup
+
+        event = await stream.next()
+        expect(event.operation_type).to_equal('delete')
+        expect(stream.resume_token).to_equal(event.resume_token)
+
+        await stream.close()
+
+    @async_test
+    async def test_filters_apply_to_the_documents(self):
+        async with Account.objects.filter(balance__gte=100).watch() as stream:
+            await Account.objects.create(name="a", balance=10)
+            await Account.objects.create(name="b", balance=100)
+
+            async for event in stream:
+                expect(event.document.name).to_equal("b")
+                break
+
+    @async_test
+    async def test_resume_after(self):
+        async with Account.objects.watch() as stream:
+            await Account.objects.create(name="a")
+            await Account.objects.create(name="b")
+
+            event = await stream.next()
+            expect(event.document.name).to_equal("a")
+
+        stream = Account.objects.watch(resume_after=event.resume_token)
+        expect((await stream.next()).document.name).to_equal("b")
+
+    @async_test
+    async def test_token_store(self):
+        store = ResumeTokenStore('test-consumer')
+        await self.drop_coll_async(store.collection)
+
+        async with Account.objects.watch(token_store=store, max_await_time_ms=10) as stream:
+            await Account.objects.create(name="a")
+            await Account.objects.create(name="b")
+            expect((await stream.next()).document.name).to_equal("a")
+
+        # a crash while handling an event doesn't save its token
+        try:
+            async with Account.objects.watch(token_store=store) as stream:
+                expect((await stream.next()).document.name).to_equal("b")
+                raise ValueError()
+        except ValueError:
+            pass
+
+        async with Account.objects.watch(token_store=store) as stream:
+            expect((await stream.next()).document.name).to_equal("b")
+
+        async with Account.objects.watch(token_store=store, max_await_time_ms=10) as stream:
+            expect(await stream.try_next()).to_be_null()
+
+
+class PinnedDriverCollection(object):
+    ''' A collection of Motor 0.5, which has no change streams. '''
+
+    database = None
+
+    def find(self, *args, **kwargs):
+        pass
+
+
+class TestDriverChangeStreamApi(AsyncTestCase):
+    def setUp(self):
+        super(TestDriverChangeStreamApi, self).setUp(auto_connect=False)
+
+    @unittest.skipIf(getattr(DriverCollection, 'watch', None) is None, "the installed pymongo has no change streams")
+    def test_watch_arguments_are_accepted_by_the_driver(self):
+        stream = Account.objects.watch(
+            full_document='updateLookup', resume_after={'_data': '1'}, start_after={'_data': '1'},
+            batch_size=10, max_await_time_ms=10
+        )
+        signature = inspect.signature(DriverCollection.watch)
+
+        signature.bind(None, stream.pipeline, **stream.get_watch_arguments())
+
+    @unittest.skipIf(DriverChangeStream is None, "the installed pymongo has no change streams")
+    def test_driver_change_streams_have_the_methods_used(self):
+        for name in CHANGE_STREAM_METHODS:
+            expect(hasattr(DriverChangeStream, name)).to_be_true()
+
+    @unittest.skipIf(AsyncIOMotorChangeStream is None, "the installed Motor has no change streams")
+    def test_motor_change_streams_have_the_methods_used(self):
+        for name in CHANGE_STREAM_METHODS:
+            expect(hasattr(AsyncIOMotorChangeStream, name)).to_be_true()
+
+    @async_test
+    async def test_pinned_driver_is_rejected(self):
+        with mock.patch.object(QuerySet, 'coll', lambda queryset, alias=None: PinnedDriverCollection()):
+            try:
+                await Account.objects.watch().open()
+            except RuntimeError as e:
+                expect(str(e)).to_include("Motor 2.1+")
+            else:
+                assert False, "Should not have gotten this far"
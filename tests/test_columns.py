@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+
+import unittest
+from datetime import datetime
+
+from preggy import expect
+
+from aiomotorengine import Document, StringField, IntField, FloatField, BooleanField, DateTimeField
+from aiomotorengine.columns import ColumnBuilder, numpy, pyarrow
+from tests import AsyncTestCase, async_test
+
+
+class Measure(Document):
+    __collection__ = "ColumnsMeasure"
+
+    name = StringField()
+    count = IntField(db_field='c')
+    value = FloatField()
+    valid = BooleanField()
+    measured_at = DateTimeField()
+
+
+@unittest.skipIf(numpy is None, "numpy is not installed")
+class TestColumns(AsyncTestCase):
+    def setUp(self):
+        super(TestColumns, self).setUp()
+        self.drop_coll("ColumnsMeasure")
+
+    async def create_measures(self, count):
+        await Measure.objects.bulk_insert([
+            Measure(
+                name="measure-%d" % index, count=index, value=index / 2.0,
+                valid=index % 2 == 0, measured_at=datetime(2016, 1, index + 1)
+            )
+            for index in range(count)
+        ])
+
+    def test_dtypes(self):
+        builder = ColumnBuilder(
+            Measure, ['name', 'count', 'value', 'valid', 'measured_at'], dtype_map={'value': 'float32'}
+        )
+
+        expect([str(column[2]) for column in builder.columns]).to_equal(
+            ['object', 'int64', 'float32', 'bool', 'datetime64[ms]']
+        )
+        expect(builder.projection).to_equal({
+            'name': True, 'c': True, 'value': True, 'valid': True, 'measured_at': True
+        })
+
+        try:
+            ColumnBuilder(Measure, ['missing'])
+        except ValueError as e:
+            expect(str(e)).to_include("missing")
+        else:
+            assert False, "Should not have gotten this far"
+
+    def test_arrays_grow(self):
+        builder = ColumnBuilder(Measure, ['count', 'value'], capacity=2)
+        for index in range(5):
+            builder.append({'c': index, 'value': None if index == 1 else 1.5})
+
+        columns = builder.get_columns()
+        expect(builder.capacity).to_equal(8)
+        expect(columns['count'].tolist()).to_equal([0, 1, 2, 3, 4])
+        expect(columns['value'].mask.tolist()).to_equal([False, True, False, False, False])
+        expect(columns['value'].sum()).to_equal(6.0)
+
+    @async_test
+    async def test_to_columns(self):
+        await self.create_measures(5)
+
+        columns = await Measure.objects.filter(count__gte=1).order_by('count').limit(3).to_columns(
+            ['name', 'count', 'valid', 'measured_at']
+        )
+
+        expect(columns['count'].dtype).to_equal(numpy.dtype('int64'))
+        expect(columns['count'].tolist()).to_equal([1, 2, 3])
+        expect(columns['valid'].tolist()).to_equal([False, True, False])
+        expect(columns['name'].tolist()).to_equal(["measure-1", "measure-2", "measure-3"])
+        expect(columns['measured_at'][0]).to_equal(numpy.datetime64('2016-01-02T00:00:00.000'))
+
+    @unittest.skipIf(pyarrow is None, "pyarrow is not installed")
+    @async_test
+    async def test_to_record_batches(self):
+        await self.create_measures(5)
+        await Measure.objects.create(name="empty")
+
+        batches = []
+        async for batch in Measure.objects.order_by('name').to_record_batches(['_id', 'name', 'count'], batch_size=4):
+            batches.append(batch)
+
+        expect([batch.num_rows for batch in batches]).to_equal([4, 2])
+        expect(str(batches[0].schema.field('count').type)).to_equal('int64')
+        expect(batches[0].column(1).to_pylist()[0]).to_equal("empty")
+        expect(batches[0].column(2).to_pylist()[0]).to_be_null()
+        expect(batches[0].column(0).to_pylist()[0]).to_be_instance_of(str)
@@ -1205,3 +1205,208 @@ class TestDocument(AsyncTestCase):
 
         expect(base.list_val).to_length(3)
         expect(base.list_val[0]).to_be_instance_of(Ref)
+
+    @async_test
+    async def test_update_with_unacknowledged_write_concern(self):
+        await User.objects.create(email="email@gmail.com", first_name="First")
+
+        result = await User.objects.filter(first_name="First").update({
+            User.first_name: "Second"
+        }, write_concern={'w': 0})
+
+        expect(result.acknowledged).to_be_false()
+        expect(result.count).to_be_null()
+        expect(result.updated_existing).to_be_null()
+
+        result = await User.objects.filter(first_name="Second").update({
+            User.first_name: "Third"
+        }, write_concern={'w': 1, 'j': True})
+
+        expect(result.acknowledged).to_be_true()
+        expect(result.count).to_equal(1)
+
+    @async_test
+    async def test_writes_report_unacknowledged_write_concern(self):
+        user = User(email="email@gmail.com", first_name="First")
+        expect(user.acknowledged).to_be_null()
+
+        await user.save(write_concern={'w': 0})
+        expect(user.acknowledged).to_be_false()
+        expect(user._id).not_to_be_null()
+
+        await user.save()
+        expect(user.acknowledged).to_be_true()
+
+        users = await User.objects.bulk_insert([
+            User(email="other@gmail.com"), User(email="another@gmail.com"),
+        ], write_concern={'w': 0})
+        expect([item.acknowledged for item in users]).to_equal([False, False])
+
+        users = await User.objects.bulk_insert([User(email="last@gmail.com")])
+        expect(users[0].acknowledged).to_be_true()
+
+        expect(await User.objects.filter(email="other@gmail.com").remove(write_concern={'w': 0})).to_be_null()
+        expect(await user.delete(write_concern={'w': 0})).to_be_null()
+        expect(user.acknowledged).to_be_false()
+
+        expect(await users[0].delete()).to_equal(1)
+        expect(users[0].acknowledged).to_be_true()
+
+    @async_test
+    async def test_class_level_write_concern(self):
+        class Telemetry(Document):
+            __collection__ = 'TelemetryWriteConcern'
+            __write_concern__ = {'w': 0}
+            name = StringField()
+
+        expect(Telemetry.objects.get_write_concern()).to_be_like({'w': 0})
+        expect(
+            Telemetry.objects.get_write_concern({'w': 'majority'})
+        ).to_be_like({'w': 'majority'})
+        expect(User.objects.get_write_concern()).to_be_like({})
+
+        await Telemetry.objects.delete(write_concern={'w': 1})
+        events = await Telemetry.objects.bulk_insert(
+            [Telemetry(name=str(i)) for i in range(10)]
+        )
+        for event in events:
+            expect(event._id).not_to_be_null()
+
+        removed = await events[0].delete()
+        expect(removed).to_be_null()
+
+    @async_test
+    async def test_can_query_with_timeout(self):
+        from aiomotorengine import queryset
+
+        await User.objects.create(email="email@gmail.com", first_name="First")
+
+        expect(User.objects.get_max_time_ms()).to_be_null()
+        expect(User.objects.timeout(500).get_max_time_ms()).to_equal(500)
+
+        users = await User.objects.filter(first_name="First").timeout(500).find_all()
+        expect(users).to_length(1)
+
+        count = await User.objects.timeout(500).count()
+        expect(count).to_equal(1)
+
+        user = await User.objects.timeout(500).get(first_name="First")
+        expect(user.email).to_equal("email@gmail.com")
+
+        queryset.set_default_timeout(1000)
+        try:
+            expect(User.objects.get_max_time_ms()).to_equal(1000)
+            expect(User.objects.timeout(10).get_max_time_ms()).to_equal(10)
+        finally:
+            queryset.set_default_timeout(None)
+
+    @async_test
+    async def test_sharded_document_uses_shard_key_in_filters(self):
+        class ShardedEvent(Document):
+            __collection__ = 'ShardedEvent'
+            __shard_key__ = ('tenant', )
+            tenant = StringField(db_field='t')
+            name = StringField()
+
+        await ShardedEvent.objects.delete()
+
+        event = await ShardedEvent.objects.create(tenant='acme', name='login')
+        expect(ShardedEvent.objects.get_identity_filter(event)).to_be_like({
+            '_id': event._id, 't': 'acme'
+        })
+
+        event.name = 'logout'
+        await event.save()
+
+        retrieved = await ShardedEvent.objects.get(event._id, tenant='acme')
+        expect(retrieved.name).to_equal('logout')
+
+        retrieved = await ShardedEvent.objects.get(event._id, tenant='other')
+        expect(retrieved).to_be_null()
+
+        await ShardedEvent.objects.filter(tenant='acme').update({'name': 'reloaded'})
+        await event.reload()
+        expect(event.name).to_equal('reloaded')
+
+        removed = await event.delete()
+        expect(removed).to_equal(1)
+
+    @async_test
+    async def test_sharded_document_saves_a_changed_shard_key(self):
+        class MovedShardedEvent(Document):
+            __collection__ = 'MovedShardedEvent'
+            __shard_key__ = ('tenant', )
+            tenant = StringField(db_field='t')
+            name = StringField()
+
+        await MovedShardedEvent.objects.delete()
+        await MovedShardedEvent.objects.create(tenant='acme', name='login')
+
+        event = (await MovedShardedEvent.objects.find_all())[0]
+        event.tenant = 'other'
+        expect(MovedShardedEvent.objects.get_identity_filter(event)).to_be_like({
+            '_id': event._id, 't': 'acme'
+        })
+
+        await event.save()
+        expect(MovedShardedEvent.objects.get_identity_filter(event)).to_be_like({
+            '_id': event._id, 't': 'other'
+        })
+
+        retrieved = await MovedShardedEvent.objects.get(event._id, tenant='other')
+        expect(retrieved.name).to_equal('login')
+        expect(await MovedShardedEvent.objects.get(event._id, tenant='acme')).to_be_null()
+
+        event.name = 'logout'
+        await event.save()
+        expect(await event.reload()).not_to_be_null()
+        expect(event.name).to_equal('logout')
+        expect(await event.delete()).to_equal(1)
+
+    def test_shard_key_must_use_document_fields(self):
+        try:
+            class InvalidShardedEvent(Document):
+                __shard_key__ = ('tenant', )
+                name = StringField()
+        except InvalidDocumentError:
+            e = sys.exc_info()[1]
+            expect(e).to_have_an_error_message_of(
+                "Shard key fields not found in InvalidShardedEvent: tenant"
+            )
+        else:
+            assert False, "Should not have gotten this far."
+
+    @async_test
+    async def test_can_get_page_with_total(self):
+        for index in range(5):
+            await User.objects.create(
+                email="email%d@gmail.com" % index, first_name="First%d" % index,
+                is_admin=index % 2 == 0
+            )
+
+        users, total = await User.objects.filter(is_admin=True).order_by(
+            'first_name', direction=DESCENDING
+        ).skip(1).limit(1).page_with_total()
+
+        expect(total).to_equal(3)
+        expect(users).to_length(1)
+        expect(users[0]).to_be_instance_of(User)
+        expect(users[0].first_name).to_equal("First2")
+
+    @async_test
+    async def test_can_count_by_named_filters(self):
+        from aiomotorengine import Q
+
+        for index in range(5):
+            await User.objects.create(
+                email="email%d@gmail.com" % index, first_name="First%d" % index,
+                is_admin=index % 2 == 0
+            )
+
+        counts = await User.objects.filter(first_name__ne="First0").count_by({
+            'admins': Q(is_admin=True),
+            'first_one': {'first_name': "First1"},
+            'nobody': {'first_name': "Nobody"},
+        })
+
+        expect(counts).to_be_like({'admins': 2, 'first_one': 1, 'nobody': 0})
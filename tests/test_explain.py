@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+
+import sys
+
+from preggy import expect
+
+from aiomotorengine import Document, StringField
+from aiomotorengine.errors import CollectionScanError
+from aiomotorengine.explain import (
+    ExplainGuard, set_explain_guard, summarize
+)
+from tests import AsyncTestCase, async_test
+
+COLLSCAN_EXPLAIN = {
+    'queryPlanner': {
+        'winningPlan': {'stage': 'COLLSCAN', 'filter': {'name': {'$eq': 'a'}}}
+    },
+    'executionStats': {
+        'nReturned': 1, 'totalDocsExamined': 100,
+        'totalKeysExamined': 0, 'executionTimeMillis': 3
+    },
+}
+
+IXSCAN_EXPLAIN = {
+    'queryPlanner': {
+        'winningPlan': {
+            'stage': 'FETCH',
+            'inputStage': {'stage': 'IXSCAN', 'indexName': 'name_1'}
+        }
+    },
+    'executionStats': {
+        'nReturned': 2, 'totalDocsExamined': 40,
+        'totalKeysExamined': 40, 'executionTimeMillis': 1
+    },
+}
+
+
+class ExplainedUser(Document):
+    __collection__ = "ExplainedUser"
+    name = StringField()
+
+
+class TestExplain(AsyncTestCase):
+    def setUp(self):
+        super(TestExplain, self).setUp()
+        self.drop_coll("ExplainedUser")
+
+    def tearDown(self):
+        set_explain_guard(None)
+        super(TestExplain, self).tearDown()
+
+    def test_summarize_find_explain(self):
+        summary = summarize(IXSCAN_EXPLAIN)
+
+        expect(summary.stages).to_be_like(['FETCH', 'IXSCAN'])
+        expect(summary.collection_scan).to_be_false()
+        expect(summary.execution_stats).to_be_like({
+            'returned': 2, 'docs_examined': 40, 'keys_examined': 40, 'time_ms': 1
+        })
+
+    def test_summarize_aggregate_explain(self):
+        summary = summarize({'stages': [
+            {'$cursor': COLLSCAN_EXPLAIN}, {'$group': {'_id': '$name'}}
+        ]})
+
+        expect(summary.collection_scan).to_be_true()
+        expect(summary.execution_stats['docs_examined']).to_equal(100)
+
+    def test_guard_rejects_collection_scan(self):
+        guard = ExplainGuard()
+
+        try:
+            guard.check(summarize(COLLSCAN_EXPLAIN), ExplainedUser, 'find_all', {'name': 'a'})
+        except CollectionScanError:
+            err = sys.exc_info()[1]
+            expect(err).to_have_an_error_message_of(
+                "ExplainedUser.find_all with filter {'name': 'a'} runs as a collection scan."
+            )
+        else:
+            assert False, "Should not have gotten this far"
+
+    def test_guard_checks_examined_ratio(self):
+        guard = ExplainGuard(max_examined_ratio=10)
+        expect(guard.get_violation(summarize(IXSCAN_EXPLAIN))).to_equal(
+            "examines 20.0 documents per returned document (max 10)"
+        )
+
+        guard = ExplainGuard(mode='log', max_examined_ratio=50)
+        expect(guard.get_violation(summarize(IXSCAN_EXPLAIN))).to_be_null()
+
+    @async_test
+    async def test_can_explain_queryset(self):
+        await ExplainedUser.objects.create(name="Bernardo")
+
+        summary = await ExplainedUser.objects.filter(name="Bernardo").explain()
+        expect(summary.collection_scan).to_be_true()
+
+    @async_test
+    async def test_guard_raises_on_unindexed_query(self):
+        await ExplainedUser.objects.create(name="Bernardo")
+        set_explain_guard(ExplainGuard())
+
+        users = await ExplainedUser.objects.find_all()
+        expect(users).to_length(1)
+
+        try:
+            await ExplainedUser.objects.filter(name="Bernardo").find_all()
+        except CollectionScanError:
+            pass
+        else:
+            assert False, "Should not have gotten this far"
@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+
+import asyncio
+from unittest import mock
+
+from preggy import expect
+from pymongo import ReadPreference
+
+from aiomotorengine import Document, StringField
+from aiomotorengine.hedging import HedgePolicy
+from aiomotorengine.queryset import QuerySet
+from tests import AsyncTestCase, async_test
+
+
+class HedgedUser(Document):
+    __collection__ = "HedgedUser"
+    name = StringField()
+
+
+class TestHedgePolicy(AsyncTestCase):
+    def setUp(self):
+        super(TestHedgePolicy, self).setUp(auto_connect=False)
+
+    @async_test
+    async def test_fast_read_is_not_hedged(self):
+        policy = HedgePolicy(initial_delay_ms=100)
+
+        async def read(read_preference):
+            return read_preference
+
+        result = await policy.run(read)
+
+        expect(result).to_be_null()
+        expect(policy.stats.reads).to_equal(1)
+        expect(policy.stats.hedges).to_equal(0)
+
+    @async_test
+    async def test_slow_read_is_hedged_and_counted_once(self):
+        policy = HedgePolicy(initial_delay_ms=5)
+
+        async def read(read_preference):
+            if read_preference is None:
+                await asyncio.sleep(1)
+                return 'first'
+            return 'hedge'
+
+        result = await policy.run(read)
+
+        expect(result).to_equal('hedge')
+        expect(policy.stats.reads).to_equal(1)
+        expect(policy.stats.hedges).to_equal(1)
+        expect(policy.stats.hedge_wins).to_equal(1)
+
+    @async_test
+    async def test_failed_hedge_falls_back_to_first_read(self):
+        policy = HedgePolicy(initial_delay_ms=5)
+
+        async def read(read_preference):
+            if read_preference is None:
+                await asyncio.sleep(0.05)
+                return 'first'
+            raise RuntimeError('member down')
+
+        result = await policy.run(read)
+
+        expect(result).to_equal('first')
+        expect(policy.stats.hedges).to_equal(1)
+        expect(policy.stats.hedge_wins).to_equal(0)
+        expect(policy.stats.errors).to_equal(0)
+
+    def test_delay_follows_percentile(self):
+        policy = HedgePolicy(
+            percentile=90, min_samples=10, min_delay_ms=0, max_delay_ms=1000
+        )
+        for latency in range(1, 101):
+            policy.observe(latency)
+
+        expect(policy.get_delay_ms()).to_equal(90)
+
+    def test_delay_is_recomputed_once_in_a_while(self):
+        policy = HedgePolicy(window=100, min_samples=10)
+        computed = []
+        compute_delay_ms = policy.compute_delay_ms
+
+        def count_computations():
+            computed.append(1)
+            return compute_delay_ms()
+
+        policy.compute_delay_ms = count_computations
+        for latency in range(1000):
+            policy.observe(latency)
+
+        expect(computed).to_length(21)
+
+
+class SlowPrimaryCollection(object):
+    ''' Collection answering reads sent without a read preference late. '''
+
+    def __init__(self, collection, read_preferences, read_preference=None):
+        self.collection = collection
+        self.read_preferences = read_preferences
+        self.read_preference = read_preference
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+    def with_options(self, read_preference=None):
+        return SlowPrimaryCollection(
+            self.collection.with_options(read_preference=read_preference), self.read_preferences, read_preference
+        )
+
+    def find(self, *args, **kwargs):
+        read_preference = self.read_preference
+        self.read_preferences.append(read_preference)
+        cursor = self.collection.find(*args, **kwargs)
+
+        if read_preference is None:
+            to_list = cursor.to_list
+
+            async def slow_to_list(*args, **kwargs):
+                await asyncio.sleep(1)
+                return await to_list(*args, **kwargs)
+
+            cursor.to_list = slow_to_list
+
+        return cursor
+
+    async def find_one(self, *args, **kwargs):
+        read_preference = self.read_preference
+        self.read_preferences.append(read_preference)
+        if read_preference is None:
+            await asyncio.sleep(1)
+        return await self.collection.find_one(*args, **kwargs)
+
+
+class TestHedgedQueries(AsyncTestCase):
+    def setUp(self):
+        super(TestHedgedQueries, self).setUp()
+        self.drop_coll("HedgedUser")
+        self.read_preferences = []
+
+        coll = QuerySet.coll
+        read_preferences = self.read_preferences
+        self.patch = mock.patch.object(
+            QuerySet, 'coll',
+            lambda queryset, alias=None: SlowPrimaryCollection(coll(queryset, alias), read_preferences)
+        )
+
+    @async_test
+    async def test_get_and_find_all_are_hedged(self):
+        user = await HedgedUser.objects.create(name="Bernardo")
+        policy = HedgePolicy(initial_delay_ms=5)
+
+        with self.patch:
+            found = await HedgedUser.objects.hedge(policy).get(user._id)
+            users = await HedgedUser.objects.hedge(policy).filter(name="Bernardo").find_all()
+
+        expect(found._id).to_equal(user._id)
+        expect([item._id for item in users]).to_equal([user._id])
+        expect(self.read_preferences).to_equal([
+            None, ReadPreference.SECONDARY_PREFERRED, None, ReadPreference.SECONDARY_PREFERRED,
+        ])
+        expect(policy.stats.reads).to_equal(2)
+        expect(policy.stats.hedges).to_equal(2)
+        expect(policy.stats.hedge_wins).to_equal(2)
+
+    def test_hedge_read_preference(self):
+        policy = HedgePolicy()
+        expect(policy.get_hedge_read_preference()).to_equal(ReadPreference.SECONDARY_PREFERRED)
+        expect(policy.get_hedge_read_preference(ReadPreference.PRIMARY)).to_equal(
+            ReadPreference.SECONDARY_PREFERRED
+        )
+        expect(policy.get_hedge_read_preference(ReadPreference.SECONDARY)).to_equal(ReadPreference.NEAREST)
+
+        policy = HedgePolicy(hedge_read_preference=ReadPreference.SECONDARY)
+        expect(policy.get_hedge_read_preference()).to_equal(ReadPreference.SECONDARY)
+
+    @async_test
+    async def test_read_preference_is_set_with_options(self):
+        await HedgedUser.objects.create(name="Bernardo")
+
+        # the memory backend, like pymongo 3, rejects read_preference in find
+        users = await HedgedUser.objects.read_preference(ReadPreference.SECONDARY).find_all()
+        user = await HedgedUser.objects.read_preference(ReadPreference.SECONDARY).timeout(100).get(name="Bernardo")
+
+        expect(users).to_length(1)
+        expect(user.name).to_equal("Bernardo")
@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+
+import asyncio
+import inspect
+import unittest
+from unittest import mock
+
+from preggy import expect
+
+try:
+    from pymongo.collection import Collection as DriverCollection
+except ImportError:
+    DriverCollection = None
+
+from aiomotorengine import connect, Document, StringField, IntField, ListField, Q
+from aiomotorengine.errors import InvalidDocumentError
+from aiomotorengine.local_replica import (
+    LocalReplica, get_local_replica, start_local_replicas, stop_local_replicas
+)
+from aiomotorengine.monitoring import register_listener, unregister_listener
+from aiomotorengine.queryset import QuerySet
+from tests import AsyncTestCase, async_test
+
+
+class Plan(Document):
+    __collection__ = "LocalReplicaPlan"
+    __local_replica__ = True
+    __local_replica_indexes__ = ('code', 'tags')
+
+    code = StringField()
+    price = IntField()
+    tags = ListField(StringField())
+
+
+class TestLocalReplica(AsyncTestCase):
+    # change streams need a replica set, so these tests use the memory backend
+    def setUp(self):
+        super(TestLocalReplica, self).setUp(auto_connect=False)
+        self.db = connect("test", backend="memory")
+        self.events = []
+
+    def tearDown(self):
+        self.io_loop.run_until_complete(stop_local_replicas())
+        super(TestLocalReplica, self).tearDown()
+
+    def on_operation(self, event):
+        self.events.append(event)
+
+    async def create_plans(self):
+        await Plan.objects.create(code="free", price=0, tags=["basic"])
+        await Plan.objects.create(code="pro", price=10, tags=["basic", "support"])
+        await Plan.objects.create(code="premium", price=50, tags=["support"])
+
+    async def wait_for_changes(self):
+        for _ in range(10):
+            await asyncio.sleep(0.01)
+
+    def test_index_fields_must_exist(self):
+        try:
+            type('BadPlan', (Document, ), {'__local_replica_indexes__': ('missing', )})
+        except InvalidDocumentError as e:
+            expect(str(e)).to_include('missing')
+        else:
+            assert False, "Should not have gotten this far"
+
+    @async_test
+    async def test_reads_are_answered_locally(self):
+        await self.create_plans()
+        replica, = await start_local_replicas(Plan, max_await_time_ms=10)
+
+        expect(get_local_replica(Plan, 'default')).to_equal(replica)
+        expect(replica.is_current()).to_be_true()
+
+        register_listener(self.on_operation)
+        try:
+            plans = await Plan.objects.filter(price__gt=0).order_by('price').find_all()
+            expect([plan.code for plan in plans]).to_equal(["pro", "premium"])
+
+            plan = await Plan.objects.get(code="premium")
+            expect(plan.price).to_equal(50)
+
+            expect((await Plan.objects.get(plans[0]._id)).code).to_equal("pro")
+            expect(await Plan.objects.filter(Q(tags="support") | Q(price=0)).count()).to_equal(3)
+        finally:
+            unregister_listener(self.on_operation)
+
+        expect([event.operation for event in self.events]).to_equal(['find_all', 'get', 'get', 'count'])
+        expect([event.network_time for event in self.events]).to_equal([0, 0, 0, 0])
+
+    @async_test
+    async def test_indexes(self):
+        await self.create_plans()
+        replica = LocalReplica(Plan)
+        replica.reset(await self.db[Plan.__collection__].find({}).to_list(length=None))
+
+        expect([son['code'] for son in replica.get_candidates({'code': 'pro'})]).to_equal(['pro'])
+        expect([son['code'] for son in replica.get_candidates({'tags': 'basic'})]).to_equal(['free', 'pro'])
+        expect(
+            [son['code'] for son in replica.get_candidates({'code': {'$in': ['premium', 'free']}})]
+        ).to_equal(['free', 'premium'])
+        expect(replica.get_candidates({'price': 10})).to_length(3)
+
+        expect(replica.find({'tags': 'support'}, sort=[('price', -1)], limit=1)[0]['code']).to_equal('premium')
+
+    @async_test
+    async def test_follows_changes(self):
+        await self.create_plans()
+        replica, = await start_local_replicas(Plan, max_await_time_ms=10)
+
+        await Plan.objects.create(code="enterprise", price=100, tags=["support"])
+        await Plan.objects.filter(code="pro").update({Plan.price: 20})
+        await Plan.objects.filter(code="free").delete()
+        await self.wait_for_changes()
+
+        expect(replica.count({})).to_equal(3)
+        expect(replica.find_one({'code': 'pro'})['price']).to_equal(20)
+        expect(replica.find({'tags': 'support'})).to_length(3)
+        expect(replica.find({'tags': 'basic'})).to_length(1)
+
+        plans = await Plan.objects.filter(tags="support").order_by('code').find_all()
+        expect([plan.code for plan in plans]).to_equal(["enterprise", "premium", "pro"])
+
+    @async_test
+    async def test_falls_back_to_the_server(self):
+        await self.create_plans()
+        replica, = await start_local_replicas(Plan, max_await_time_ms=10)
+
+        replica.lag = replica.max_lag + 1
+        expect(replica.is_current()).to_be_false()
+
+        register_listener(self.on_operation)
+        try:
+            expect(await Plan.objects.count()).to_equal(3)
+        finally:
+            unregister_listener(self.on_operation)
+
+        expect(self.events[0].network_time).to_be_greater_than(0)
+
+    @async_test
+    async def test_reloads_after_the_collection_is_dropped(self):
+        await self.create_plans()
+        replica, = await start_local_replicas(Plan, max_await_time_ms=10, retry_interval=0.01)
+
+        await self.db[Plan.__collection__].drop()
+        await self.wait_for_changes()
+        await Plan.objects.create(code="new", price=1)
+        await self.wait_for_changes()
+
+        expect(replica.is_current()).to_be_true()
+        expect([son['code'] for son in replica.find({})]).to_equal(['new'])
+
+
+class PinnedDriverCollection(object):
+    ''' A collection of Motor 0.5, which has no change streams. '''
+
+    def find(self, *args, **kwargs):
+        pass
+
+
+class TestLocalReplicaDriver(AsyncTestCase):
+    def setUp(self):
+        super(TestLocalReplicaDriver, self).setUp(auto_connect=False)
+
+    @unittest.skipIf(getattr(DriverCollection, 'watch', None) is None, "the installed pymongo has no change streams")
+    def test_watch_arguments_are_accepted_by_the_driver(self):
+        inspect.signature(DriverCollection.watch).bind(None, None, **LocalReplica(Plan).get_watch_arguments())
+
+    @async_test
+    async def test_pinned_driver_is_rejected(self):
+        replica = LocalReplica(Plan)
+
+        with mock.patch.object(QuerySet, 'coll', lambda queryset, alias=None: PinnedDriverCollection()):
+            try:
+                await replica.start()
+            except RuntimeError as e:
+                expect(str(e)).to_include("Motor 2.1+")
+            else:
+                assert False, "Should not have gotten this far"
+
+        expect(replica.ready).to_be_false()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+
+import sys
+from datetime import datetime, timedelta
+
+from preggy import expect
+
+from aiomotorengine import (
+    Document, StringField, IntField, DateTimeField, Aggregation
+)
+from aiomotorengine.errors import ReadOnlyDocumentError
+from aiomotorengine.materialized_view import MaterializedView
+from tests import AsyncTestCase, async_test
+
+
+class Order(Document):
+    __collection__ = "MaterializedViewOrder"
+
+    state = StringField()
+    total = IntField()
+    updated_at = DateTimeField()
+
+
+class TestMaterializedView(AsyncTestCase):
+    def setUp(self):
+        super(TestMaterializedView, self).setUp()
+        self.drop_coll("MaterializedViewOrder")
+        self.drop_coll("MaterializedViewTotals")
+        self.drop_coll("__materialized_views__")
+
+    def get_view(self, **kwargs):
+        return MaterializedView(
+            Order.objects.aggregate.group_by(
+                Order.state, Aggregation.sum(Order.total, alias='total')
+            ),
+            collection="MaterializedViewTotals",
+            **kwargs
+        )
+
+    def test_pipeline_ends_with_output_stage(self):
+        pipeline = self.get_view().get_pipeline()
+        expect(pipeline[-1]).to_be_like({'$merge': {
+            'into': 'MaterializedViewTotals', 'on': '_id',
+            'whenMatched': 'replace', 'whenNotMatched': 'insert'
+        }})
+
+        pipeline = self.get_view(mode='out').get_pipeline()
+        expect(pipeline[-1]).to_be_like({'$out': 'MaterializedViewTotals'})
+
+    def test_incremental_pipeline_filters_by_watermark(self):
+        since = datetime(2016, 1, 1)
+        pipeline = self.get_view(
+            watermark='updated_at', when_matched=MaterializedView.accumulate('total')
+        ).get_pipeline(since=since)
+
+        expect(pipeline[0]).to_be_like({'$match': {'updated_at': {'$gt': since}}})
+
+    @async_test
+    async def test_can_refresh_and_read_view(self):
+        now = datetime.utcnow()
+        await Order.objects.bulk_insert([
+            Order(state='ny', total=10, updated_at=now),
+            Order(state='ny', total=20, updated_at=now),
+            Order(state='ca', total=5, updated_at=now),
+        ])
+
+        view = self.get_view(watermark=Order.updated_at, when_matched=MaterializedView.accumulate('total'))
+        watermark = await view.refresh()
+        expect(watermark).not_to_be_null()
+
+        Totals = view.as_document('Totals', total=IntField())
+        totals = await Totals.objects.filter(total__gt=6).find_all()
+        expect(totals).to_length(1)
+        expect(totals[0].total).to_equal(30)
+
+        try:
+            await Totals.objects.delete()
+        except ReadOnlyDocumentError:
+            err = sys.exc_info()[1]
+            expect(err).to_have_an_error_message_of("Documents of class 'Totals' are read-only.")
+        else:
+            assert False, "Should not have gotten this far"
+
+        await Order.objects.create(state='wa', total=7, updated_at=now + timedelta(seconds=1))
+        await view.refresh()
+
+        expect(await Totals.objects.count()).to_equal(3)
+
+    def test_incremental_grouped_view_needs_accumulating_merge(self):
+        try:
+            self.get_view(watermark='updated_at')
+        except ValueError as e:
+            expect(str(e)).to_include("MaterializedView.accumulate")
+        else:
+            assert False, "Should not have gotten this far"
+
+        expect(MaterializedView.accumulate('total')).to_be_like([
+            {'$set': {'total': {'$add': [{'$ifNull': ['$total', 0]}, '$$new.total']}}},
+        ])
+
+    @async_test
+    async def test_incremental_refresh_adds_to_existing_groups(self):
+        now = datetime.utcnow()
+        await Order.objects.bulk_insert([
+            Order(state='ny', total=10, updated_at=now),
+            Order(state='ca', total=5, updated_at=now),
+        ])
+
+        view = self.get_view(watermark=Order.updated_at, when_matched=MaterializedView.accumulate('total'))
+        await view.refresh()
+
+        await Order.objects.bulk_insert([
+            Order(state='ny', total=20, updated_at=now + timedelta(seconds=1)),
+            Order(state='ny', total=1, updated_at=now + timedelta(seconds=2)),
+        ])
+        await view.refresh()
+
+        Totals = view.as_document('IncrementalTotals', total=IntField())
+        totals = await Totals.objects.order_by('total').find_all()
+        expect([(total._id['state'], total.total) for total in totals]).to_equal([('ca', 5), ('ny', 31)])
@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+
+import asyncio
+import re
+from datetime import datetime
+
+from preggy import expect
+
+from aiomotorengine import connect, Document, StringField, IntField, ListField
+from aiomotorengine.backends.memory import MemoryClient
+from aiomotorengine.backends.query import UnsupportedOperation, apply_update, matches, sort_documents
+from aiomotorengine.errors import UniqueKeyViolationError
+from tests import AsyncTestCase, async_test
+
+
+class MemoryUser(Document):
+    __collection__ = "MemoryUser"
+
+    email = StringField(unique=True)
+    name = StringField()
+    age = IntField()
+    tags = ListField(StringField())
+
+
+class TestMemoryQuery(AsyncTestCase):
+    def setUp(self):
+        super(TestMemoryQuery, self).setUp(auto_connect=False)
+
+    def test_matches_comparisons(self):
+        doc = {'name': 'Bernardo', 'age': 32, 'tags': ['a', 'b'], 'address': {'city': 'Rio'}}
+
+        expect(matches(doc, {'age': {'$gt': 30, '$lte': 32}})).to_be_true()
+        expect(matches(doc, {'age': {'$gt': '30'}})).to_be_false()
+        expect(matches(doc, {'tags': 'a'})).to_be_true()
+        expect(matches(doc, {'tags': {'$in': ['c', 'b']}})).to_be_true()
+        expect(matches(doc, {'tags': {'$nin': ['a']}})).to_be_false()
+        expect(matches(doc, {'address.city': 'Rio'})).to_be_true()
+        expect(matches(doc, {'missing': None})).to_be_true()
+        expect(matches(doc, {'missing': {'$exists': False}})).to_be_true()
+        expect(matches(doc, {'name': {'$ne': 'Bernardo'}})).to_be_false()
+        expect(matches(doc, {'name': re.compile('^bern', re.I)})).to_be_true()
+        expect(matches(doc, {'name': {'$not': {'$regex': '^B'}}})).to_be_false()
+        expect(matches(doc, {'$or': [{'age': 1}, {'tags': {'$size': 2}}]})).to_be_true()
+
+    def test_matches_embedded_arrays(self):
+        doc = {'items': [{'sku': 'a', 'quantity': 1}, {'sku': 'b', 'quantity': 5}]}
+
+        expect(matches(doc, {'items.sku': 'b'})).to_be_true()
+        expect(matches(doc, {'items': {'$elemMatch': {'sku': 'a', 'quantity': {'$gt': 2}}}})).to_be_false()
+        expect(matches(doc, {'items': {'$elemMatch': {'sku': 'b', 'quantity': {'$gt': 2}}}})).to_be_true()
+
+    def test_unsupported_operator(self):
+        try:
+            matches({}, {'$where': 'this.a'})
+        except UnsupportedOperation as e:
+            expect(str(e)).to_include('$where')
+        else:
+            assert False, "Should not have gotten this far"
+
+    def test_sort_documents(self):
+        docs = [{'a': 2}, {'a': None}, {'a': 1, 'b': 2}, {'a': 1, 'b': 1}]
+
+        expect(sort_documents(docs, [('a', 1), ('b', -1)])).to_be_like([
+            {'a': None}, {'a': 1, 'b': 2}, {'a': 1, 'b': 1}, {'a': 2},
+        ])
+
+    def test_apply_update(self):
+        doc = {'_id': 1, 'count': 1, 'tags': ['a'], 'old': True}
+
+        apply_update(doc, {
+            '$inc': {'count': 2}, '$set': {'address.city': 'Rio'},
+            '$addToSet': {'tags': {'$each': ['a', 'b']}}, '$unset': {'old': 1},
+        })
+
+        expect(doc).to_be_like({'_id': 1, 'count': 3, 'tags': ['a', 'b'], 'address': {'city': 'Rio'}})
+
+        apply_update(doc, {'name': 'replaced'})
+        expect(doc).to_be_like({'_id': 1, 'name': 'replaced'})
+
+
+class TestMemoryBackend(AsyncTestCase):
+    def setUp(self):
+        super(TestMemoryBackend, self).setUp(auto_connect=False)
+        self.db = connect("test", backend="memory")
+
+    @async_test
+    async def test_connect(self):
+        expect(self.db.connection).to_be_instance_of(MemoryClient)
+        result = await self.db.ping()
+        expect(result['ok']).to_equal(1.0)
+
+    @async_test
+    async def test_document_operations(self):
+        await MemoryUser.objects.create(email="a@a.com", name="a", age=20, tags=['x'])
+        await MemoryUser.objects.create(email="b@a.com", name="b", age=30, tags=['x', 'y'])
+        user = await MemoryUser.objects.create(email="c@a.com", name="c", age=40)
+
+        users = await MemoryUser.objects.filter(age__gte=30).order_by('age', direction=-1).find_all()
+        expect([item.name for item in users]).to_equal(['c', 'b'])
+
+        expect(await MemoryUser.objects.filter(tags='x').count()).to_equal(2)
+
+        loaded = await MemoryUser.objects.get(user._id)
+        expect(loaded.email).to_equal("c@a.com")
+
+        result = await MemoryUser.objects.filter(age__lt=35).update({MemoryUser.name: 'young'})
+        expect(result.count).to_equal(2)
+
+        expect(await MemoryUser.objects.filter(name='young').count()).to_equal(2)
+        expect(await MemoryUser.objects.filter(name='young').delete()).to_equal(2)
+        expect(await MemoryUser.objects.count()).to_equal(1)
+
+    @async_test
+    async def test_unique_index(self):
+        await MemoryUser.objects.create(email="a@a.com")
+
+        try:
+            await MemoryUser.objects.create(email="a@a.com")
+        except UniqueKeyViolationError as e:
+            expect(e.index_name).to_include('email')
+        else:
+            assert False, "Should not have gotten this far"
+
+    @async_test
+    async def test_aggregation(self):
+        collection = self.db['orders']
+        await collection.insert([
+            {'user': 'a', 'total': 10, 'created_at': datetime(2016, 1, 1)},
+            {'user': 'a', 'total': 5, 'created_at': datetime(2016, 1, 2)},
+            {'user': 'b', 'total': 7, 'created_at': datetime(2016, 1, 2)},
+        ])
+
+        results = await collection.aggregate([
+            {'$match': {'total': {'$gt': 5}}},
+            {'$group': {'_id': '$user', 'total': {'$sum': '$total'}, 'count': {'$sum': 1}}},
+            {'$sort': {'_id': 1}},
+        ]).to_list(length=None)
+
+        expect(results).to_be_like([
+            {'_id': 'a', 'total': 10, 'count': 1},
+            {'_id': 'b', 'total': 7, 'count': 1},
+        ])
+
+    @async_test
+    async def test_each_client_has_its_own_data(self):
+        other = connect("test", alias="other", backend="memory")
+
+        await self.db['items'].insert({'name': 'a'})
+
+        expect(await self.db['items'].count()).to_equal(1)
+        expect(await other['items'].count()).to_equal(0)
+
+    @async_test
+    async def test_change_stream(self):
+        collection = self.db['items']
+        stream = collection.watch(full_document='updateLookup', max_await_time_ms=10)
+
+        expect(await stream.try_next()).to_be_null()
+
+        _id = await collection.insert({'name': 'a'})
+        await collection.update({'_id': _id}, {'$set': {'name': 'b'}})
+        await collection.update({'_id': _id}, {'name': 'c'})
+        await collection.remove({'_id': _id})
+
+        changes = [await stream.next() for _ in range(4)]
+        expect([change['operationType'] for change in changes]).to_equal(['insert', 'update', 'replace', 'delete'])
+        expect(changes[0]['fullDocument']).to_equal({'_id': _id, 'name': 'a'})
+        expect(changes[1]['updateDescription']).to_equal({'updatedFields': {'name': 'b'}, 'removedFields': []})
+        expect(changes[1]['fullDocument']).to_be_null()  # deleted since
+        expect(changes[3]['documentKey']).to_equal({'_id': _id})
+
+        resumed = collection.watch(resume_after=changes[1]['_id'])
+        expect((await resumed.next())['operationType']).to_equal('replace')
+
+        await collection.drop()
+        expect((await stream.next())['operationType']).to_equal('drop')
+        expect((await stream.next())['operationType']).to_equal('invalidate')
+        expect(stream.alive).to_be_false()
+
+    @async_test
+    async def test_change_stream_waits_for_changes(self):
+        collection = self.db['items']
+        stream = collection.watch([{'$match': {'fullDocument.name': 'b'}}])
+
+        async def insert():
+            await collection.insert({'name': 'a'})
+            await collection.insert({'name': 'b'})
+
+        asyncio.ensure_future(insert())
+        change = await asyncio.wait_for(stream.next(), 1)
+        expect(change['fullDocument']['name']).to_equal('b')
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+
+import asyncio
+from unittest import mock
+
+from preggy import expect
+
+from aiomotorengine import Document, ReferenceField, StringField
+from aiomotorengine.monitoring import (
+    LatencyHistogram, NULL_TRACKER, OperationEvent, get_filter_shape,
+    register_listener, track, unregister_listener
+)
+from aiomotorengine.queryset import QuerySet
+from tests import AsyncTestCase, async_test
+
+
+class MonitoredUser(Document):
+    __collection__ = "MonitoredUser"
+    name = StringField()
+
+
+class MonitoredPost(Document):
+    __collection__ = "MonitoredPost"
+    title = StringField()
+    author = ReferenceField(MonitoredUser)
+
+
+class TestMonitoring(AsyncTestCase):
+    def setUp(self):
+        super(TestMonitoring, self).setUp(auto_connect=False)
+        self.events = []
+        register_listener(self.events.append, measure_bytes=True)
+
+    def tearDown(self):
+        unregister_listener(self.events.append)
+        super(TestMonitoring, self).tearDown()
+
+    def test_filter_shape(self):
+        expect(get_filter_shape({'name': 'Bernardo', 'age': {'$gt': 20}})).to_equal(
+            "{age: {$gt: ?}, name: ?}"
+        )
+        expect(get_filter_shape({'$or': [{'a': 1}, {'b': [1, 2]}]})).to_equal(
+            "{$or: [{a: ?}, {b: [?]}]}"
+        )
+        expect(get_filter_shape({'name': 'a'})).to_equal(get_filter_shape({'name': 'b'}))
+
+    def test_track_without_listeners(self):
+        unregister_listener(self.events.append)
+
+        expect(track(MonitoredUser, 'find_all', 'default')).to_equal(NULL_TRACKER)
+
+    def test_failing_operation(self):
+        try:
+            with track(MonitoredUser, 'save', 'default'):
+                raise ValueError('failed')
+        except ValueError:
+            pass
+
+        expect(self.events).to_length(1)
+        expect(self.events[0].error).to_be_instance_of(ValueError)
+
+    def test_latency_histogram(self):
+        histogram = LatencyHistogram()
+
+        for duration in (0.001, 0.002, 0.003, 0.1):
+            event = OperationEvent(MonitoredUser, 'find_all', 'default')
+            event.duration = duration
+            histogram(event)
+
+        stats = histogram.percentiles()[('MonitoredUser', 'find_all')]
+        expect(stats['count']).to_equal(4)
+        expect(stats['errors']).to_equal(0)
+        expect(stats['p50']).to_be_greater_than(0.0018)
+        expect(stats['p50']).to_be_lesser_than(0.0023)
+        expect(stats['p99']).to_be_greater_than(0.09)
+
+        histogram.reset()
+        expect(histogram.percentiles()).to_be_empty()
+
+
+class TestOperationEvents(AsyncTestCase):
+    def setUp(self):
+        super(TestOperationEvents, self).setUp()
+        self.drop_coll("MonitoredUser")
+        self.drop_coll("MonitoredPost")
+        self.events = []
+        register_listener(self.events.append, measure_bytes=True)
+
+    def tearDown(self):
+        unregister_listener(self.events.append)
+        super(TestOperationEvents, self).tearDown()
+
+    @async_test
+    async def test_operation_events(self):
+        await MonitoredUser.objects.create(name="Bernardo")
+        await MonitoredUser.objects.filter(name="Bernardo").find_all()
+        await MonitoredUser.objects.count()
+
+        operations = [(event.operation, event.count) for event in self.events]
+        expect(operations).to_include(('save', 1))
+        expect(operations).to_include(('find_all', 1))
+        expect(operations).to_include(('count', 1))
+
+        find_all = [event for event in self.events if event.operation == 'find_all'][0]
+        expect(find_all.document_class).to_equal(MonitoredUser)
+        expect(find_all.filter_shape).to_equal("{name: ?}")
+        expect(find_all.bytes).to_be_greater_than(0)
+        expect(find_all.duration).to_be_greater_than(0)
+
+    @async_test
+    async def test_orm_time_excludes_nested_operations(self):
+        user = await MonitoredUser.objects.create(name="Bernardo")
+        await MonitoredPost.objects.create(title="Post", author=user)
+
+        find_one = QuerySet._find_one
+
+        async def slow_find_one(queryset, *args, **kwargs):
+            if queryset.__klass__ is MonitoredUser:
+                await asyncio.sleep(0.05)
+            return await find_one(queryset, *args, **kwargs)
+
+        del self.events[:]
+        with mock.patch.object(QuerySet, '_find_one', slow_find_one):
+            posts = await MonitoredPost.objects.find_all(lazy=False)
+
+        expect(posts[0].author.name).to_equal("Bernardo")
+
+        events = dict((event.operation, event) for event in self.events)
+        find_all, dereference, get = events['find_all'], events['dereference'], events['get']
+
+        expect(get.network_time).to_be_greater_than(0.05)
+        expect(dereference.nested_time).to_equal(get.duration)
+        expect(find_all.nested_time).to_equal(dereference.duration)
+        expect(find_all.duration).to_be_greater_than(0.05)
+        expect(find_all.orm_time).to_be_lesser_than(0.05)
+        expect(dereference.orm_time).to_be_lesser_than(0.05)
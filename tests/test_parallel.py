@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from unittest import mock
+
+from preggy import expect
+
+from aiomotorengine import Document, StringField, IntField, DateTimeField, EmbeddedDocumentField
+from aiomotorengine import parallel
+from aiomotorengine.parallel import enable_parallel_hydration, disable_parallel_hydration
+from tests import AsyncTestCase, async_test
+
+
+class ParallelAddress(Document):
+    city = StringField(required=True)
+
+
+class ParallelUser(Document):
+    __collection__ = "ParallelUser"
+
+    name = StringField(required=True)
+    age = IntField()
+    created_at = DateTimeField()
+    address = EmbeddedDocumentField(ParallelAddress)
+
+
+class TestParallelHydration(AsyncTestCase):
+    def setUp(self):
+        super(TestParallelHydration, self).setUp()
+        self.drop_coll("ParallelUser")
+        self.executor = ProcessPoolExecutor(max_workers=2)
+        enable_parallel_hydration(executor=self.executor, threshold=3, chunk_size=2)
+
+    def tearDown(self):
+        disable_parallel_hydration()
+        self.executor.shutdown()
+        super(TestParallelHydration, self).tearDown()
+
+    def make_users(self, count):
+        return [
+            ParallelUser(
+                name="user-%d" % index, age=index, created_at=datetime(2016, 1, 1),
+                address=ParallelAddress(city="city-%d" % index)
+            )
+            for index in range(count)
+        ]
+
+    def test_threshold(self):
+        expect(parallel.use_process_pool(ParallelUser, 2)).to_be_false()
+        expect(parallel.use_process_pool(ParallelUser, 3)).to_be_true()
+
+        class LocalUser(Document):
+            pass
+
+        expect(parallel.use_process_pool(LocalUser, 3)).to_be_false()
+
+        disable_parallel_hydration()
+        expect(parallel.use_process_pool(ParallelUser, 3)).to_be_false()
+
+    @async_test
+    async def test_to_son(self):
+        sons = await parallel.to_son(self.make_users(5))
+
+        expect([son['name'] for son in sons]).to_equal(["user-%d" % index for index in range(5)])
+        expect(sons[4]['address']).to_equal({'city': "city-4"})
+
+    @async_test
+    async def test_bulk_insert_and_find_all(self):
+        await ParallelUser.objects.bulk_insert(self.make_users(5))
+
+        with mock.patch.object(parallel, 'run_chunks', side_effect=AssertionError("reads use the pool")):
+            users = await ParallelUser.objects.order_by('age').find_all()
+
+        expect([user.age for user in users]).to_equal([0, 1, 2, 3, 4])
+        expect(users[3].address.city).to_equal("city-3")
+
+    @async_test
+    async def test_bulk_insert_validation(self):
+        users = self.make_users(5)
+        users[3].address.city = None
+
+        try:
+            await ParallelUser.objects.bulk_insert(users)
+        except ValueError as e:
+            expect(str(e)).to_include("Validation for document 3")
+        else:
+            assert False, "Should not have gotten this far"
+
+        expect(await ParallelUser.objects.count()).to_equal(0)
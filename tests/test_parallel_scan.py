@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+
+from preggy import expect
+
+from aiomotorengine import Document, StringField, IntField
+from aiomotorengine.parallel_scan import ScanCheckpointStore
+from tests import AsyncTestCase, async_test
+
+
+class ScanItem(Document):
+    __collection__ = "ParallelScanItem"
+
+    name = StringField()
+    number = IntField(db_field='n')
+
+
+class TestParallelScan(AsyncTestCase):
+    def setUp(self):
+        super(TestParallelScan, self).setUp()
+        self.drop_coll("ParallelScanItem")
+        self.drop_coll("__scan_checkpoints__")
+
+    async def create_items(self, count):
+        await ScanItem.objects.bulk_insert([
+            ScanItem(name="item-%d" % index, number=index) for index in range(count)
+        ])
+
+    @async_test
+    async def test_partitions(self):
+        await self.create_items(10)
+
+        scan = ScanItem.objects.filter(number__gte=2).parallel_scan(partitions=4, field='number')
+        partitions = await scan.get_partitions()
+
+        expect(partitions).to_length(4)
+        expect(partitions[0]['min']).to_equal(2)
+        expect(partitions[-1]['max']).to_equal(9)
+        expect([partition['includes_max'] for partition in partitions]).to_equal([False, False, False, True])
+        expect(scan.get_partition_query(partitions[0])).to_equal({
+            '$and': [{'n': {'$gte': 2}}, {'n': {'$gte': 2, '$lt': partitions[1]['min']}}]
+        })
+
+    @async_test
+    async def test_reads_every_document_once(self):
+        await self.create_items(20)
+
+        numbers = []
+        async for item in ScanItem.objects.filter(number__lt=15).parallel_scan(partitions=3):
+            expect(item).to_be_instance_of(ScanItem)
+            numbers.append(item.number)
+
+        expect(sorted(numbers)).to_equal(list(range(15)))
+
+    @async_test
+    async def test_resumes_from_checkpoint(self):
+        await self.create_items(12)
+        store = ScanCheckpointStore('test-scan')
+
+        seen = []
+        async with ScanItem.objects.parallel_scan(
+            partitions=3, field='number', checkpoint=store, checkpoint_interval=1
+        ) as scan:
+            async for item in scan:
+                seen.append(item.number)
+                if len(seen) == 5:
+                    break
+
+        partitions = await store.load(self.db)
+        expect(partitions).to_length(3)
+
+        async with ScanItem.objects.parallel_scan(partitions=3, field='number', checkpoint=store) as scan:
+            async for item in scan:
+                seen.append(item.number)
+
+        # the document being handled when the scan stopped is seen again
+        expect(sorted(set(seen))).to_equal(list(range(12)))
+        expect(len(seen)).to_equal(13)
+        expect(await store.load(self.db)).to_be_null()
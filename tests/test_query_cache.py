@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+
+import asyncio
+import gc
+from unittest import mock
+
+from preggy import expect
+
+from aiomotorengine import Document, StringField, IntField
+from aiomotorengine.query_cache import QueryCache, has_cached_queries, invalidate_collection
+from aiomotorengine.queryset import QuerySet
+from tests import AsyncTestCase, async_test
+
+
+class Item(Document):
+    __collection__ = "QueryCacheItem"
+
+    name = StringField()
+    rank = IntField()
+
+
+class TestQueryCache(AsyncTestCase):
+    def setUp(self):
+        super(TestQueryCache, self).setUp()
+        self.drop_coll("QueryCacheItem")
+        self.cache = QueryCache()
+
+    def tearDown(self):
+        self.cache.clear()
+        super(TestQueryCache, self).tearDown()
+
+    def test_key(self):
+        namespace = ('default', 'test.QueryCacheItem')
+        key = self.cache.get_key(namespace, 'find_all', {'rank': {'$gt': 1}}, sort=[('rank', 1)], limit=10)
+
+        expect(key).to_equal(
+            self.cache.get_key(namespace, 'find_all', {'rank': {'$gt': 1}}, sort=[('rank', 1)], limit=10)
+        )
+        expect(key).not_to_equal(
+            self.cache.get_key(namespace, 'find_all', {'rank': {'$gt': 1}}, sort=[('rank', 1)], limit=20)
+        )
+        expect(key).not_to_equal(self.cache.get_key(namespace, 'find_all', {'rank': {'$gt': 2}}))
+
+    @async_test
+    async def test_lru_eviction(self):
+        cache = QueryCache(max_bytes=100)
+        namespace = ('default', 'items')
+
+        async def read():
+            return [{'name': 'x' * 20}]
+
+        for index in range(3):
+            await cache.fetch(cache.get_key(namespace, 'find_all', {'index': index}), read, ttl=10)
+
+        # each result takes 56 bytes, so only the last one fits
+        expect(cache).to_length(1)
+        expect(cache.size).to_equal(56)
+        expect(cache.evictions).to_equal(2)
+        expect(cache.get_key(namespace, 'find_all', {'index': 2}) in cache._entries).to_be_true()
+
+    @async_test
+    async def test_find_all_is_cached(self):
+        await Item.objects.create(name="a", rank=1)
+        await Item.objects.create(name="b", rank=2)
+
+        def query():
+            return Item.objects.filter(rank__gte=1).order_by('rank').limit(10).cache(ttl=60, cache=self.cache)
+
+        items = await query().find_all()
+        await self.db[Item.__collection__].insert({'name': 'c', 'rank': 3})  # not seen by the cache
+
+        cached = await query().find_all()
+        expect([item.name for item in cached]).to_equal(["a", "b"])
+        expect(cached[0]).not_to_equal(items[0])
+        expect(await query().count()).to_equal(3)
+        expect(self.cache.hits).to_equal(1)
+        expect(self.cache.misses).to_equal(2)
+
+        # a different query is another entry
+        expect(await Item.objects.filter(rank__gte=2).cache(ttl=60, cache=self.cache).find_all()).to_length(2)
+
+    @async_test
+    async def test_writes_invalidate(self):
+        await Item.objects.create(name="a", rank=1)
+
+        def query():
+            return Item.objects.cache(ttl=60, cache=self.cache)
+
+        expect(await query().find_all()).to_length(1)
+
+        item = await Item.objects.create(name="b", rank=2)
+        expect(await query().find_all()).to_length(2)
+
+        await Item.objects.filter(name="b").update({Item.rank: 3})
+        expect((await query().order_by('rank').find_all())[1].rank).to_equal(3)
+
+        await item.delete()
+        expect(await query().find_all()).to_length(1)
+
+        await Item.objects.bulk_insert([Item(name="c"), Item(name="d")])
+        expect(await query().find_all()).to_length(3)
+        expect(self.cache.hits).to_equal(0)
+
+    @async_test
+    async def test_stale_while_revalidate(self):
+        await Item.objects.create(name="a", rank=1)
+
+        def query():
+            return Item.objects.cache(ttl=0, stale_while_revalidate=60, cache=self.cache)
+
+        expect(await query().count()).to_equal(1)
+        await self.db[Item.__collection__].insert({'name': 'b', 'rank': 2})
+
+        expect(await query().count()).to_equal(1)  # stale, refreshed in the background
+        for _ in range(10):
+            await asyncio.sleep(0.01)
+        expect(await query().count()).to_equal(2)
+        expect(self.cache.stale_hits).to_equal(2)
+
+    @async_test
+    async def test_idle_namespaces_are_released(self):
+        namespace = ('default', 'released')
+        reading = asyncio.Event()
+        written = asyncio.Event()
+
+        async def read():
+            reading.set()
+            await written.wait()
+            return [{'name': 'a'}]
+
+        key = self.cache.get_key(namespace, 'find_all', {})
+        fetch = asyncio.ensure_future(self.cache.fetch(key, read, ttl=10))
+        await reading.wait()
+        expect(self.cache.is_active(namespace)).to_be_true()
+
+        # written while reading: the result is not cached
+        invalidate_collection(namespace)
+        written.set()
+        expect(await fetch).to_length(1)
+        expect(self.cache).to_length(0)
+        expect(self.cache.is_active(namespace)).to_be_false()
+        expect(has_cached_queries()).to_be_false()
+
+        await self.cache.fetch(key, read, ttl=10)
+        expect(has_cached_queries()).to_be_true()
+        invalidate_collection(namespace)
+        expect(self.cache._reads).to_be_empty()
+        expect(self.cache._keys_by_namespace).to_be_empty()
+        expect(has_cached_queries()).to_be_false()
+
+    @async_test
+    async def test_writes_skip_invalidation_without_cached_queries(self):
+        gc.collect()
+        expect(has_cached_queries()).to_be_false()
+
+        with mock.patch.object(QuerySet, 'get_cache_namespace') as get_cache_namespace:
+            item = await Item.objects.create(name="a", rank=1)
+            await Item.objects.filter(name="a").update({Item.rank: 2})
+            await item.delete()
+
+        expect(get_cache_namespace.called).to_be_false()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+
+from preggy import expect
+
+from aiomotorengine import (
+    Document, StringField, IntField, ListField, EmbeddedDocumentField, Q
+)
+from tests import AsyncTestCase
+
+
+class PredicateAddress(Document):
+    city = StringField(db_field="c")
+    zip_code = StringField()
+
+
+class PredicateUser(Document):
+    __collection__ = "PredicateUser"
+
+    name = StringField()
+    email = StringField(db_field="mail")
+    age = IntField()
+    tags = ListField(StringField())
+    address = EmbeddedDocumentField(PredicateAddress)
+
+
+USERS = [
+    PredicateUser(name="a", email="a@a.com", age=10, tags=['x'], address=PredicateAddress(city="Rio")),
+    PredicateUser(name="b", age=20, tags=['x', 'y'], address=PredicateAddress(city="SP")),
+    PredicateUser(name="c", email="c@a.com", age=30),
+]
+
+
+def names(query):
+    predicate = query.to_predicate(PredicateUser)
+    return [user.name for user in USERS if predicate(user)]
+
+
+class TestQueryPredicate(AsyncTestCase):
+    def setUp(self):
+        super(TestQueryPredicate, self).setUp(auto_connect=False)
+
+    def test_operators(self):
+        expect(names(Q(age=20))).to_equal(['b'])
+        expect(names(Q(age__gt=10))).to_equal(['b', 'c'])
+        expect(names(Q(age__gte=10, age__lt=30))).to_equal(['a', 'b'])
+        expect(names(Q(age__lte=10))).to_equal(['a'])
+        expect(names(Q(age__in=[10, 30]))).to_equal(['a', 'c'])
+        expect(names(Q(age__ne=10))).to_equal(['b', 'c'])
+        expect(names(Q(tags='y'))).to_equal(['b'])
+
+    def test_null_and_exists(self):
+        expect(names(Q(email__is_null=True))).to_equal(['b'])
+        expect(names(Q(email__is_null=False))).to_equal(['a', 'c'])
+        expect(names(Q(email__exists=True))).to_equal(['a', 'b', 'c'])
+
+    def test_embedded_paths(self):
+        expect(names(Q(address__city="Rio"))).to_equal(['a'])
+
+    def test_combinations(self):
+        expect(names(Q(age=10) | Q(age=30))).to_equal(['a', 'c'])
+        expect(names((Q(age=10) | Q(age=30)) & Q(email__is_null=False))).to_equal(['a', 'c'])
+        expect(names(~Q(age=10))).to_equal(['b', 'c'])
+        expect(names(~Q(age__gt=10))).to_equal(['a'])
+        expect(names(Q({'age': {'$gte': 20}}))).to_equal(['b', 'c'])
+
+    def test_predicate_matches_compiled_query(self):
+        query = Q(age=10) | Q(age=30)
+        query.to_query(PredicateUser)
+
+        expect(names(query)).to_equal(['a', 'c'])
+
+    def test_son_documents(self):
+        predicate = Q(email="a@a.com", address__city="Rio").to_predicate(PredicateUser)
+
+        expect(predicate({'mail': 'a@a.com', 'address': {'c': 'Rio'}})).to_be_true()
+        expect(predicate({'mail': 'a@a.com', 'address': {'c': 'SP'}})).to_be_false()
+
+    def test_queryset_predicate(self):
+        predicate = PredicateUser.objects.filter(age__gt=10).filter(tags='x').to_predicate()
+        expect([user.name for user in USERS if predicate(user)]).to_equal(['b'])
+
+        expect(PredicateUser.objects.to_predicate()(USERS[0])).to_be_true()
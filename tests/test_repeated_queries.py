@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+
+import logging
+
+from preggy import expect
+
+from aiomotorengine import Document, ReferenceField, StringField
+from aiomotorengine.errors import RepeatedQueryError
+from aiomotorengine.monitoring import NULL_TRACKER, track
+from aiomotorengine.repeated_queries import detect_repeated_queries
+from tests import AsyncTestCase, async_test
+
+
+class RepeatedAuthor(Document):
+    __collection__ = "RepeatedAuthor"
+    name = StringField()
+
+
+class RepeatedPost(Document):
+    __collection__ = "RepeatedPost"
+    author = ReferenceField(RepeatedAuthor)
+
+
+def run_get(object_id):
+    with track(RepeatedAuthor, 'get', 'default', {'_id': object_id}):
+        pass
+
+
+class TestRepeatedQueries(AsyncTestCase):
+    def setUp(self):
+        super(TestRepeatedQueries, self).setUp(auto_connect=False)
+
+    def test_raises_above_threshold(self):
+        with detect_repeated_queries(threshold=3):
+            for object_id in range(3):
+                run_get(object_id)
+
+            try:
+                run_get(3)
+            except RepeatedQueryError as e:
+                expect(str(e)).to_include("RepeatedAuthor.get with filter {_id: ?}")
+                expect(str(e)).to_include("test_raises_above_threshold")
+            else:
+                assert False, "Should not have gotten this far"
+
+    def test_different_shapes(self):
+        with detect_repeated_queries(threshold=1) as scope:
+            with track(RepeatedAuthor, 'get', 'default', {'_id': 1}):
+                pass
+            with track(RepeatedAuthor, 'get', 'default', {'name': 'a'}):
+                pass
+            with track(RepeatedPost, 'get', 'default', {'_id': 1}):
+                pass
+
+        expect(scope.counts).to_length(3)
+
+    def test_log_mode(self):
+        records = []
+        handler = logging.Handler()
+        handler.emit = records.append
+        logger = logging.getLogger('aiomotorengine.repeated_queries')
+        logger.addHandler(handler)
+
+        try:
+            with detect_repeated_queries(threshold=1, mode='log'):
+                for object_id in range(5):
+                    run_get(object_id)
+        finally:
+            logger.removeHandler(handler)
+
+        expect(records).to_length(1)
+
+    def test_scope_is_removed(self):
+        with detect_repeated_queries():
+            pass
+
+        expect(track(RepeatedAuthor, 'get', 'default')).to_equal(NULL_TRACKER)
+
+    def test_invalid_mode(self):
+        try:
+            detect_repeated_queries(mode='ignore')
+        except ValueError as e:
+            expect(str(e)).to_include("Invalid repeated queries mode 'ignore'")
+        else:
+            assert False, "Should not have gotten this far"
+
+
+class TestRepeatedQueriesIntegration(AsyncTestCase):
+    def setUp(self):
+        super(TestRepeatedQueriesIntegration, self).setUp()
+        self.drop_coll("RepeatedAuthor")
+        self.drop_coll("RepeatedPost")
+
+    @async_test
+    async def test_load_references_in_loop(self):
+        for index in range(3):
+            author = await RepeatedAuthor.objects.create(name="author %d" % index)
+            await RepeatedPost.objects.create(author=author)
+
+        posts = await RepeatedPost.objects.find_all(lazy=True)
+
+        with detect_repeated_queries(threshold=2):
+            try:
+                for post in posts:
+                    await post.load_references()
+            except RepeatedQueryError as e:
+                expect(str(e)).to_include("RepeatedAuthor.get with filter {_id: ?}")
+            else:
+                assert False, "Should not have gotten this far"
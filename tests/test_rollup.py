@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+
+from datetime import datetime
+
+from preggy import expect
+
+from aiomotorengine import (
+    Document, StringField, IntField, DateTimeField, ListField, EmbeddedDocumentField
+)
+from aiomotorengine.rollup import Rollup, truncate
+from tests import AsyncTestCase, async_test
+
+
+class PageView(Document):
+    __collection__ = "RollupPageView"
+    __rollups__ = [
+        Rollup(
+            "RollupPageViewPerDay", group_by=['user'], time_field='created_at',
+            bucket='day', sums={'duration': 'total_duration'}
+        ),
+    ]
+
+    user = StringField(db_field='u')
+    duration = IntField()
+    created_at = DateTimeField()
+
+
+class RollupDevice(Document):
+    kind = StringField()
+
+
+class TaggedPageView(Document):
+    __collection__ = "RollupTaggedPageView"
+    __rollups__ = [
+        Rollup("RollupTaggedPageViewTotals", group_by=['tags', 'device']),
+    ]
+
+    tags = ListField(StringField())
+    device = EmbeddedDocumentField(RollupDevice)
+
+
+class TestRollup(AsyncTestCase):
+    def setUp(self):
+        super(TestRollup, self).setUp()
+        self.drop_coll("RollupPageView")
+        self.drop_coll("RollupPageViewPerDay")
+        self.drop_coll("RollupTaggedPageView")
+        self.drop_coll("RollupTaggedPageViewTotals")
+
+    def test_truncate(self):
+        value = datetime(2016, 5, 17, 13, 45, 12, 10)
+
+        expect(truncate(value, 'minute')).to_equal(datetime(2016, 5, 17, 13, 45))
+        expect(truncate(value, 'hour')).to_equal(datetime(2016, 5, 17, 13))
+        expect(truncate(value, 'day')).to_equal(datetime(2016, 5, 17))
+        expect(truncate(value, 'month')).to_equal(datetime(2016, 5, 1))
+        expect(truncate(value, 'year')).to_equal(datetime(2016, 1, 1))
+
+    def test_collects_increments_per_row(self):
+        rollup = PageView.__rollups__[0]
+        rows = rollup.collect([
+            PageView(user='a', duration=10, created_at=datetime(2016, 1, 1, 10)),
+            PageView(user='a', duration=5, created_at=datetime(2016, 1, 1, 20)),
+            PageView(user='b', duration=1, created_at=datetime(2016, 1, 1, 20)),
+        ])
+
+        expect(rows).to_length(2)
+        rows = dict((key['u'], increments) for key, increments in rows)
+        expect(rows['a']).to_be_like({'count': 2, 'total_duration': 15})
+        expect(rows['b']).to_be_like({'count': 1, 'total_duration': 1})
+
+    @async_test
+    async def test_rollups_are_updated_on_insert(self):
+        await PageView.objects.bulk_insert([
+            PageView(user='a', duration=10, created_at=datetime(2016, 1, 1, 10)),
+            PageView(user='a', duration=5, created_at=datetime(2016, 1, 1, 20)),
+        ])
+        await PageView.objects.create(user='a', duration=1, created_at=datetime(2016, 1, 1, 23))
+
+        row = await self.db["RollupPageViewPerDay"].find_one(
+            {'u': 'a', 'created_at': datetime(2016, 1, 1)}
+        )
+        expect(row['count']).to_equal(3)
+        expect(row['total_duration']).to_equal(16)
+
+    @async_test
+    async def test_groups_by_list_and_embedded_values(self):
+        await TaggedPageView.objects.bulk_insert([
+            TaggedPageView(tags=['a', 'b'], device=RollupDevice(kind='phone')),
+            TaggedPageView(tags=['a', 'b'], device=RollupDevice(kind='phone')),
+            TaggedPageView(tags=['a'], device=RollupDevice(kind='phone')),
+        ])
+
+        rows = await self.db["RollupTaggedPageViewTotals"].find({}).to_list(length=None)
+        rows = dict((tuple(row['tags']), row['count']) for row in rows)
+        expect(rows).to_be_like({('a', 'b'): 2, ('a', ): 1})
@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+
+from preggy import expect
+
+from aiomotorengine import Document, StringField
+from aiomotorengine.tenancy import (
+    TenantResolver, get_tenant, set_tenant_resolver, use_tenant
+)
+from tests import AsyncTestCase, async_test
+
+
+class Plan(Document):
+    __collection__ = "TenantPlan"
+    name = StringField()
+
+
+class Country(Document):
+    __collection__ = "TenantCountry"
+    __tenant_aware__ = False
+    name = StringField()
+
+
+class TestTenancy(AsyncTestCase):
+    def setUp(self):
+        super(TestTenancy, self).setUp()
+        self.resolver = TenantResolver(database='test_tenant_{tenant}', max_handles=2)
+        set_tenant_resolver(self.resolver)
+
+    def tearDown(self):
+        set_tenant_resolver(None)
+        super(TestTenancy, self).tearDown()
+
+    def test_resolves_database_and_prefix(self):
+        resolver = TenantResolver(
+            database=lambda tenant: 'db_%s' % tenant, collection_prefix='{tenant}_'
+        )
+        expect(resolver.resolve(Plan, 'acme')).to_equal(('db_acme', 'acme_TenantPlan'))
+
+        resolver = TenantResolver()
+        expect(resolver.resolve(Plan, 'acme')).to_equal((None, 'TenantPlan'))
+
+    def test_tenant_context(self):
+        expect(get_tenant()).to_be_null()
+        with use_tenant('acme'):
+            expect(get_tenant()).to_equal('acme')
+            with use_tenant('globex'):
+                expect(get_tenant()).to_equal('globex')
+            expect(get_tenant()).to_equal('acme')
+        expect(get_tenant()).to_be_null()
+
+    def test_handles_are_evicted(self):
+        for tenant in ['a', 'b', 'c']:
+            with use_tenant(tenant):
+                Plan.objects.coll()
+
+        expect(self.resolver).to_length(2)
+
+        with use_tenant('c'):
+            expect(Plan.objects.coll().database.name).to_equal('test_tenant_c')
+            expect(Country.objects.coll().database.name).to_equal('test')
+
+    @async_test
+    async def test_documents_are_isolated_per_tenant(self):
+        for tenant in ['a', 'b']:
+            with use_tenant(tenant):
+                await Plan.objects.delete()
+
+        with use_tenant('a'):
+            await Plan.objects.create(name="gold")
+
+        with use_tenant('a'):
+            expect(await Plan.objects.count()).to_equal(1)
+
+        with use_tenant('b'):
+            expect(await Plan.objects.count()).to_equal(0)
@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+
+import contextlib
+import contextvars
+
+from preggy import expect
+
+from aiomotorengine import Document, StringField
+from aiomotorengine.monitoring import register_listener, track, unregister_listener
+from aiomotorengine.tracing import disable_tracing, enable_tracing
+from tests import AsyncTestCase, async_test
+
+
+class FakeSpan(object):
+    def __init__(self, name, parent, attributes):
+        self.name = name
+        self.parent = parent
+        self.attributes = dict(attributes or {})
+        self.ended = False
+        self.exception = None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+
+class FakeTracer(object):
+    def __init__(self):
+        self.spans = []
+        self.current = contextvars.ContextVar('current_span', default=None)
+
+    @contextlib.contextmanager
+    def start_as_current_span(self, name, attributes=None, **kwargs):
+        span = FakeSpan(name, self.current.get(), attributes)
+        self.spans.append(span)
+        token = self.current.set(span)
+        try:
+            yield span
+        except Exception as e:
+            span.exception = e
+            raise
+        finally:
+            self.current.reset(token)
+            span.ended = True
+
+
+class TracedUser(Document):
+    __collection__ = "TracedUser"
+    name = StringField()
+
+
+class TestTracing(AsyncTestCase):
+    def setUp(self):
+        super(TestTracing, self).setUp(auto_connect=False)
+        self.tracer = FakeTracer()
+        enable_tracing(self.tracer)
+
+    def tearDown(self):
+        disable_tracing()
+        super(TestTracing, self).tearDown()
+
+    def test_operation_spans(self):
+        with track(TracedUser, 'find_all', 'default', {'name': 'a'}) as operation:
+            with operation.network():
+                pass
+            with operation.hydration():
+                pass
+            operation.add_count(2)
+
+        operation_span, network_span, hydration_span = self.tracer.spans
+
+        expect(operation_span.name).to_equal('find_all TracedUser')
+        expect(operation_span.parent).to_be_null()
+        expect(operation_span.attributes['db.mongodb.collection']).to_equal('TracedUser')
+        expect(operation_span.attributes['db.statement']).to_equal('{name: ?}')
+        expect(operation_span.attributes['aiomotorengine.count']).to_equal(2)
+        expect(network_span.name).to_equal('find_all TracedUser network')
+        expect(network_span.parent).to_equal(operation_span)
+        expect(hydration_span.parent).to_equal(operation_span)
+        expect(all(span.ended for span in self.tracer.spans)).to_be_true()
+
+    def test_nested_operations(self):
+        with track(TracedUser, 'dereference', 'default'):
+            with track(TracedUser, 'get', 'default', {'_id': 1}):
+                pass
+
+        dereference_span, get_span = self.tracer.spans
+        expect(get_span.parent).to_equal(dereference_span)
+
+    def test_failed_operation(self):
+        try:
+            with track(TracedUser, 'save', 'default'):
+                raise ValueError('failed')
+        except ValueError:
+            pass
+
+        expect(self.tracer.spans[0].exception).to_be_instance_of(ValueError)
+        expect(self.tracer.spans[0].ended).to_be_true()
+
+
+class TestTracingOperations(AsyncTestCase):
+    def setUp(self):
+        super(TestTracingOperations, self).setUp()
+        self.drop_coll("TracedUser")
+        self.tracer = FakeTracer()
+        enable_tracing(self.tracer)
+
+    def tearDown(self):
+        disable_tracing()
+        super(TestTracingOperations, self).tearDown()
+
+    @async_test
+    async def test_find_all_span(self):
+        await TracedUser.objects.create(name="Bernardo")
+        await TracedUser.objects.filter(name="Bernardo").find_all()
+
+        names = [span.name for span in self.tracer.spans if span.parent is None]
+        expect(names).to_be_like(['save TracedUser', 'find_all TracedUser'])
+
+    @async_test
+    async def test_page_with_total_ends_its_span(self):
+        events = []
+        register_listener(events.append)
+        try:
+            await TracedUser.objects.create(name="Bernardo")
+            users, total = await TracedUser.objects.order_by('name').limit(1).page_with_total()
+            counts = await TracedUser.objects.count_by({'bernardo': {'name': 'Bernardo'}})
+            await TracedUser.objects.find_all()
+        finally:
+            unregister_listener(events.append)
+
+        expect(total).to_equal(1)
+        expect(counts).to_equal({'bernardo': 1})
+        expect([event.operation for event in events]).to_equal(['save', 'aggregate', 'aggregate', 'find_all'])
+
+        expect(self.tracer.current.get()).to_be_null()
+        expect(all(span.ended for span in self.tracer.spans)).to_be_true()
+        names = [span.name for span in self.tracer.spans if span.parent is None]
+        expect(names).to_be_like([
+            'save TracedUser', 'aggregate TracedUser', 'aggregate TracedUser', 'find_all TracedUser',
+        ])
+
+    @async_test
+    async def test_stream_span_is_not_current_while_iterating(self):
+        await TracedUser.objects.create(name="Bernardo")
+        await TracedUser.objects.create(name="Rafael")
+
+        rows = TracedUser.objects.aggregate.raw([{'$match': {}}]).stream(as_dict=True)
+        async for row in rows:
+            expect(self.tracer.current.get()).to_be_null()
+            await TracedUser.objects.find_all()
+            break
+        await rows.aclose()
+
+        aggregate_span = [span for span in self.tracer.spans if span.name == 'aggregate TracedUser'][0]
+        find_all_span = [span for span in self.tracer.spans if span.name == 'find_all TracedUser'][0]
+        network_span = [span for span in self.tracer.spans if span.name == 'aggregate TracedUser network'][0]
+
+        expect(aggregate_span.parent).to_be_null()
+        expect(find_all_span.parent).to_be_null()
+        expect(network_span.parent).to_equal(aggregate_span)
+        expect(all(span.ended for span in self.tracer.spans)).to_be_true()